@@ -0,0 +1,93 @@
+"""
+ESI 请求调度器基准测试
+
+在本地启动一个模拟 ESI 的 aiohttp 服务，通过 esi_request 装饰的接口并发发送请求，
+统计调度器的持续吞吐量（请求/秒）以及各接口的实际速率。
+
+用法：
+    python -m benchmarks.bench_esi_scheduler --requests 600 --endpoints 3 --limit 100 --latency 0.02
+"""
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+
+from aiohttp import web
+
+from src_v2.model.EVE.eveesi.esi_req_manager import esi_manager, esi_request
+from src_v2.model.EVE.eveesi.eveutils import esi_session_pool, get_request_async
+
+HOST = "127.0.0.1"
+
+
+async def start_fake_esi(port: int, latency: float) -> web.AppRunner:
+    """模拟 ESI：每个请求延迟 latency 秒后返回一个小 JSON"""
+    async def handler(request: web.Request):
+        await asyncio.sleep(latency)
+        return web.json_response({"path": request.path})
+
+    app = web.Application()
+    app.router.add_get("/{endpoint}/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, port).start()
+    return runner
+
+
+def make_endpoint(name: str, port: int, limit: int):
+    """构造一个带 limit 的 esi_request 接口"""
+    async def endpoint():
+        return await get_request_async(f"http://{HOST}:{port}/{name}/", log=False, use_cache=False)
+    endpoint.__name__ = name
+    return esi_request(limit=limit)(endpoint)
+
+
+async def run(args):
+    runner = await start_fake_esi(args.port, args.latency)
+    await esi_session_pool.start()
+    await esi_manager.start()
+    # 从满令牌池开始，与长时间运行后的稳态一致
+    esi_manager.token_pool = esi_manager.max_token_pool
+
+    endpoints = [make_endpoint(f"endpoint_{i}", args.port, args.limit) for i in range(args.endpoints)]
+    finish_times = defaultdict(list)
+
+    async def call(endpoint):
+        await endpoint()
+        finish_times[endpoint.__name__].append(time.perf_counter())
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        call(endpoints[i % len(endpoints)]) for i in range(args.requests)
+    ])
+    elapsed = time.perf_counter() - start
+
+    await esi_manager.stop()
+    await esi_session_pool.close()
+    await runner.cleanup()
+
+    required_tokens = max(1, -(-esi_manager.token_generation_rate // args.limit))
+    global_rate = esi_manager.token_generation_rate / required_tokens
+    endpoint_rate = args.limit * args.endpoints
+    print(f"请求数: {args.requests}, 接口数: {args.endpoints}, 接口 limit: {args.limit}/s, 服务端延迟: {args.latency}s")
+    print(f"总耗时: {elapsed:.2f}s, 吞吐量: {args.requests / elapsed:.1f} req/s")
+    print(f"稳态理论上限: {min(global_rate, endpoint_rate):.1f} req/s "
+          f"(全局令牌 {global_rate:.1f} req/s, 接口限速合计 {endpoint_rate} req/s, 起始令牌池 {esi_manager.max_token_pool})")
+    for name, times in sorted(finish_times.items()):
+        duration = max(times) - start
+        print(f"  {name}: {len(times)} 个请求, {len(times) / duration:.1f} req/s")
+    print(f"连接统计: {esi_session_pool.stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ESI 请求调度器基准测试")
+    parser.add_argument("--requests", type=int, default=600, help="总请求数")
+    parser.add_argument("--endpoints", type=int, default=3, help="接口数量")
+    parser.add_argument("--limit", type=int, default=100, help="每个接口的 limit（请求/秒）")
+    parser.add_argument("--latency", type=float, default=0.02, help="模拟 ESI 的响应延迟（秒）")
+    parser.add_argument("--port", type=int, default=18080, help="模拟 ESI 端口")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
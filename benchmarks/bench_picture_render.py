@@ -0,0 +1,150 @@
+"""
+图片渲染基准测试
+
+分别统计图片渲染的两个阶段：
+    模板阶段: 原有路径（每次新建 jinja2.Environment、注册过滤器、从磁盘解析模板）
+             与共享环境（template_env 预编译 + render_async）的单次渲染耗时
+    浏览器阶段: 指定 --browser 时，通过 browser_pool 截图，分别统计冷启动与常驻浏览器的单张耗时和吞吐
+默认使用与价格图规模相近的模拟模板和数据；--template 指定 resource/templates 下的模板时使用真实模板（数据仍为模拟）。
+
+用法：
+    python -m benchmarks.bench_picture_render --renders 2000
+    python -m benchmarks.bench_picture_render --browser --images 20 --concurrency 2
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import jinja2
+
+from src_v2.core.picture_render.template_env import create_template_env, format_number, template_path
+
+SYNTHETIC_TEMPLATE = """
+<html><head><meta charset="utf-8"><title>{{ item_name }}</title></head>
+<body>
+<h1>{{ item_name }}</h1>
+<div>{{ max_buy }} / {{ mid_price }} / {{ min_sell }}</div>
+<table>
+{% for order_id, order in sell_orders %}
+  <tr><td>{{ order_id }}</td><td>{{ order.price | format_number }}</td><td>{{ order.volume_remain | format_number }}</td></tr>
+{% endfor %}
+</table>
+<table>
+{% for order_id, order in buy_orders %}
+  <tr><td>{{ order_id }}</td><td>{{ order.price | format_number }}</td><td>{{ order.volume_remain | format_number }}</td></tr>
+{% endfor %}
+</table>
+<ul>
+{% for day in price_history %}<li>{{ day.date }} {{ day.average | format_number }}</li>{% endfor %}
+</ul>
+</body></html>
+"""
+
+
+def make_context():
+    """生成与价格图规模相近的模拟数据"""
+    rng = random.Random(0)
+    orders = [
+        [order_id, {"price": rng.random() * 1e8, "volume_remain": rng.randint(1, 1000)}]
+        for order_id in range(40)
+    ]
+    return {
+        "item_name": "Wyvern",
+        "max_buy": f"{rng.random() * 1e9:,.2f}",
+        "mid_price": f"{rng.random() * 1e9:,.2f}",
+        "min_sell": f"{rng.random() * 1e9:,.2f}",
+        "item_image_base64": None,
+        "sell_orders": orders[:20],
+        "buy_orders": orders[20:],
+        "price_history": [{"date": f"2025-01-{day:02d}", "average": rng.random() * 1e9} for day in range(1, 31)],
+    }
+
+
+def render_old_path(search_path: str, template_name: str, context: dict) -> str:
+    """原有路径：每次新建环境并从磁盘解析模板"""
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(search_path),
+        autoescape=jinja2.select_autoescape(['html', 'xml'])
+    )
+    env.filters['format_number'] = format_number
+    return env.get_template(template_name).render(**context)
+
+
+async def bench_template(search_path: str, template_name: str, renders: int) -> str:
+    context = make_context()
+    print(f"模板阶段: {template_name}, {renders} 次")
+
+    start = time.perf_counter()
+    for _ in range(renders):
+        render_old_path(search_path, template_name, context)
+    old_us = (time.perf_counter() - start) / renders * 1e6
+    print(f"  {'原有路径 (新建 Environment)':<36} {old_us:10.1f} us/次")
+
+    env = create_template_env(search_path)
+    template = env.get_template(template_name)
+    start = time.perf_counter()
+    for _ in range(renders):
+        html_content = await template.render_async(**context)
+    shared_us = (time.perf_counter() - start) / renders * 1e6
+    print(f"  {'共享环境 (render_async)':<36} {shared_us:10.1f} us/次")
+    print(f"  共享环境相对原有路径: {old_us / shared_us:.1f}x")
+    return html_content
+
+
+async def bench_browser(html_content: str, images: int, concurrency: int):
+    from src_v2.core.picture_render.browser_pool import BrowserPool
+
+    pool = BrowserPool(size=concurrency)
+    print(f"浏览器阶段: {images} 张, 池大小 {concurrency}")
+
+    async def render_one():
+        async with pool.page(550, 720) as page:
+            await page.setContent(html_content)
+            return await page.screenshot({'type': 'jpeg', 'fullPage': True})
+
+    try:
+        # 冷启动：池中浏览器全部启动
+        start = time.perf_counter()
+        await asyncio.gather(*[render_one() for _ in range(concurrency)])
+        cold = time.perf_counter() - start
+        print(f"  {'冷启动 (含启动浏览器)':<36} {cold * 1000:10.1f} ms/批")
+
+        start = time.perf_counter()
+        await asyncio.gather(*[render_one() for _ in range(images)])
+        warm = time.perf_counter() - start
+        print(f"  {'常驻浏览器':<36} {warm / images * 1000:10.1f} ms/张, {images / warm:.1f} 张/秒")
+    finally:
+        await pool.close()
+
+
+async def run(args):
+    if args.template:
+        search_path, template_name = template_path, args.template
+        html_content = await bench_template(search_path, template_name, args.renders)
+    else:
+        with tempfile.TemporaryDirectory() as search_path:
+            template_name = "bench_price.j2"
+            with open(os.path.join(search_path, template_name), "w", encoding="utf-8") as f:
+                f.write(SYNTHETIC_TEMPLATE)
+            html_content = await bench_template(search_path, template_name, args.renders)
+
+    if args.browser:
+        await bench_browser(html_content, args.images, args.concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图片渲染基准测试")
+    parser.add_argument("--renders", type=int, default=2000, help="模板阶段的渲染次数")
+    parser.add_argument("--template", default=None, help="使用 resource/templates 下的模板（默认使用模拟模板）")
+    parser.add_argument("--browser", action="store_true", help="同时测试浏览器阶段（需要 Chromium）")
+    parser.add_argument("--images", type=int, default=20, help="浏览器阶段的截图数量")
+    parser.add_argument("--concurrency", type=int, default=2, help="浏览器池大小")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
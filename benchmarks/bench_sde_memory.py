@@ -0,0 +1,126 @@
+"""
+SDE 内存表基准测试
+
+对比三种查询路径的单次查询耗时：
+    memory:  sde_memory 已加载，SdeUtils 的 getter 直接返回内存表结果
+    aiocache: 原有 @cached(PickleSerializer) 命中时的开销（缓存已预热，不含数据库查询）
+    db:      指定 --db 时，使用配置的 SDE 数据库执行未缓存的查询
+并统计内存表的常驻内存（tracemalloc）。默认使用按 SDE 规模生成的模拟数据，--db 时从 SDE 数据库加载。
+
+用法：
+    python -m benchmarks.bench_sde_memory --types 50000 --lookups 20000
+    python -m benchmarks.bench_sde_memory --db --lookups 2000
+"""
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+
+from aiocache import cached
+from aiocache.serializers import PickleSerializer
+
+from src_v2.model.EVE.sde.sde_memory import SdeMemoryTable, sde_memory
+from src_v2.model.EVE.sde.utils import SdeUtils
+
+
+def make_rows(type_count: int):
+    """生成与 SDE 规模相近的模拟数据"""
+    rng = random.Random(0)
+    category_rows = [(i, f"Category {i}", f"类别{i}") for i in range(1, 51)]
+    group_rows = [(i, rng.randint(1, 50), f"Group {i}", f"组{i}") for i in range(1, 1501)]
+    meta_rows = [(i, f"Meta {i}", f"元{i}") for i in range(1, 21)]
+    # 市场组：4 层树
+    market_group_rows = []
+    for i in range(1, 2001):
+        parent = None if i <= 20 else rng.randint(max(1, i // 4 - 50), i // 4 + 1)
+        market_group_rows.append((i, parent if parent and parent < i else None, f"Market {i}", f"市场{i}"))
+    type_rows = [
+        (i, rng.randint(1, 1500), rng.choice([None, rng.randint(1, 20)]), rng.choice([None, rng.randint(1, 2000)]),
+         rng.random() * 100, rng.random() * 100, f"Type {i}", f"物品{i}")
+        for i in range(1, type_count + 1)
+    ]
+    region_rows = [(i, f"Region {i}", f"星域{i}") for i in range(1, 101)]
+    system_rows = [
+        (i, rng.randint(1, 100), f"System {i}", f"星系{i}", rng.random(), rng.random(), rng.random())
+        for i in range(1, 8001)
+    ]
+    return type_rows, group_rows, category_rows, meta_rows, market_group_rows, system_rows, region_rows
+
+
+async def bench(name: str, func, args_list) -> float:
+    start = time.perf_counter()
+    for args in args_list:
+        await func(*args)
+    elapsed = time.perf_counter() - start
+    per_lookup = elapsed / len(args_list) * 1e6
+    print(f"  {name:<40} {per_lookup:10.2f} us/次")
+    return per_lookup
+
+
+async def run(type_count: int, lookups: int, use_db: bool):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    if use_db:
+        await SdeUtils.init_database()
+        start = time.perf_counter()
+        await sde_memory.load()
+        build_time = time.perf_counter() - start
+        table = sde_memory
+    else:
+        # 模拟行数据在构建后释放，名称字符串由内存表持有，计入常驻内存
+        rows = make_rows(type_count)
+        start = time.perf_counter()
+        table = SdeMemoryTable()
+        table.build(*rows)
+        build_time = time.perf_counter() - start
+        del rows
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    print(f"内存表: types={len(table._type_index)}, 构建 {build_time:.2f}s, 常驻内存 {size / 1024 / 1024:.1f} MiB")
+
+    rng = random.Random(1)
+    type_ids = list(table._type_index)
+    args_list = [(rng.choice(type_ids), rng.random() < 0.5) for _ in range(lookups)]
+
+    getters = ["get_name_by_id", "get_groupname_by_id", "get_category_by_id", "get_market_group_list"]
+    for getter in getters:
+        print(f"{getter}:")
+        # 原有路径缓存命中：aiocache 内存后端 + PickleSerializer
+        aiocache_getter = cached(ttl=3600, serializer=PickleSerializer())(
+            lambda type_id, zh, _getter=getattr(table, getter): _async_value(_getter(type_id, zh))
+        )
+        for args in set(args_list):
+            await aiocache_getter(*args)
+        aiocache_us = await bench("aiocache 命中 (PickleSerializer)", aiocache_getter, args_list)
+
+        if not use_db:
+            sde_memory.__dict__.update(table.__dict__)
+        memory_us = await bench("memory (SdeUtils)", getattr(SdeUtils, getter), args_list)
+        print(f"  memory 相对 aiocache 命中: {aiocache_us / memory_us:.1f}x")
+
+        if use_db:
+            sde_memory._loaded = False
+            await bench("db (首次查询)", getattr(SdeUtils, getter), list(set(args_list))[:2000])
+            sde_memory._loaded = True
+
+    if use_db:
+        await SdeUtils.close_database()
+
+
+async def _async_value(value):
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SDE 内存表基准测试")
+    parser.add_argument("--types", type=int, default=50000, help="模拟物品数量（--db 时忽略）")
+    parser.add_argument("--lookups", type=int, default=20000, help="每种查询的次数")
+    parser.add_argument("--db", action="store_true", help="从配置的 SDE 数据库加载并测试数据库查询")
+    args = parser.parse_args()
+    asyncio.run(run(args.types, args.lookups, args.db))
+
+
+if __name__ == "__main__":
+    main()
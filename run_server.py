@@ -41,6 +41,20 @@ async def cleanup_resources():
         await shutdown_esi_manager()
     except Exception as e:
         print(f"[清理] ESI 管理器关闭时出错: {e}")
+
+    try:
+        # 关闭图标下载会话
+        from src_v2.core.picture_render.downloader import icon_store
+        await icon_store.close()
+    except Exception as e:
+        print(f"[清理] 图标下载会话关闭时出错: {e}")
+
+    try:
+        # 关闭图片渲染浏览器池（Chromium 未处理退出信号，需要主动关闭）
+        from src_v2.core.picture_render.browser_pool import browser_pool
+        await browser_pool.close()
+    except Exception as e:
+        print(f"[清理] 图片渲染浏览器池关闭时出错: {e}")
     
     try:
         # 关闭 Neo4j 连接
@@ -129,6 +143,11 @@ async def main():
     await init_database()
     from src_v2.model.EVE.sde.utils import SdeUtils
     await SdeUtils.init_database()
+    from src_v2.model.EVE.industry.blueprint_graph import blueprint_graph
+    await blueprint_graph.load()
+    from src_v2.model.EVE.sde.sde_memory import sde_memory, SDE_IN_MEMORY
+    if SDE_IN_MEMORY:
+        await sde_memory.load()
     await init_esi_manager()
     await permission_manager.init_base_roles()
 
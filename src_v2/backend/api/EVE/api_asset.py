@@ -223,7 +223,7 @@ async def delete_asset_pull_mission():
         logger.error(f"删除资产拉取任务失败: {traceback.format_exc()}")
         return jsonify({"status": 500, "message": "删除资产拉取任务失败"}), 500
 
-async def start_pull_asset_now(asset_owner_type: str, asset_owner_id: int):
+async def start_pull_asset_now(asset_owner_type: str, asset_owner_id: int, full_resync: bool = False):
     asset_status_key = f'asset_pull_mission_status:{asset_owner_type}:{asset_owner_id}'
     await rdm.r.hset(asset_status_key, mapping={
         'status': 'pulling',
@@ -234,7 +234,7 @@ async def start_pull_asset_now(asset_owner_type: str, asset_owner_id: int):
         "is_indeterminate": 0
     })
     try:
-        await AssetManager().pull_asset_now(asset_owner_type, asset_owner_id)
+        await AssetManager().pull_asset_now(asset_owner_type, asset_owner_id, full_resync)
         await rdm.r.hset(asset_status_key, mapping={
             'status': 'success',
             'total_page': 0,
@@ -262,6 +262,8 @@ async def pull_asset_now():
         data = await request.json
         asset_owner_type = data.get('asset_owner_type')
         asset_owner_id = data.get('asset_owner_id')
+        # 为 True 时清空后全量重建，否则与上次导入的快照比较后增量同步
+        full_resync = bool(data.get('full_resync', False))
         
         # 获取上次拉取时间（异步操作）
         last_pull_time_str = await rdm.r.get(f"asset_pull_mission_last_pull_time:{asset_owner_type}:{asset_owner_id}")
@@ -285,7 +287,7 @@ async def pull_asset_now():
             except (ValueError, AttributeError) as e:
                 logger.warning(f"解析上次拉取时间失败: {e}")
 
-        asyncio.create_task(start_pull_asset_now(asset_owner_type, asset_owner_id))
+        asyncio.create_task(start_pull_asset_now(asset_owner_type, asset_owner_id, full_resync))
 
         # 设置本次拉取时间（异步操作）
         await rdm.r.set(f"asset_pull_mission_last_pull_time:{asset_owner_type}:{asset_owner_id}", get_beijing_utctime(datetime.now()).isoformat())
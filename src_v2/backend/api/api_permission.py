@@ -229,12 +229,7 @@ async def add_role_hierarchy():
         if parent_role_name == child_role_name:
             return jsonify({"status": 400, "message": "父角色和子角色不能相同"}), 400
         
-        from src_v2.core.database.model import RoleHierarchy as M_RoleHierarchy
-        hierarchy_obj = M_RoleHierarchy(
-            parent_role_name=parent_role_name,
-            child_role_name=child_role_name
-        )
-        await RoleHierarchyDBUtils.save_obj(hierarchy_obj)
+        await permission_manager.add_role_hierarchy(parent_role_name, child_role_name)
         
         return jsonify({"status": 200, "message": "角色层级关系添加成功"})
     except KahunaException as e:
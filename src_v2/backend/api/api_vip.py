@@ -5,6 +5,7 @@ from src_v2.core.log import logger
 import traceback
 from src_v2.core.utils import KahunaException
 from src_v2.core.database.kahuna_database_utils_v2 import VipStateDBUtils, UserDBUtils
+from src_v2.core.permission.permission_manager import permission_manager
 from src_v2.core.database.connect_manager import postgres_manager as dbm
 from sqlalchemy import select
 from datetime import datetime
@@ -76,7 +77,7 @@ async def update_vip_state(user_name: str):
                 return jsonify({"status": 400, "message": f"日期时间格式错误: {str(e)}"}), 400
         
         # 更新VIP状态
-        await VipStateDBUtils.update_vip_state(
+        await permission_manager.update_vip_state(
             user_name=user_name,
             vip_level=vip_level,
             vip_end_date=vip_end_date
@@ -3,7 +3,7 @@ import jwt
 from functools import wraps
 from quart import request, jsonify, g
 from quart import current_app as app
-from src_v2.core.permission.permission_manager import permission_manager
+from src_v2.core.permission.permission_resolver import permission_resolver
 
 from src_v2.core.log import logger
 
@@ -12,34 +12,12 @@ def permission_required(req_permissions: list[str]):
     def decorator(f):
         @wraps(f)
         async def decorated_function(*args, **kwargs):
-            # 在请求执行时检查权限
+            # 在请求执行时检查权限，有效权限（已展开 write→read）由 permission_resolver 解析并缓存
             user_id = g.current_user['user_id']
-            for permission in req_permissions:
-                per_name = permission.split(":")[0]
-                per_action = permission.split(":")[1]
-
-            roles = await permission_manager.get_user_roles(user_id)
-            permissions = []
-            for role in roles:
-                role_permissions = await permission_manager.get_role_permissions(role)
-                permissions.extend(role_permissions)
-            user_permissions = await permission_manager.get_user_permissions(user_id)
-            permissions.extend(user_permissions)
-
-            # 检查permission，只有write的权限添加read
-            permissions_set = set(permissions)
-            for perm in list(permissions_set):
-                if perm.endswith(':write'):
-                    per_name = perm.rsplit(':', 1)[0]
-                    read_perm = f"{per_name}:read"
-                    if read_perm not in permissions_set:
-                        permissions_set.add(read_perm)
-            permissions = list(permissions_set)
-
-            permission_access = all(perm in permissions for perm in req_permissions)
+            resolved = await permission_resolver.resolve(user_id)
 
             # 检查权限
-            if not permission_access:
+            if not resolved.has_permissions(req_permissions):
                 logger.error(f"{f.__name__}: 用户 {user_id} 权限不足，缺少权限 {req_permissions}")
                 return jsonify({'error': '权限不足'}), 403
             
@@ -52,29 +30,11 @@ def role_required(req_roles: list[str], res_code = 403, message: str = '权限
         @wraps(f)
         async def decorated_function(*args, **kwargs):
             user_id = g.current_user['user_id']
-            # 获取用户直接拥有的角色
-            direct_roles = await permission_manager.get_user_roles(user_id)
-            
-            # 获取所有角色（直接角色 + 所有子角色）
-            all_roles = set(direct_roles)
-            for role in direct_roles:
-                # 递归获取该角色的所有子角色
-                descendant_roles = await permission_manager.get_all_descendant_roles(role)
-                all_roles.update(descendant_roles)
-            
-            # 获取vip等级
-            vip_state = await permission_manager.get_vip_state(user_id)
-            if vip_state:
-                logger.info(f"vip_state: {vip_state.vip_level}")
-                all_roles.add(vip_state.vip_level)
-            else:
-                logger.info(f"vip_state: None")
+            # 角色集合（直接角色 + 所有子角色 + 未到期的vip等级）由 permission_resolver 解析并缓存
+            resolved = await permission_resolver.resolve(user_id)
 
             # 检查所需的角色是否在扩展后的角色集合中
-            role_access = all(role in all_roles for role in req_roles)
-            logger.info(f"all_roles: {all_roles}")
-            logger.info(f"req_roles: {req_roles}")
-            if not role_access:
+            if not resolved.has_roles(req_roles):
                 if "vip_alpha" in req_roles or "vip_omega" in req_roles:
                     return jsonify({'message': message}), res_code
                 else:
@@ -82,4 +42,4 @@ def role_required(req_roles: list[str], res_code = 403, message: str = '权限
                     return jsonify({'message': message}), res_code
             return await f(*args, **kwargs)
         return decorated_function
-    return decorator
\ No newline at end of file
+    return decorator
@@ -1,4 +1,4 @@
-from typing import AnyStr, AsyncGenerator
+from typing import AnyStr, AsyncGenerator, List
 from sqlalchemy import delete, select, text, func, distinct, or_
 from sqlalchemy.dialects.sqlite import insert as insert
 from sqlalchemy.orm import aliased
@@ -715,6 +715,16 @@ class EveIndustryPlanConfigFlowConfigDBUtils(_CommonUtils):
             result = await session.execute(stmt)
             return result.scalars().first()
 
+    @classmethod
+    async def select_by_ids(cls, ids: List[int]):
+        """一次查询多个配置，返回 {id: config}"""
+        if not ids:
+            return {}
+        async with dbm.get_session() as session:
+            stmt = select(cls.cls_model).where(cls.cls_model.id.in_(ids))
+            result = await session.execute(stmt)
+            return {config.id: config for config in result.scalars().all()}
+
 class EveIndustryPlanConfigFlowDBUtils(_CommonUtils):
     cls_model = model.EveIndustryPlanConfigFlow
 
@@ -873,4 +883,80 @@ class EveAssetViewDBUtils(_CommonUtils):
     @classmethod
     async def select_by_user_name(cls, user_name: str):
         stmt = select(cls.cls_model).where(cls.cls_model.user_name == user_name)
-        return await _AsyncIteratorWrapper.from_stmt(stmt)
\ No newline at end of file
+        return await _AsyncIteratorWrapper.from_stmt(stmt)
+
+class _MarketOrderStaging:
+    """market_order 暂存表写入器
+
+    在单个 asyncpg 连接上创建临时暂存表，逐页 COPY 写入；
+    swap 时在一个事务内删除目标范围的旧订单并从暂存表插入，读者只会看到替换前或替换后的完整数据。
+    """
+    def __init__(self, connection, columns):
+        self._connection = connection
+        self._columns = columns
+        self.record_count = 0
+
+    async def copy(self, records):
+        """以 COPY 写入一批订单元组，元组顺序与 MarketOrderDBUtils.COPY_COLUMNS 一致"""
+        if not records:
+            return
+        await self._connection.copy_records_to_table(
+            'market_order_staging', records=records, columns=self._columns
+        )
+        self.record_count += len(records)
+
+    async def swap(self, scope_column: str, scope_value):
+        """用暂存表替换 market_order 中 scope_column == scope_value 的订单"""
+        table_name = MarketOrderDBUtils.cls_model.__tablename__
+        columns = ", ".join(f'"{column}"' for column in self._columns)
+        async with self._connection.transaction():
+            await self._connection.execute(
+                f'DELETE FROM "{table_name}" WHERE "{scope_column}" = $1', scope_value
+            )
+            # ESI 翻页期间订单可能在页间移动，按 order_id 去重
+            await self._connection.execute(
+                f'INSERT INTO "{table_name}" ({columns}) '
+                f'SELECT DISTINCT ON ("order_id") {columns} FROM market_order_staging '
+                f'ON CONFLICT ("order_id") DO NOTHING'
+            )
+
+
+class MarketOrderDBUtils(_CommonUtils):
+    cls_model = model.MarketOrder
+    COPY_COLUMNS = (
+        'order_id', 'type_id', 'location_id', 'system_id', 'is_buy_order', 'price',
+        'volume_remain', 'volume_total', 'min_volume', 'duration', 'issued', 'range'
+    )
+
+    @classmethod
+    def to_record(cls, order: dict) -> tuple:
+        """ESI 订单字典转为 COPY 元组"""
+        return (
+            order["order_id"], order["type_id"], order["location_id"], order.get("system_id"),
+            order["is_buy_order"], order["price"], order["volume_remain"], order["volume_total"],
+            order.get("min_volume"), order["duration"], order["issued"], order["range"]
+        )
+
+    @classmethod
+    @asynccontextmanager
+    async def staging(cls):
+        """获取暂存表写入器
+
+        使用方式：
+            async with MarketOrderDBUtils.staging() as staging:
+                await staging.copy(records)
+                await staging.swap('location_id', location_id)
+        未调用 swap 时 market_order 保持不变。
+        """
+        async with dbm.engine.connect() as conn:
+            raw_connection = await conn.get_raw_connection()
+            connection = raw_connection.driver_connection
+            await connection.execute(
+                f'CREATE TEMP TABLE IF NOT EXISTS market_order_staging '
+                f'(LIKE "{cls.cls_model.__tablename__}" INCLUDING DEFAULTS)'
+            )
+            await connection.execute('TRUNCATE market_order_staging')
+            try:
+                yield _MarketOrderStaging(connection, cls.COPY_COLUMNS)
+            finally:
+                await connection.execute('DROP TABLE IF EXISTS market_order_staging')
@@ -247,6 +247,23 @@ class EveIndustryPlanConfigFlowPresupposition(PostgreModel):
     config_list = Column(ARRAY(Integer))
 all_model.append(EveIndustryPlanConfigFlowPresupposition)
 
+# 市场订单，由 MarketManager 通过暂存表整体替换写入
+class MarketOrder(PostgreModel):
+    __tablename__ = 'market_order'
+    order_id = Column(BigInteger, primary_key=True)
+    type_id = Column(Integer, index=True)
+    location_id = Column(BigInteger, index=True)
+    system_id = Column(Integer)
+    is_buy_order = Column(Boolean)
+    price = Column(Float)
+    volume_remain = Column(Integer)
+    volume_total = Column(Integer)
+    min_volume = Column(Integer)
+    duration = Column(Integer)
+    issued = Column(Text)
+    range = Column(Text)
+all_model.append(MarketOrder)
+
 
 # class EveIndustryPlanSetting(PostgreModel):
 #     __tablename__ = 'eve_industry_plan_setting'
@@ -14,6 +14,59 @@ if TYPE_CHECKING:
     from .neo4j_models import Asset
 
 
+def _is_deadlock_error(e: TransientError) -> bool:
+    """判断 TransientError 是否为死锁错误"""
+    error_code = getattr(e, 'code', '') or ''
+    return (
+        'DeadlockDetected' in str(e) or
+        'Neo.TransientError.Transaction.DeadlockDetected' in error_code
+    )
+
+
+async def _run_batch_query(
+        query: str, rows: List[Any], result_key: str, chunk_size: int, max_retries: int, desc: str,
+        params: Optional[Dict[str, Any]] = None
+) -> int:
+    """按 chunk_size 切分 rows，每个分片执行一次 UNWIND $rows 语句，死锁时指数退避重试
+    params 为各分片共用的其他查询参数
+
+    Returns:
+        int: 各分片 result_key 返回值之和
+    """
+    total = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        for attempt in range(max_retries):
+            try:
+                async with neo4j_manager.get_transaction() as tx:
+                    result = await tx.run(query, {**(params or {}), "rows": chunk})
+                    record = await result.single()
+                    total += record[result_key] if record else 0
+                    break
+            except TransientError as e:
+                if _is_deadlock_error(e) and attempt < max_retries - 1:
+                    # 指数退避：等待时间 = 0.1 * (2^attempt) 秒，最大2秒
+                    wait_time = min(0.1 * (2 ** attempt), 2.0)
+                    logger.debug(
+                        f"检测到死锁错误，正在重试 ({attempt + 1}/{max_retries}): "
+                        f"{desc}, rows={len(chunk)}，等待 {wait_time:.2f} 秒后重试"
+                    )
+                    await asyncio.sleep(wait_time)
+                    continue
+                logger.error(f"批量写入失败: {desc}, rows={len(chunk)}, 错误: {str(e)}")
+                raise
+    return total
+
+
+def _drop_none(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """去掉值为 None 的属性
+
+    SET n += map 时 None 会删除属性；去掉 None 后等价于 merge_node / link_node 的
+    ON CREATE SET n.k = v / ON MATCH SET n.k = COALESCE(v, n.k) 语义。
+    """
+    return {key: value for key, value in properties.items() if value is not None}
+
+
 class Neo4jAssetUtils:
     """Asset 相关的 CRUD 操作"""
     @staticmethod
@@ -301,6 +354,34 @@ class Neo4jAssetUtils:
             DETACH DELETE a
             """
             await tx.run(query, {"owner_id": owner_id})
+
+    @staticmethod
+    async def delete_assets_by_item_ids(owner_id: int, item_ids: List[int], chunk_size: int = 5000) -> int:
+        """按 item_id 批量删除资产节点及其关系，用于增量同步中已消失的资产"""
+        query = """
+        UNWIND $rows AS item_id
+        MATCH (a:Asset {owner_id: $owner_id, item_id: item_id})
+        DETACH DELETE a
+        RETURN count(*) AS deleted_count
+        """
+        return await _run_batch_query(
+            query, list(item_ids), "deleted_count", chunk_size, 50,
+            f"delete_assets owner_id={owner_id}", params={"owner_id": owner_id}
+        )
+
+    @staticmethod
+    async def delete_asset_locations(owner_id: int, item_ids: List[int], chunk_size: int = 5000) -> int:
+        """按 item_id 批量删除资产的 LOCATED_IN 出边，用于增量同步中位置变化的资产，保留节点和入边"""
+        query = """
+        UNWIND $rows AS item_id
+        MATCH (a:Asset {owner_id: $owner_id, item_id: item_id})-[r:LOCATED_IN]->()
+        DELETE r
+        RETURN count(r) AS deleted_count
+        """
+        return await _run_batch_query(
+            query, list(item_ids), "deleted_count", chunk_size, 50,
+            f"delete_asset_locations owner_id={owner_id}", params={"owner_id": owner_id}
+        )
     
     @staticmethod
     async def search_container_by_item_name(owner_ids: List[int], type_id: int):
@@ -885,6 +966,137 @@ class Neo4jIndustryUtils:
         # 如果所有重试都失败了（不应该到达这里，因为会在循环中抛出异常）
         return False
 
+    @staticmethod
+    async def merge_node_batch(
+        node_label: str,
+        node_rows: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+        chunk_size: int = 1000,
+        max_retries: int = 50
+    ) -> int:
+        """批量新建或更新节点，语义与 merge_node 相同
+
+        Args:
+            node_label: 节点的标签
+            node_rows: [(node_index, node_properties), ...]
+            chunk_size: 每个事务写入的行数
+            max_retries: 最大重试次数（用于处理死锁错误，默认50次）
+
+        Returns:
+            int: 合并的节点数量
+
+        功能说明：
+            1. 按 node_index 的键集合分组，每组生成一条 UNWIND $rows MERGE 语句
+            2. 属性中的 None 会被去掉，已存在节点的对应属性保持不变（等价于 COALESCE）
+            3. 每个分片一个事务，自动处理死锁错误
+        """
+        if not node_rows:
+            return 0
+
+        grouped_rows: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for node_index, node_properties in node_rows:
+            if not node_index:
+                logger.warning("node_index 不能为空")
+                continue
+            grouped_rows.setdefault(tuple(node_index.keys()), []).append({
+                "index": node_index,
+                "properties": _drop_none(node_properties or {})
+            })
+
+        merged_count = 0
+        for index_keys, rows in grouped_rows.items():
+            merge_where = ", ".join([f"{key}: row.index.{key}" for key in index_keys])
+            query = f"""
+            UNWIND $rows AS row
+            MERGE (n:{node_label} {{{merge_where}}})
+            SET n += row.properties
+            RETURN count(n) AS merged_count
+            """
+            merged_count += await _run_batch_query(
+                query, rows, "merged_count", chunk_size, max_retries, f"node_label={node_label}"
+            )
+
+        logger.debug(f"批量节点合并完成: node_label={node_label}, rows={len(node_rows)}, merged_count={merged_count}")
+        return merged_count
+
+    @staticmethod
+    async def link_node_batch(
+        node_label: str,
+        relation_label: str,
+        target_node_label: str,
+        link_rows: List[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any], Dict[str, Any], Dict[str, Any], Dict[str, Any]]],
+        chunk_size: int = 1000,
+        max_retries: int = 50
+    ) -> int:
+        """批量连接节点，语义与 link_node 相同
+
+        Args:
+            node_label: 源节点的标签
+            relation_label: 关系的标签
+            target_node_label: 目标节点的标签
+            link_rows: [(node_index, node_properties, relation_index, relation_properties,
+                         target_node_index, target_node_properties), ...]
+            chunk_size: 每个事务写入的行数
+            max_retries: 最大重试次数（用于处理死锁错误，默认50次）
+
+        Returns:
+            int: 合并的关系数量
+
+        功能说明：
+            1. 按 (node_index, relation_index, target_node_index) 的键集合分组，每组生成一条 UNWIND $rows 语句
+            2. MERGE 源节点、目标节点和关系；relation_index 不为空时参与关系的 MERGE 匹配，并写入关系属性
+            3. 属性中的 None 会被去掉，已存在节点/关系的对应属性保持不变（等价于 COALESCE）
+            4. 每个分片一个事务，自动处理死锁错误
+        """
+        if not link_rows:
+            return 0
+
+        grouped_rows: Dict[Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]], List[Dict[str, Any]]] = {}
+        for node_index, node_properties, relation_index, relation_properties, target_node_index, target_node_properties in link_rows:
+            if not node_index or not target_node_index:
+                logger.warning("node_index 和 target_node_index 不能为空")
+                continue
+            relation_index = relation_index or {}
+            # 将 relation_index 的属性合并到 relation_properties 中
+            relation_properties = {**relation_index, **(relation_properties or {})}
+            group_key = (tuple(node_index.keys()), tuple(relation_index.keys()), tuple(target_node_index.keys()))
+            grouped_rows.setdefault(group_key, []).append({
+                "source_index": node_index,
+                "source_properties": _drop_none(node_properties or {}),
+                "relation_index": relation_index,
+                "relation_properties": _drop_none(relation_properties),
+                "target_index": target_node_index,
+                "target_properties": _drop_none(target_node_properties or {}),
+            })
+
+        linked_count = 0
+        for (source_keys, relation_keys, target_keys), rows in grouped_rows.items():
+            source_where = ", ".join([f"{key}: row.source_index.{key}" for key in source_keys])
+            target_where = ", ".join([f"{key}: row.target_index.{key}" for key in target_keys])
+            relation_where = ", ".join([f"{key}: row.relation_index.{key}" for key in relation_keys])
+            relation_merge_pattern = f"[r:{relation_label}]" if not relation_where else f"[r:{relation_label} {{{relation_where}}}]"
+            query = f"""
+            UNWIND $rows AS row
+            MERGE (source:{node_label} {{{source_where}}})
+            SET source += row.source_properties
+            WITH row, source
+            MERGE (target:{target_node_label} {{{target_where}}})
+            SET target += row.target_properties
+            WITH row, source, target
+            MERGE (source)-{relation_merge_pattern}->(target)
+            SET r += row.relation_properties
+            RETURN count(r) AS linked_count
+            """
+            linked_count += await _run_batch_query(
+                query, rows, "linked_count", chunk_size, max_retries,
+                f"{node_label} -[{relation_label}]-> {target_node_label}"
+            )
+
+        logger.debug(
+            f"批量节点连接完成: {node_label} -[{relation_label}]-> {target_node_label}, "
+            f"rows={len(link_rows)}, linked_count={linked_count}"
+        )
+        return linked_count
+
     @staticmethod
     async def get_blueprint_tree(type_id: int) -> Tuple[Dict, List[Tuple[int, int, Dict]]]:
         async with neo4j_manager.get_session() as session:
@@ -933,6 +1145,32 @@ class Neo4jIndustryUtils:
 
             return nodes_dict, relationships_list
 
+    @staticmethod
+    async def get_nodes_properties_batch(node_label: str, index_key: str, index_values: List[Any]) -> Dict[Any, Dict[str, Any]]:
+        """按单个索引属性批量获取节点属性
+
+        Args:
+            node_label: 节点的标签
+            index_key: 索引属性名（如 "type_id"）
+            index_values: 索引属性值列表
+
+        Returns:
+            Dict[Any, Dict[str, Any]]: {索引属性值: 节点属性}，不存在的节点不返回
+        """
+        if not index_values:
+            return {}
+        async with neo4j_manager.get_session() as session:
+            query = f"""
+            UNWIND $values AS value
+            MATCH (n:{node_label} {{{index_key}: value}})
+            RETURN value, n
+            """
+            result = await session.run(query, {"values": list(index_values)})
+            nodes_dict = {}
+            async for record in result:
+                nodes_dict[record["value"]] = dict(record["n"].items())
+            return nodes_dict
+
     @staticmethod
     async def get_relations(
         relation_label: str,
@@ -1400,6 +1638,68 @@ class Neo4jIndustryUtils:
         # 理论上不应该到达这里（所有重试都应该抛出异常或返回），但为了类型检查添加
         return 0
 
+    @staticmethod
+    async def update_relation_properties_batch(
+        relation_label: str,
+        relation_rows: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+        chunk_size: int = 5000,
+        max_retries: int = 50
+    ) -> int:
+        """批量更新已存在关系的属性（UNWIND 参数化语句）
+
+        Args:
+            relation_label: 关系的标签（如 "PLAN_BP_DEPEND_ON"）
+            relation_rows: [(relation_index, relation_properties), ...]
+                - 所有行的 relation_index 必须使用相同的键集合
+            chunk_size: 每个事务处理的行数
+            max_retries: 最大重试次数（用于处理死锁错误，默认50次）
+
+        Returns:
+            int: 更新的关系数量
+
+        功能说明：
+            与 update_relation_properties 语义一致，但每 chunk_size 行只执行一条
+            UNWIND 语句，避免逐条关系开启事务。
+
+        示例：
+            await Neo4jIndustryUtils.update_relation_properties_batch(
+                "PLAN_BP_DEPEND_ON",
+                [
+                    ({"user_name": "user1", "plan_name": "plan1", "index_id": 1, "product": 12345, "material": 67890},
+                     {"quantity": 20, "status": "complete"}),
+                ]
+            )
+        """
+        if not relation_rows:
+            return 0
+
+        index_keys = list(relation_rows[0][0].keys())
+        if not index_keys:
+            logger.warning("relation_index 不能为空")
+            return 0
+
+        where_clause = " AND ".join([f"r.{key} = row.index.{key}" for key in index_keys])
+        query = f"""
+        UNWIND $rows AS row
+        MATCH ()-[r:{relation_label}]->()
+        WHERE {where_clause}
+        SET r += row.properties
+        RETURN count(r) AS updated_count
+        """
+        rows = [
+            {"index": relation_index, "properties": relation_properties}
+            for relation_index, relation_properties in relation_rows
+        ]
+        updated_count = await _run_batch_query(
+            query, rows, "updated_count", chunk_size, max_retries, f"relation_label={relation_label}"
+        )
+
+        logger.debug(
+            f"批量关系属性更新完成: relation_label={relation_label}, "
+            f"rows={len(relation_rows)}, updated_count={updated_count}"
+        )
+        return updated_count
+
     @staticmethod
     async def delete_label_node(label: str):
         """删除指定标签的节点"""
@@ -12,6 +12,7 @@ from ..database.kahuna_database_utils_v2 import (
 )
 from ..database.connect_manager import postgres_manager as dbm, redis_manager as rdm
 from ..log import logger
+from .permission_resolver import permission_resolver
 import uuid
 from datetime import datetime
 from ..database.model import (
@@ -130,6 +131,7 @@ class PermissionManager():
             except Exception as e:
                 # 事务会自动在异常时回滚
                 raise ValueError(f"Failed to delete role {role_name}: {str(e)}") from e
+        await permission_resolver.invalidate_all()
 
     async def create_permission(self, permission_name: str, permission_description: str):
         permission_obj = await PermissionsDBUtils.select_permission_by_permission_name(permission_name)
@@ -162,6 +164,7 @@ class PermissionManager():
             await PermissionsDBUtils.delete_obj(permission_obj)
         else:
             raise ValueError(f"Permission {permission_name} does not exist")
+        await permission_resolver.invalidate_all()
 
     async def add_permissions_to_role(self, role_name: str, permission_name: str):
         role_obj = await RolesDBUtils.select_role_by_role_name(role_name)
@@ -176,12 +179,14 @@ class PermissionManager():
         await RolePermissionsDBUtils.save_obj(M_RolePermissions(
             role_name=role_name,
             permission_name=permission_name))
+        await permission_resolver.invalidate_all()
 
     async def remove_permissions_from_role(self, role_name: str, permission_name: str):
         role_permission_obj = await RolePermissionsDBUtils.select_role_permission_by_role_name_and_permission_name(role_name, permission_name)
         if not role_permission_obj:
             raise ValueError(f"Role {role_name} does not have permission {permission_name}")
         await RolePermissionsDBUtils.delete_obj(role_permission_obj)
+        await permission_resolver.invalidate_all()
 
     async def add_role_to_user(self, user_name: str, role_name: str):
         user_obj = await UserDBUtils.select_user_by_user_name(user_name)
@@ -196,12 +201,14 @@ class PermissionManager():
         await UserRolesDBUtils.save_obj(M_UserRoles(
             user_name=user_name,
             role_name=role_name))
+        await permission_resolver.invalidate_user(user_name)
 
     async def remove_role_from_user(self, user_name: str, role_name: str):
         user_role_obj = await UserRolesDBUtils.select_user_role_by_user_name_and_role_name(user_name, role_name)
         if not user_role_obj:
             raise ValueError(f"User {user_name} does not have role {role_name}")
         await UserRolesDBUtils.delete_obj(user_role_obj)
+        await permission_resolver.invalidate_user(user_name)
 
     async def get_role_permissions(self, role_name: str):
         role_permission_obj = await RolePermissionsDBUtils.select_role_permissions_by_role_name(role_name)
@@ -295,8 +302,15 @@ class PermissionManager():
         collected.discard(role_name)
         return list(collected)
 
+    async def add_role_hierarchy(self, parent_role_name: str, child_role_name: str):
+        await RoleHierarchyDBUtils.save_obj(M_RoleHierarchy(
+            parent_role_name=parent_role_name,
+            child_role_name=child_role_name))
+        await permission_resolver.invalidate_all()
+
     async def delete_role_hierarchys(self, hierarchy_pairs: list[list[str]]):
         await RoleHierarchyDBUtils.delete_hierarchy_by_role_names(hierarchy_pairs)
+        await permission_resolver.invalidate_all()
 
     async def init_base_roles(self):
         await self.create_role('admin', role_description='管理员')
@@ -468,4 +482,13 @@ class PermissionManager():
             return None
         return vip_state_obj
 
+    async def update_vip_state(self, user_name: str, vip_level: str = None, vip_end_date: datetime = None):
+        vip_state_obj = await VipStateDBUtils.update_vip_state(
+            user_name=user_name,
+            vip_level=vip_level,
+            vip_end_date=vip_end_date
+        )
+        await permission_resolver.invalidate_user(user_name)
+        return vip_state_obj
+
 permission_manager = PermissionManager()
\ No newline at end of file
@@ -0,0 +1,180 @@
+"""
+权限解析缓存
+把用户的有效权限集合与角色集合一次解析后缓存在 Redis，鉴权装饰器每次请求只需一次 Redis 往返和集合查找：
+    permission_cache:version                  全局版本，角色权限、角色层级、角色/权限删除时自增
+    permission_cache:user_version:{user}      用户版本，用户角色、VIP 状态变更时自增
+    permission_cache:user:{user}              解析结果 {"version", "user_version", "permissions", "roles", "vip_level", "vip_end_date"}
+版本变化后旧的解析结果不再命中，由 TTL 自然过期。
+VIP 到期时间随解析结果保存，到期后不再计入角色，不需要额外失效。
+"""
+
+# 标准库导入
+import json
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+# 本地导入
+from ..config.config import config
+from ..database.connect_manager import redis_manager as rdm
+from ..database.kahuna_database_utils_v2 import (
+    RolePermissionsDBUtils,
+    RoleHierarchyDBUtils,
+    UserRolesDBUtils,
+    UserPermissionsDBUtils,
+    VipStateDBUtils
+)
+from ..log import logger
+
+PERMISSION_CACHE_TTL = config.getint('PERMISSION', 'Permission_Cache_TTL', fallback=3600)
+
+VERSION_KEY = "permission_cache:version"
+
+
+def _user_version_key(user_name: str) -> str:
+    return f"permission_cache:user_version:{user_name}"
+
+
+def _user_key(user_name: str) -> str:
+    return f"permission_cache:user:{user_name}"
+
+
+def expand_permissions(permissions: Iterable[str]) -> Set[str]:
+    """拥有 write 权限时同时拥有对应的 read 权限"""
+    permissions_set = set(permissions)
+    for perm in list(permissions_set):
+        if perm.endswith(':write'):
+            permissions_set.add(f"{perm.rsplit(':', 1)[0]}:read")
+    return permissions_set
+
+
+def role_closure(roles: Iterable[str], children: Dict[str, List[str]]) -> Set[str]:
+    """角色及其所有后代角色，children 为 {父角色: [子角色, ...]}"""
+    collected = set()
+    stack = list(roles)
+    while stack:
+        role = stack.pop()
+        if role in collected:
+            continue  # 避免循环引用
+        collected.add(role)
+        stack.extend(children.get(role, []))
+    return collected
+
+
+class ResolvedPermissions:
+    """一个用户解析后的权限与角色，permissions 已展开 write→read，roles 已包含所有后代角色"""
+
+    def __init__(self, permissions: Set[str], roles: Set[str],
+                 vip_level: Optional[str] = None, vip_end_date: Optional[float] = None):
+        self.permissions = permissions
+        self.roles = roles
+        self.vip_level = vip_level
+        self.vip_end_date = vip_end_date
+
+    @property
+    def all_roles(self) -> Set[str]:
+        """角色集合加上未到期的 VIP 等级"""
+        if self.vip_level and self.vip_end_date is not None and self.vip_end_date > time.time():
+            return self.roles | {self.vip_level}
+        return self.roles
+
+    def has_permissions(self, req_permissions: Iterable[str]) -> bool:
+        return all(perm in self.permissions for perm in req_permissions)
+
+    def has_roles(self, req_roles: Iterable[str]) -> bool:
+        all_roles = self.all_roles
+        return all(role in all_roles for role in req_roles)
+
+    def to_dict(self) -> dict:
+        return {
+            "permissions": sorted(self.permissions),
+            "roles": sorted(self.roles),
+            "vip_level": self.vip_level,
+            "vip_end_date": self.vip_end_date,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ResolvedPermissions":
+        return cls(set(data["permissions"]), set(data["roles"]), data.get("vip_level"), data.get("vip_end_date"))
+
+
+class PermissionResolver:
+    """用户权限解析与缓存，Redis 读写失败时退化为每次从数据库解析"""
+
+    async def resolve(self, user_name: str) -> ResolvedPermissions:
+        try:
+            version, user_version, cached = await rdm.r.mget(
+                VERSION_KEY, _user_version_key(user_name), _user_key(user_name)
+            )
+        except Exception as e:
+            logger.debug(f"读取权限缓存失败: {e}")
+            return await self._build(user_name)
+        version = int(version) if version else 0
+        user_version = int(user_version) if user_version else 0
+
+        if cached:
+            data = json.loads(cached)
+            if data.get("version") == version and data.get("user_version") == user_version:
+                return ResolvedPermissions.from_dict(data)
+
+        # 使用解析前读到的版本写入，解析期间发生的变更会使这份结果在下一次读取时失效
+        resolved = await self._build(user_name)
+        try:
+            await rdm.r.set(
+                _user_key(user_name),
+                json.dumps({"version": version, "user_version": user_version, **resolved.to_dict()}, ensure_ascii=False),
+                ex=PERMISSION_CACHE_TTL
+            )
+        except Exception as e:
+            logger.debug(f"写入权限缓存失败: {e}")
+        return resolved
+
+    @staticmethod
+    async def _build(user_name: str) -> ResolvedPermissions:
+        direct_roles = []
+        async for user_role_obj in await UserRolesDBUtils.select_user_roles_by_user_name(user_name):
+            direct_roles.append(user_role_obj.role_name)
+
+        # 权限来自用户直接拥有的角色和用户自身的权限
+        permissions = []
+        for role in direct_roles:
+            async for role_permission_obj in await RolePermissionsDBUtils.select_role_permissions_by_role_name(role):
+                permissions.append(role_permission_obj.permission_name)
+        async for user_permission_obj in await UserPermissionsDBUtils.select_user_permissions_by_user_name(user_name):
+            permissions.append(user_permission_obj.permission_name)
+
+        # 角色层级一次读出，在内存中求后代角色
+        children = defaultdict(list)
+        async for relationship in await RoleHierarchyDBUtils.select_all():
+            children[relationship.parent_role_name].append(relationship.child_role_name)
+
+        vip_level, vip_end_date = None, None
+        vip_state_obj = await VipStateDBUtils.select_vip_state_by_user_name(user_name)
+        if vip_state_obj and vip_state_obj.vip_level and vip_state_obj.vip_end_date:
+            vip_level, vip_end_date = vip_state_obj.vip_level, vip_state_obj.vip_end_date.timestamp()
+
+        return ResolvedPermissions(
+            expand_permissions(permissions),
+            role_closure(direct_roles, children),
+            vip_level,
+            vip_end_date
+        )
+
+    @staticmethod
+    async def invalidate_user(user_name: str):
+        """用户的角色、权限或 VIP 状态变更后调用"""
+        try:
+            await rdm.r.incr(_user_version_key(user_name))
+        except Exception as e:
+            logger.warning(f"权限缓存失效失败: {e}")
+
+    @staticmethod
+    async def invalidate_all():
+        """角色权限、角色层级变更或角色、权限被删除后调用，使所有用户的解析结果失效"""
+        try:
+            await rdm.r.incr(VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"权限缓存失效失败: {e}")
+
+
+permission_resolver = PermissionResolver()
@@ -0,0 +1,142 @@
+"""
+无头浏览器池
+常驻 size 个 Chromium 实例供图片渲染复用，避免每张图片都启动一次浏览器：
+    - 浏览器在第一次使用时启动，之后保持常驻
+    - 取出浏览器时做健康检查，进程退出或无响应时重新启动
+    - 每个浏览器渲染 max_renders 次后关闭重启，避免长时间运行的内存增长
+    - 每次渲染使用独立的页面，渲染结束后关闭，页面之间没有共享状态
+"""
+
+# 标准库导入
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+# 第三方库导入
+from pyppeteer import launch
+
+# 本地导入
+from src_v2.core.config.config import config
+from src_v2.core.log import logger
+
+BROWSER_POOL_SIZE = config.getint('PIC_RENDER', 'Browser_Pool_Size', fallback=2)
+BROWSER_MAX_RENDERS = config.getint('PIC_RENDER', 'Browser_Max_Renders', fallback=200)
+BROWSER_HEALTH_CHECK_TIMEOUT = config.getint('PIC_RENDER', 'Health_Check_Timeout', fallback=5)
+
+LAUNCH_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',  # 禁用GPU加速
+]
+
+
+class _PooledBrowser:
+    """池中的一个浏览器槽位，browser 为 None 表示尚未启动"""
+
+    def __init__(self):
+        self.browser = None
+        self.renders = 0
+
+
+class BrowserPool:
+    def __init__(self, size: int = BROWSER_POOL_SIZE, max_renders: int = BROWSER_MAX_RENDERS):
+        self.size = size
+        self.max_renders = max_renders
+        self._slots: Optional[asyncio.Queue] = None
+        self._all_slots = []
+
+    def _ensure_slots(self):
+        if self._slots is None:
+            self._slots = asyncio.Queue()
+            for _ in range(self.size):
+                slot = _PooledBrowser()
+                self._all_slots.append(slot)
+                self._slots.put_nowait(slot)
+
+    @staticmethod
+    async def _launch():
+        proxy = config.get('APP', 'PIC_RENDER_PROXY', fallback='')
+        proxy_arg = [proxy] if proxy else []
+
+        # 检查是否为 Linux 系统
+        if sys.platform.startswith('linux'):
+            # 启动浏览器，添加必要的参数以确保在Linux环境下正常运行
+            return await launch(
+                headless=True,
+                args=LAUNCH_ARGS + proxy_arg,
+                handleSIGINT=False, handleSIGTERM=False, handleSIGHUP=False
+            )
+        return await launch(
+            executablePath=r'C:\Program Files\Google\Chrome\Application\chrome.exe',
+            headless=True,
+            args=proxy_arg,
+            handleSIGINT=False, handleSIGTERM=False, handleSIGHUP=False
+        )
+
+    @staticmethod
+    async def _close_browser(slot: _PooledBrowser):
+        if slot.browser is None:
+            return
+        try:
+            await slot.browser.close()
+        except Exception as e:
+            logger.error(f"关闭浏览器时发生错误: {e}")
+        slot.browser = None
+        slot.renders = 0
+
+    @staticmethod
+    async def _is_healthy(slot: _PooledBrowser) -> bool:
+        process = getattr(slot.browser, 'process', None)
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            await asyncio.wait_for(slot.browser.version(), BROWSER_HEALTH_CHECK_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"浏览器健康检查失败: {e}")
+            return False
+        return True
+
+    async def _prepare(self, slot: _PooledBrowser):
+        """保证槽位中是一个可用的浏览器：达到渲染次数上限或不健康时重启"""
+        if slot.browser is not None and (slot.renders >= self.max_renders or not await self._is_healthy(slot)):
+            await self._close_browser(slot)
+        if slot.browser is None:
+            slot.browser = await self._launch()
+            slot.renders = 0
+
+    @asynccontextmanager
+    async def page(self, width: int, height: int) -> AsyncIterator:
+        """取出一个浏览器并打开新页面，退出时关闭页面、归还浏览器
+
+        池中浏览器都在使用时等待归还，渲染并发数即为池大小。
+        """
+        self._ensure_slots()
+        slot = await self._slots.get()
+        page = None
+        try:
+            await self._prepare(slot)
+            page = await slot.browser.newPage()
+            await page.setViewport({'width': width, 'height': height})
+            yield page
+        except Exception:
+            # 渲染异常时重启该浏览器，避免把异常状态留给下一次渲染
+            await self._close_browser(slot)
+            raise
+        finally:
+            if page is not None and slot.browser is not None:
+                try:
+                    await page.close()
+                except Exception as e:
+                    logger.warning(f"关闭页面时发生错误: {e}")
+            slot.renders += 1
+            self._slots.put_nowait(slot)
+
+    async def close(self):
+        """关闭池中所有浏览器，应用退出时调用"""
+        for slot in self._all_slots:
+            await self._close_browser(slot)
+
+
+browser_pool = BrowserPool()
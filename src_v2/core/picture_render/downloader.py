@@ -1,19 +1,193 @@
-import aiohttp
+"""
+图标 / 头像下载与本地存储
+IconStore 管理 {RESOURCE_PATH}/img 下的物品图标与角色头像：
+    - 所有下载共用一个 aiohttp 会话（事件循环变化时重建，应用退出时由 run_server 关闭），文件读写放到线程中执行，不阻塞事件循环
+    - prefetch_item_icons 以有界并发批量下载缺失的图标（如整个计划或出售列表的物品）
+    - 同一个文件的并发下载只请求一次
+    - base64 编码结果保存在内存 LRU 中，渲染时不再重复读文件和编码
+"""
+
+# 标准库导入
+import asyncio
+import base64
 import os
+from typing import Dict, Iterable, Optional
+
+# 第三方库导入
+import aiohttp
+from cachetools import LRUCache
+
+# 本地导入
+from src_v2.core.config.config import config
+from src_v2.core.log import logger
+from src_v2.core.utils.path import RESOURCE_PATH
+
+ICON_PREFETCH_CONCURRENCY = config.getint('PIC_RENDER', 'Icon_Prefetch_Concurrency', fallback=16)
+ICON_BASE64_CACHE_SIZE = config.getint('PIC_RENDER', 'Icon_Base64_Cache_Size', fallback=2000)
+
+# 1x1 像素透明 PNG，图标下载失败时使用
+DEFAULT_IMAGE_BASE64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+
+
+def _write_file(path: str, content: bytes):
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class IconStore:
+    def __init__(self, image_dir: str = os.path.join(RESOURCE_PATH, "img"),
+                 concurrency: int = ICON_PREFETCH_CONCURRENCY, base64_cache_size: int = ICON_BASE64_CACHE_SIZE):
+        self.image_dir = image_dir
+        self.concurrency = concurrency
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # 图片路径 -> base64
+        self._base64_cache: LRUCache = LRUCache(maxsize=base64_cache_size)
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """获取共享会话；未创建或事件循环已变化时重新创建"""
+        if self._session is None or self._session.closed or self._loop is not asyncio.get_running_loop():
+            await self.close()
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency, ssl=False),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+            self._loop = asyncio.get_running_loop()
+        return self._session
+
+    async def close(self):
+        """关闭共享会话，应用退出时调用；旧事件循环已关闭导致关闭失败时记录后丢弃"""
+        if self._session is not None and not self._session.closed:
+            try:
+                await self._session.close()
+            except Exception as e:
+                logger.warning(f"关闭图标下载会话失败，直接丢弃: {e}")
+        self._session = None
+        self._loop = None
+
+    def item_icon_path(self, type_id: int, size: int = 64) -> str:
+        return os.path.join(self.image_dir, f"item_{type_id}_{size}.png")
+
+    def portrait_path(self, character_id: int) -> str:
+        return os.path.join(self.image_dir, f"portrait_{character_id}.png")
+
+    def default_image_path(self) -> str:
+        return os.path.join(self.image_dir, "default_item.png")
+
+    async def download(self, url: str, save_path: str) -> str:
+        """下载到 save_path，同一路径的并发下载只请求一次；失败时抛出异常"""
+        task = self._inflight.get(save_path)
+        if task is None:
+            task = asyncio.create_task(self._download(url, save_path))
+            self._inflight[save_path] = task
+            task.add_done_callback(lambda _: self._inflight.pop(save_path, None))
+        return await asyncio.shield(task)
+
+    async def _download(self, url: str, save_path: str) -> str:
+        session = await self._get_session()
+        async with session.get(url) as response:
+            if response.status != 200:
+                raise Exception(f"请求状态码: {response.status}")
+            content = await response.read()
+        await asyncio.to_thread(_write_file, save_path, content)
+        self._base64_cache.pop(save_path, None)
+        return save_path
+
+    async def _ensure_default_image(self) -> Optional[str]:
+        default_image = self.default_image_path()
+        if not os.path.exists(default_image):
+            try:
+                await asyncio.to_thread(_write_file, default_image, base64.b64decode(DEFAULT_IMAGE_BASE64))
+            except Exception:
+                logger.error("无法创建默认图片")
+                return None
+        return default_image
+
+    async def get_item_icon_path(self, type_id: int, size: int = 64) -> Optional[str]:
+        """
+        获取EVE物品图片的本地路径，不存在时下载
+        :param type_id: 物品ID
+        :param size: 图片尺寸，可选值：64, 1024
+        :return: 图片本地路径，主备 URL 都失败时返回默认图片
+        """
+        local_path = self.item_icon_path(type_id, size)
+        if os.path.exists(local_path):
+            return local_path
+
+        urls = [
+            f"https://imageserver.eveonline.com/Type/{type_id}_{size}.png",
+            f"https://images.evetech.net/types/{type_id}/icon?size={size}",
+        ]
+        for url in urls:
+            try:
+                return await self.download(url, local_path)
+            except Exception as e:
+                logger.error(f"下载EVE物品图片失败 {url}: {e}")
+        return await self._ensure_default_image()
+
+    async def prefetch_item_icons(self, type_ids: Iterable[int], size: int = 64) -> int:
+        """以有界并发批量下载缺失的物品图标，返回本次需要下载的数量"""
+        missing = [
+            type_id for type_id in set(type_ids)
+            if type_id is not None and not os.path.exists(self.item_icon_path(type_id, size))
+        ]
+        if not missing:
+            return 0
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(type_id: int):
+            async with semaphore:
+                await self.get_item_icon_path(type_id, size)
+
+        await asyncio.gather(*[fetch(type_id) for type_id in missing])
+        return len(missing)
+
+    async def get_base64(self, image_path: Optional[str]) -> Optional[str]:
+        """将图片转换为base64编码，结果缓存在内存 LRU 中"""
+        if not image_path:
+            return None
+        cached = self._base64_cache.get(image_path)
+        if cached is not None:
+            return cached
+        try:
+            image_data = await asyncio.to_thread(_read_file, image_path)
+        except Exception as e:
+            logger.error(f"图片转base64失败: {e}")
+            return None
+        encoded = base64.b64encode(image_data).decode('utf-8')
+        self._base64_cache[image_path] = encoded
+        return encoded
+
+    def get_base64_sync(self, image_path: str) -> Optional[str]:
+        """同步版本，供模板头图等同步调用处使用，同样经过 LRU"""
+        cached = self._base64_cache.get(image_path)
+        if cached is not None:
+            return cached
+        try:
+            encoded = base64.b64encode(_read_file(image_path)).decode('utf-8')
+        except Exception as e:
+            logger.error(f"图片转base64失败: {e}")
+            return None
+        self._base64_cache[image_path] = encoded
+        return encoded
+
+    async def get_item_icon_base64(self, type_id: int, size: int = 64) -> Optional[str]:
+        return await self.get_base64(await self.get_item_icon_path(type_id, size))
+
+
+icon_store = IconStore()
+
 
 class IconDownloader:
-    
+
     @classmethod
     async def download_from_url2path(cls, url: str, save_path: str) -> str:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, ssl=False, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                if response.status == 200:
-                    content = await response.read()
-                    if not os.path.exists(os.path.dirname(save_path)):
-                        os.makedirs(os.path.dirname(save_path))
-                    with open(save_path, 'wb') as f:
-                        f.write(content)
-                    return save_path
-                else:
-                    raise Exception(f"请求状态码: {response.status}")
-
+        return await icon_store.download(url, save_path)
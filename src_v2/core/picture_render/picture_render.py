@@ -10,7 +10,6 @@ import requests
 import base64
 import asyncio
 from datetime import datetime, timedelta
-from pyppeteer import launch
 import math
 
 from ...model.EVE.sde import SdeUtils
@@ -20,33 +19,14 @@ from ..evesso_server import eveesi
 from ...utils import KahunaException, get_beijing_utctime
 from ...utils.path import TMP_PATH, RESOURCE_PATH
 from ..log_server import logger
+from .browser_pool import browser_pool
+from .template_env import template_env, coop_template_env, template_path
+from .render_cache import render_cache
+from .downloader import icon_store
 
-# 模板目录
-template_path = os.path.join(RESOURCE_PATH, "templates")
 # CSS目录
 css_path = os.path.join(RESOURCE_PATH, "css")
 
-def format_number(value):
-    """将数字格式化为带千位分隔符的字符串"""
-    try:
-        # 转换为浮点数
-        num = float(value)
-        # 如果是整数，不显示小数部分
-        if num.is_integer():
-            return "{:,}".format(int(num))
-        # 否则保留两位小数
-        return "{:,.2f}".format(num)
-    except (ValueError, TypeError):
-        # 如果无法转换为数字，返回原值
-        return value
-
-# 方法2：直接添加到环境
-def round_filter(value, precision=2):
-    try:
-        return round(float(value), precision)
-    except (ValueError, TypeError):
-        return value
-
 class PictureRender():
     @classmethod
     def check_tmp_dir(cls):
@@ -56,31 +36,31 @@ class PictureRender():
 
     @classmethod
     async def render_price_res_pic(cls, item_id: int, price_data: list, history_data: list, order_data):
+        # 相同物品、相同市场数据的价格图直接使用缓存，过期时间与订单缓存一致
+        return await render_cache.get_or_render(
+            'price_template.j2', (item_id, price_data, history_data, order_data),
+            lambda: cls._render_price_res_pic(item_id, price_data, history_data, order_data)
+        )
+
+    @classmethod
+    async def _render_price_res_pic(cls, item_id: int, price_data: list, history_data: list, order_data):
         # 准备实时价格数据
         max_buy, mid_price, min_sell, fuzz_list = price_data
         item_name = await SdeUtils.get_name_by_id(item_id)
 
         cls.check_tmp_dir()
 
-        # 获取Jinja2环境
-        env = jinja2.Environment(
-            loader=jinja2.FileSystemLoader(template_path),
-            autoescape=jinja2.select_autoescape(['html', 'xml'])
-        )
-
         # 根据是否有模糊匹配结果选择模板
         try:
             # 下载并转换物品图片
-            item_image_path = await cls.download_eve_item_image(await SdeUtils.get_id_by_name(item_name))  # 这里的ID需要根据实际物品ID修改
-            item_image_base64 = cls.get_image_base64(item_image_path) if item_image_path else None
-            env.filters['format_number'] = format_number
+            item_image_base64 = await icon_store.get_item_icon_base64(await SdeUtils.get_id_by_name(item_name))
             # 假设 order_data 是你原有的订单数据字典
             buy_orders = [[k, v] for k, v in order_data['buy_order'].items()]
             buy_orders.sort(key=lambda x: x[1]['price'], reverse=True)
             sell_orders = [[k, v] for k, v in order_data['sell_order'].items()]
             sell_orders.sort(key=lambda x: x[1]['price'])
-            template = env.get_template('price_template.j2')
-            html_content = template.render(
+            template = template_env.get_template('price_template.j2')
+            html_content = await template.render_async(
                 item_name=item_name,
                 max_buy=f"{max_buy:,.2f}",
                 mid_price=f"{mid_price:,.2f}",
@@ -95,18 +75,23 @@ class PictureRender():
             logger.error(f"请确保模板文件已放置在 {template_path} 目录下")
             return None
 
-        # 生成输出路径
-        output_path = os.path.abspath(os.path.join((TMP_PATH), "price_res.jpg"))
-
         # 增加等待时间到5秒，确保图表有足够时间渲染
-        pic_path = await cls.render_pic(output_path, html_content, width=550, height=720, wait_time=120)
+        pic_bytes = await cls.render_pic(html_content, width=550, height=720, wait_time=120)
 
-        if not pic_path:
-            raise KahunaException("pic_path not exist.")
-        return pic_path
+        if not pic_bytes:
+            raise KahunaException("图片渲染失败")
+        return pic_bytes
 
     @classmethod
     async def render_single_cost_pic(cls, single_cost_data: dict):
+        """成本图按输入数据缓存，渲染过程会修改 single_cost_data，缓存键在渲染前计算"""
+        return await render_cache.get_or_render(
+            'single_cost.j2', single_cost_data,
+            lambda: cls._render_single_cost_pic(single_cost_data)
+        )
+
+    @classmethod
+    async def _render_single_cost_pic(cls, single_cost_data: dict):
         """
         single_cost.j2 模板需要填充的数据字段:
 
@@ -173,15 +158,10 @@ class PictureRender():
         )
 
         # 开始渲染图片
-        # 获取Jinja2环境
+        # 使用共享的Jinja2环境
         try:
-            env = jinja2.Environment(
-                loader=jinja2.FileSystemLoader(template_path),
-                autoescape=jinja2.select_autoescape(['html', 'xml'])
-            )
-            env.filters['format_number'] = format_number
-            template = env.get_template('single_cost.j2')
-            html_content = template.render(
+            template = template_env.get_template('single_cost.j2')
+            html_content = await template.render_async(
                 item_name=item_name,
                 item_name_cn=iten_name_cn,
                 item_id=item_id,
@@ -194,22 +174,17 @@ class PictureRender():
                 profit_rate=profit_rate,
                 cost_components=cost_components
             )
-            with open(os.path.join(TMP_PATH, "single_cost.html"), 'w', encoding='utf-8') as f:
-                f.write(html_content)
         except jinja2.exceptions.TemplateNotFound as e:
             logger.error(f"模板文件不存在: {e}")
             logger.error(f"请确保模板文件已放置在 {template_path} 目录下")
             return None
 
-        # 生成输出路径
-        output_path = os.path.abspath(os.path.join((TMP_PATH), "single_cost_res.jpg"))
-
         # 增加等待时间到5秒，确保图表有足够时间渲染
-        pic_path = await cls.render_pic(output_path, html_content, width=550, height=720, wait_time=120)
+        pic_bytes = await cls.render_pic(html_content, width=550, height=720, wait_time=120)
 
-        if not pic_path:
-            raise KahunaException("pic_path not exist.")
-        return pic_path
+        if not pic_bytes:
+            raise KahunaException("图片渲染失败")
+        return pic_bytes
 
     @classmethod
     async def render_sell_list(cls, sell_asset_list: list, price_type: str):
@@ -226,6 +201,8 @@ class PictureRender():
             ]
             """
         jita_mk = MarketManager.get_market_by_type('jita')
+        # 先并发下载全部缺失的图标，循环中只读取本地缓存
+        await icon_store.prefetch_item_icons([asset.type_id for asset in sell_asset_list])
         items = []
         for asset in sell_asset_list:
             buy, sell = await jita_mk.get_type_order_rouge(asset.type_id)
@@ -250,58 +227,42 @@ class PictureRender():
             items.append(data)
         items.sort(key=lambda x: x['ship_type'], reverse=True)
 
-        env = jinja2.Environment(
-            loader=jinja2.FileSystemLoader(template_path),
-            autoescape=jinja2.select_autoescape(['html', 'xml'])
-        )
-        env.filters['format_number'] = format_number
-        template = env.get_template('sell_list_template.j2')
+        template = template_env.get_template('sell_list_template.j2')
         current = datetime.now()
         if current.astimezone().utcoffset().total_seconds() == 0:  # 如果是UTC时区
             # 转换为北京时间 (UTC+8)
             current = current + timedelta(hours=8)
-        html_content = template.render(
+        html_content = await template.render_async(
             items=items,
             header_image=PictureRender.get_image_base64(os.path.join(RESOURCE_PATH, 'img', 'sell_list_header.png')),
             current_time=current.strftime('%Y-%m-%d %H:%M:%S') + ' UTC+8',
         )
 
-        # 生成输出路径
-        output_path = os.path.abspath(os.path.join((TMP_PATH), "sell_list.jpg"))
-
         # 增加等待时间到5秒，确保图表有足够时间渲染
-        pic_path = await cls.render_pic(output_path, html_content, width=1300, height=720, wait_time=120)
+        pic_bytes = await cls.render_pic(html_content, width=1300, height=720, wait_time=120)
 
-        if not pic_path:
-            raise KahunaException("pic_path not exist.")
-        return pic_path
+        if not pic_bytes:
+            raise KahunaException("图片渲染失败")
+        return pic_bytes
 
     @classmethod
     async def render_refine_result(cls, ref_res):
-        env = jinja2.Environment(
-            loader=jinja2.FileSystemLoader(template_path),
-            autoescape=jinja2.select_autoescape(['html', 'xml'])
-        )
-        env.filters['format_number'] = format_number
-        template = env.get_template('refine_template.j2')
+        template = template_env.get_template('refine_template.j2')
         current = datetime.now()
         if current.astimezone().utcoffset().total_seconds() == 0:  # 如果是UTC时区
             # 转换为北京时间 (UTC+8)
             current = current + timedelta(hours=8)
-        html_content = template.render(
+        html_content = await template.render_async(
             data=ref_res,
             header_image=PictureRender.get_image_base64(os.path.join(RESOURCE_PATH, 'img', 'sell_list_header.png'))
         )
 
-        # 生成输出路径
-        output_path = os.path.abspath(os.path.join((TMP_PATH), "refine_report.jpg"))
-
         # 增加等待时间到5秒，确保图表有足够时间渲染
-        pic_path = await cls.render_pic(output_path, html_content, width=1000, height=720, wait_time=120)
+        pic_bytes = await cls.render_pic(html_content, width=1000, height=720, wait_time=120)
 
-        if not pic_path:
-            raise KahunaException("pic_path not exist.")
-        return pic_path
+        if not pic_bytes:
+            raise KahunaException("图片渲染失败")
+        return pic_bytes
 
     @classmethod
     async def rebder_mk_feature(cls, mk_data: dict):
@@ -313,155 +274,113 @@ class PictureRender():
             and data['cost'] > 30000000
         ][:30]
 
-        env = jinja2.Environment(
-            loader=jinja2.FileSystemLoader(template_path),
-            autoescape=jinja2.select_autoescape(['html', 'xml'])
-        )
-        env.filters['format_number'] = format_number
-        template = env.get_template('t2mk_template.j2')
+        template = template_env.get_template('t2mk_template.j2')
         current = get_beijing_utctime(datetime.now())
-        html_content = template.render(
+        html_content = await template.render_async(
             all_data=data_list,
             feature_list=feature_list,
             header_title='T2常规舰船市场推荐',
             header_image=PictureRender.get_image_base64(os.path.join(RESOURCE_PATH, 'img', 'sell_list_header.png'))
         )
 
-        # 生成输出路径
-        output_path = os.path.abspath(os.path.join((TMP_PATH), "mk_feature.jpg"))
-
         # 增加等待时间到5秒，确保图表有足够时间渲染
-        pic_path = await cls.render_pic(output_path, html_content, width=1100, height=720, wait_time=120)
+        pic_bytes = await cls.render_pic(html_content, width=1100, height=720, wait_time=120)
 
-        if not pic_path:
-            raise KahunaException("pic_path not exist.")
-        return pic_path
+        if not pic_bytes:
+            raise KahunaException("图片渲染失败")
+        return pic_bytes
 
 
     @classmethod
     async def render_buy_list(cls, lack_dict: dict, provider_data: dict):
-        env = jinja2.Environment(
-            loader=jinja2.FileSystemLoader(template_path),
-            autoescape=jinja2.select_autoescape(['html', 'xml'])
-        )
-        env.filters['format_number'] = format_number
-        template = env.get_template('buy_list_template.j2')
+        template = template_env.get_template('buy_list_template.j2')
         current = get_beijing_utctime(datetime.now())
-        html_content = template.render(
+        html_content = await template.render_async(
             buy_list_data=lack_dict,
             provider_data=provider_data,
             header_title='采购清单',
             header_image=PictureRender.get_image_base64(os.path.join(RESOURCE_PATH, 'img', 'sell_list_header.png'))
         )
 
-        # 生成输出路径
-        output_path = os.path.abspath(os.path.join((TMP_PATH), "buy_list.jpg"))
-
         # 增加等待时间到5秒，确保图表有足够时间渲染
-        pic_path = await cls.render_pic(output_path, html_content, width=1200, height=720, wait_time=120)
+        pic_bytes = await cls.render_pic(html_content, width=1200, height=720, wait_time=120)
 
-        if not pic_path:
-            raise KahunaException("pic_path not exist.")
-        return pic_path
+        if not pic_bytes:
+            raise KahunaException("图片渲染失败")
+        return pic_bytes
 
     @classmethod
     async def render_asset_statistic_report(cls, data):
-        env = jinja2.Environment(
-            loader=jinja2.FileSystemLoader(template_path),
-            autoescape=jinja2.select_autoescape(['html', 'xml'])
-        )
-        env.filters['format_number'] = format_number
-        template = env.get_template('asset_statistic_template.j2')
+        template = template_env.get_template('asset_statistic_template.j2')
         current = get_beijing_utctime(datetime.now())
-        html_content = template.render(
+        html_content = await template.render_async(
             header_title='资产分析',
             header_image=PictureRender.get_image_base64(os.path.join(RESOURCE_PATH, 'img', 'sell_list_header.png')),
             data=data
         )
 
-        # 生成输出路径
-        output_path = os.path.abspath(os.path.join((TMP_PATH), "asset_statistic.jpg"))
-
         # 增加等待时间到5秒，确保图表有足够时间渲染
-        pic_path = await cls.render_pic(output_path, html_content, width=1500, height=720, wait_time=120)
+        pic_bytes = await cls.render_pic(html_content, width=1500, height=720, wait_time=120)
 
-        if not pic_path:
-            raise KahunaException("pic_path not exist.")
-        return pic_path
+        if not pic_bytes:
+            raise KahunaException("图片渲染失败")
+        return pic_bytes
 
     @classmethod
     async def render_order_state(cls, data, is_buy_order=False):
         order_data = data['order_data']
+        await icon_store.prefetch_item_icons([order['type_id'] for order in order_data])
         for order in order_data:
             order.update({
                 'icon': await PictureRender.get_eve_item_icon_base64(order['type_id']),
                 'date_remain': order['duration'] - (get_beijing_utctime(datetime.now()) - order['issued']).days,
             })
-        env = jinja2.Environment(
-            loader=jinja2.FileSystemLoader(template_path),
-            autoescape=jinja2.select_autoescape(['html', 'xml'])
-        )
-        env.filters['format_number'] = format_number
-        template = env.get_template('order_state.j2')
-        html_content = template.render(
+        template = template_env.get_template('order_state.j2')
+        html_content = await template.render_async(
             header_title= '收购订单状态' if is_buy_order else '出售订单状态',
             header_image=PictureRender.get_image_base64(os.path.join(RESOURCE_PATH, 'img', 'sell_list_header.png')),
             order_data=order_data,
             is_buy_order=is_buy_order
         )
 
-        # 生成输出路径
-        output_path = os.path.abspath(os.path.join((TMP_PATH), "order_state.jpg"))
-
         # 增加等待时间到5秒，确保图表有足够时间渲染
-        pic_path = await cls.render_pic(output_path, html_content, width=900, height=720, wait_time=120)
+        pic_bytes = await cls.render_pic(html_content, width=900, height=720, wait_time=120)
 
-        if not pic_path:
-            raise KahunaException("pic_path not exist.")
-        return pic_path
+        if not pic_bytes:
+            raise KahunaException("图片渲染失败")
+        return pic_bytes
 
     @classmethod
     async def render_month_order_statistic(cls, data):
+        await icon_store.prefetch_item_icons([type_data['type_id'] for type_data in data['sell_type_data'].values()])
         for type_data in data['sell_type_data'].values():
             type_data.update({'icon': await PictureRender.get_eve_item_icon_base64(type_data['type_id'])})
 
-        env = jinja2.Environment(
-            loader=jinja2.FileSystemLoader(template_path),
-            autoescape=jinja2.select_autoescape(['html', 'xml'])
-        )
-        env.filters['format_number'] = format_number
-        template = env.get_template('month_order_statistic.j2')
+        template = template_env.get_template('month_order_statistic.j2')
         current = get_beijing_utctime(datetime.now())
-        html_content = template.render(
+        html_content = await template.render_async(
             header_title='月KPI统计',
             header_image=PictureRender.get_image_base64(os.path.join(RESOURCE_PATH, 'img', 'sell_list_header.png')),
             data=data
         )
 
-        # 生成输出路径
-        output_path = os.path.abspath(os.path.join((TMP_PATH), "month_kpi.jpg"))
-
         # 增加等待时间到5秒，确保图表有足够时间渲染
-        pic_path = await cls.render_pic(output_path, html_content, width=1600, height=720, wait_time=120)
+        pic_bytes = await cls.render_pic(html_content, width=1600, height=720, wait_time=120)
 
-        if not pic_path:
-            raise KahunaException("pic_path not exist.")
-        return pic_path
+        if not pic_bytes:
+            raise KahunaException("图片渲染失败")
+        return pic_bytes
 
     @classmethod
     async def render_moon_material_state(cls, data: dict, market_index_history: list):
+        await icon_store.prefetch_item_icons([tid for R_data in data.values() for tid in R_data])
         for _, R_data in data.items():
             for tid, t_data in R_data.items():
                 t_data.update({'icon': await PictureRender.get_eve_item_icon_base64(tid)})
 
-        env = jinja2.Environment(
-            loader=jinja2.FileSystemLoader(template_path),
-            autoescape=jinja2.select_autoescape(['html', 'xml'])
-        )
-        env.filters['format_number'] = format_number
-        template = env.get_template('moon_material_state_template.j2')
+        template = template_env.get_template('moon_material_state_template.j2')
         current = get_beijing_utctime(datetime.now())
-        html_content = template.render(
+        html_content = await template.render_async(
             header_title='元素市场',
             header_image=PictureRender.get_image_base64(os.path.join(RESOURCE_PATH, 'img', 'sell_list_header.png')),
             data=data,
@@ -469,145 +388,90 @@ class PictureRender():
             market_index_history=market_index_history
         )
 
-        # 生成输出路径
-        output_path = os.path.abspath(os.path.join((TMP_PATH), "moon_material_state.jpg"))
-
         # 增加等待时间到5秒，确保图表有足够时间渲染
-        pic_path = await cls.render_pic(output_path, html_content, width=1600, height=720, wait_time=120)
+        pic_bytes = await cls.render_pic(html_content, width=1600, height=720, wait_time=120)
 
-        if not pic_path:
-            raise KahunaException("pic_path not exist.")
-        return pic_path
+        if not pic_bytes:
+            raise KahunaException("图片渲染失败")
+        return pic_bytes
 
     @classmethod
     async def render_coop_pay_report(cls, data: dict):
-        env = jinja2.Environment(
-            loader=jinja2.FileSystemLoader(template_path),
-            autoescape=jinja2.select_autoescape(['html', 'xml'])
-        )
-        env.filters['format_currency'] = format_number
-        env.filters['round'] = round_filter
-        template = env.get_template('coop_pay_template.j2')
+        template = coop_template_env.get_template('coop_pay_template.j2')
         current = get_beijing_utctime(datetime.now())
-        html_content = template.render(
+        html_content = await template.render_async(
             header_title='合作报酬',
             header_image=PictureRender.get_image_base64(os.path.join(RESOURCE_PATH, 'img', 'sell_list_header.png')),
             data=data
         )
 
-        # 生成输出路径
-        output_path = os.path.abspath(os.path.join((TMP_PATH), "coop_pay_template.jpg"))
-
         # 增加等待时间到5秒，确保图表有足够时间渲染
-        pic_path = await cls.render_pic(output_path, html_content, width=800, height=720, wait_time=120)
+        pic_bytes = await cls.render_pic(html_content, width=800, height=720, wait_time=120)
 
-        if not pic_path:
-            raise KahunaException("pic_path not exist.")
-        return pic_path
+        if not pic_bytes:
+            raise KahunaException("图片渲染失败")
+        return pic_bytes
 
     @classmethod
-    async def render_pic(cls, output_path: str, html_content: str, width: int = 800, height: int = 800, wait_time: int = 5):
-        # 将HTML内容保存到临时文件
-        html_file_path = os.path.join(TMP_PATH, "temp_render.html")
-        with open(html_file_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-
-        launch_a = [
-            '--no-sandbox',
-            '--disable-setuid-sandbox',
-            '--disable-dev-shm-usage',
-            '--disable-gpu',  # 禁用GPU加速
-        ]
-
-        if config['APP']['PIC_RENDER_PROXY'] != '':
-            proxy_arg = [config['APP']['PIC_RENDER_PROXY']]
-        else:
-            proxy_arg = []
-
-        # 检查是否为 Linux 系统
-        if sys.platform.startswith('linux'):
-        # 启动浏览器，添加必要的参数以确保在Linux环境下正常运行
-            browser = await launch(
-                headless=True,
-                args=launch_a + proxy_arg
-            )
-
-        else:
-            browser = await launch(
-                executablePath=r'C:\Program Files\Google\Chrome\Application\chrome.exe',
-                headless=True,
-                args=proxy_arg
-            )
-
-        page = await browser.newPage()
-        await page.setViewport({'width': width, 'height': height})
+    async def render_pic(cls, html_content: str, width: int = 800, height: int = 800, wait_time: int = 5,
+                         image_type: str = 'jpeg') -> bytes:
+        """使用浏览器池渲染 HTML，返回图片字节（jpeg / png），渲染失败返回 None
 
+        每次渲染使用独立页面和独立的输出缓冲区，并发渲染互不影响。
+        """
         try:
-            # 设置页面内容
-            await page.setContent(html_content)
-
-            # 等待字体加载完成
-            await page.waitForFunction('document.fonts.ready', {'timeout': wait_time * 1000})
-
-            # 检查是否有Chart.js图表，如果有则等待图表渲染完成
-            has_chart = await page.evaluate('typeof Chart !== "undefined" && document.getElementById("costChart") !== null')
-            if has_chart:
-                # 禁用Chart.js动画以加速渲染
-                await page.evaluate('''
-                    if (typeof Chart !== "undefined") {
-                        Chart.defaults.animation = false;
-                        // 添加一个全局标志，表示图表渲染完成
-                        window.chartRendered = false;
-                        const originalDraw = Chart.prototype.draw;
-                        Chart.prototype.draw = function() {
-                            originalDraw.apply(this, arguments);
-                            window.chartRendered = true;
-                        };
-                    }
-                ''')
-
-                # 等待图表渲染完成或超时
-                try:
-                    await page.waitForFunction('window.chartRendered === true', {'timeout': wait_time * 1000})
-                except Exception as e:
-                    logger.warning(f"等待图表渲染超时: {e}，使用备用等待时间")
-                    await asyncio.sleep(wait_time)  # 备用等待机制
-            else:
-                # 如果没有图表，等待DOM内容加载完成
-                await page.waitForFunction('document.readyState === "complete"')
-                # 额外等待一小段时间确保CSS渲染完成
-                await asyncio.sleep(1)
+            async with browser_pool.page(width, height) as page:
+                # 设置页面内容
+                await page.setContent(html_content)
+
+                # 等待字体加载完成
+                await page.waitForFunction('document.fonts.ready', {'timeout': wait_time * 1000})
+
+                # 检查是否有Chart.js图表，如果有则等待图表渲染完成
+                has_chart = await page.evaluate('typeof Chart !== "undefined" && document.getElementById("costChart") !== null')
+                if has_chart:
+                    # 禁用Chart.js动画以加速渲染
+                    await page.evaluate('''
+                        if (typeof Chart !== "undefined") {
+                            Chart.defaults.animation = false;
+                            // 添加一个全局标志，表示图表渲染完成
+                            window.chartRendered = false;
+                            const originalDraw = Chart.prototype.draw;
+                            Chart.prototype.draw = function() {
+                                originalDraw.apply(this, arguments);
+                                window.chartRendered = true;
+                            };
+                        }
+                    ''')
+
+                    # 等待图表渲染完成或超时
+                    try:
+                        await page.waitForFunction('window.chartRendered === true', {'timeout': wait_time * 1000})
+                    except Exception as e:
+                        logger.warning(f"等待图表渲染超时: {e}，使用备用等待时间")
+                        await asyncio.sleep(wait_time)  # 备用等待机制
+                else:
+                    # 如果没有图表，等待DOM内容加载完成
+                    await page.waitForFunction('document.readyState === "complete"')
+                    # 额外等待一小段时间确保CSS渲染完成
+                    await asyncio.sleep(1)
 
-            # 截图
-            await page.screenshot({'path': output_path, 'fullPage': True})
+                # 截图，不指定 path 时直接返回图片字节
+                return await page.screenshot({'type': image_type, 'fullPage': True})
         except Exception as e:
             logger.error(f"渲染过程发生错误: {e}")
             # 记录更详细的错误信息
-            logger.error(f"详细错误: {str(e)}")
             logger.error(f"错误类型: {type(e).__name__}")
-        finally:
-            try:
-                if 'browser' in locals() and browser:
-                    await browser.close()
-            except Exception as close_error:
-                logger.error(f"关闭浏览器时发生错误: {close_error}")
-
-        return output_path
-
+            return None
 
     @classmethod
     async def get_eve_item_icon_base64(cls, type_id: int):
-        item_image_path = await cls.download_eve_item_image(type_id)  # 这里的ID需要根据实际物品ID修改
-        item_image_base64 = cls.get_image_base64(item_image_path) if item_image_path else None
-
-        return item_image_base64
+        return await icon_store.get_item_icon_base64(type_id)
 
     @classmethod
     async def get_character_portrait_base64(cls, character_id: int):
         portrait_image_path = await cls.download_character_protrait(character_id)
-        portrait_image_base64 = cls.get_image_base64(portrait_image_path)
-
-        return portrait_image_base64
+        return await icon_store.get_base64(portrait_image_path)
 
     @classmethod
     async def download_eve_item_image(cls, type_id: int, size: int = 64) -> str:
@@ -617,117 +481,21 @@ class PictureRender():
         :param size: 图片尺寸，可选值：64, 1024
         :return: 图片本地路径
         """
-        # 创建图片存储目录
-        image_path = os.path.join(RESOURCE_PATH, "img")
-        if not os.path.exists(image_path):
-            os.makedirs(image_path)
-
-        # 构建图片URL和本地保存路径
-        local_path = os.path.join(image_path, f"item_{type_id}_{size}.png")
-
-        # 如果图片已存在，直接返回路径
-        if os.path.exists(local_path):
-            return local_path
-
-        # 尝试从主URL下载（现在使用原来的备用URL作为主URL）
-        try:
-            # 主URL（原备用URL）
-            url = f"https://imageserver.eveonline.com/Type/{type_id}_{size}.png"
-            logger.info(f"尝试从主URL下载: {url}")
-
-            # 下载图片，禁用SSL验证
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, ssl=False, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        content = await response.read()
-                        # 保存图片
-                        with open(local_path, 'wb') as f:
-                            f.write(content)
-
-                        logger.info(f"成功下载物品图片: {type_id}")
-                        return local_path
-                    else:
-                        raise Exception(f"请求状态码: {response.status}")
-        except Exception as e:
-            logger.error(f"从主URL下载EVE物品图片失败: {e}")
-
-            # 尝试备用URL（原主URL）
-            try:
-                # 备用URL
-                backup_url = f"https://images.evetech.net/types/{type_id}/icon?size={size}"
-                logger.info(f"尝试从备用URL下载: {backup_url}")
-
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(backup_url, ssl=False, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                        if response.status == 200:
-                            content = await response.read()
-                            with open(local_path, 'wb') as f:
-                                f.write(content)
-
-                            logger.info(f"从备用URL成功下载物品图片: {type_id}")
-                            return local_path
-                        else:
-                            raise Exception(f"备用URL请求状态码: {response.status}")
-
-            except Exception as backup_e:
-                logger.error(f"从备用URL下载EVE物品图片也失败: {backup_e}")
-
-            # 如果两个URL都失败，返回默认图片路径
-            default_image = os.path.join(RESOURCE_PATH, "img", "default_item.png")
-
-            # 如果默认图片不存在，创建一个简单的默认图片
-            if not os.path.exists(default_image):
-                try:
-                    # 创建一个简单的1x1像素透明PNG
-                    with open(default_image, 'wb') as f:
-                        f.write(base64.b64decode(
-                            "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="))
-                except Exception:
-                    logger.error("无法创建默认图片")
-                    return None
-
-            return default_image
+        return await icon_store.get_item_icon_path(type_id, size)
 
     @classmethod
     def get_image_base64(cls, image_path: str) -> str:
-        """将图片转换为base64编码"""
-        try:
-            with open(image_path, 'rb') as f:
-                image_data = f.read()
-                return base64.b64encode(image_data).decode('utf-8')
-        except Exception as e:
-            logger.error(f"图片转base64失败: {e}")
-            return None
+        """将图片转换为base64编码，结果缓存在 icon_store 的 LRU 中"""
+        return icon_store.get_base64_sync(image_path)
 
     @classmethod
     async def download_character_protrait(cls, character_id: int):
-        # 创建图片存储目录
-        image_path = os.path.join(RESOURCE_PATH, "img")
-        if not os.path.exists(image_path):
-            os.makedirs(image_path)
-
-        # 构建图片URL和本地保存路径
-        local_path = os.path.join(image_path, f"portrait_{character_id}.png")
-
         # 如果图片已存在，直接返回路径
+        local_path = icon_store.portrait_path(character_id)
         if os.path.exists(local_path):
             return local_path
 
         image_data = await eveesi.characters_character_portrait(character_id)
-        px64_url = image_data['px64x64']
-
-        # 下载图片，禁用SSL验证
-        async with aiohttp.ClientSession() as session:
-            async with session.get(px64_url, ssl=False, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                if response.status == 200:
-                    content = await response.read()
-                    # 保存图片
-                    with open(local_path, 'wb') as f:
-                        f.write(content)
-
-                    logger.info(f"成功下载角色头像: {character_id}")
-                    return local_path
-                else:
-                    raise Exception(f"请求状态码: {response.status}")
-
+        await icon_store.download(image_data['px64x64'], local_path)
+        logger.info(f"成功下载角色头像: {character_id}")
         return local_path
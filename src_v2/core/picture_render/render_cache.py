@@ -0,0 +1,155 @@
+"""
+渲染结果缓存
+按 (模板名, 规范化后的输入数据) 的哈希缓存渲染好的图片，命中时不经过 SDE 查询、模板渲染和浏览器：
+    - 图片保存在本地目录 {TMP_PATH}/render_cache，文件名为 {key}_{过期时间戳}.img
+    - 内存中维护 LRU 索引，按条目数和总字节数淘汰，进程重启后从目录恢复未过期的条目
+    - 过期时间与图片依赖的数据一致（默认与市场订单缓存相同的 10 分钟）
+    - 同一个键的并发请求只渲染一次
+"""
+
+# 标准库导入
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# 本地导入
+from src_v2.core.config.config import config
+from src_v2.core.log import logger
+from src_v2.core.utils.path import TMP_PATH
+
+RENDER_CACHE_TTL = config.getint('PIC_RENDER', 'Render_Cache_TTL', fallback=600)
+RENDER_CACHE_MAX_ENTRIES = config.getint('PIC_RENDER', 'Render_Cache_Max_Entries', fallback=500)
+RENDER_CACHE_MAX_BYTES = config.getint('PIC_RENDER', 'Render_Cache_Max_MB', fallback=256) * 1024 * 1024
+
+render_cache_path = os.path.join(TMP_PATH, "render_cache")
+
+
+def _normalize(value: Any) -> Any:
+    """把输入数据转换为可稳定序列化的结构：字典按键排序，元组转列表，其余对象转字符串"""
+    if isinstance(value, dict):
+        return [[str(key), _normalize(item)] for key, item in sorted(value.items(), key=lambda kv: str(kv[0]))]
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, set):
+        return sorted((_normalize(item) for item in value), key=str)
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def make_render_key(template_name: str, data: Any) -> str:
+    payload = json.dumps([template_name, _normalize(data)], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class RenderCache:
+    def __init__(self, cache_dir: str = render_cache_path, max_entries: int = RENDER_CACHE_MAX_ENTRIES,
+                 max_bytes: int = RENDER_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (过期时间戳, 文件路径, 字节数)，按最近使用排序
+        self._index: "OrderedDict[str, Tuple[int, str, int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._load_index()
+
+    def _load_index(self):
+        """从缓存目录恢复未过期的条目，过期或无法识别的文件直接删除"""
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+            return
+        now = time.time()
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, file_name)
+            try:
+                if not file_name.endswith(".img"):
+                    raise ValueError(file_name)
+                key, expire_at = file_name[:-len(".img")].rsplit("_", 1)
+                expire_at = int(expire_at)
+                if expire_at <= now:
+                    raise ValueError(file_name)
+                entries.append((os.path.getmtime(path), key, expire_at, path, os.path.getsize(path)))
+            except (ValueError, OSError):
+                self._remove_file(path)
+        for _, key, expire_at, path, size in sorted(entries):
+            self._index[key] = (expire_at, path, size)
+            self._total_bytes += size
+        self._evict()
+
+    @staticmethod
+    def _remove_file(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _drop(self, key: str):
+        _, path, size = self._index.pop(key)
+        self._total_bytes -= size
+        self._remove_file(path)
+
+    def _evict(self):
+        while self._index and (len(self._index) > self.max_entries or self._total_bytes > self.max_bytes):
+            self._drop(next(iter(self._index)))
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        expire_at, path, _ = entry
+        if expire_at <= time.time():
+            self._drop(key)
+            return None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self._drop(key)
+            return None
+        self._index.move_to_end(key)
+        return data
+
+    def set(self, key: str, data: bytes, ttl: int = RENDER_CACHE_TTL):
+        if key in self._index:
+            self._drop(key)
+        expire_at = int(time.time() + ttl)
+        path = os.path.join(self.cache_dir, f"{key}_{expire_at}.img")
+        try:
+            with open(path, "wb") as f:
+                f.write(data)
+        except OSError as e:
+            logger.warning(f"写入渲染缓存失败: {e}")
+            return
+        self._index[key] = (expire_at, path, len(data))
+        self._total_bytes += len(data)
+        self._evict()
+
+    async def get_or_render(self, template_name: str, data: Any, render: Callable[[], Awaitable[Optional[bytes]]],
+                            ttl: int = RENDER_CACHE_TTL) -> Optional[bytes]:
+        """命中缓存直接返回图片；未命中时调用 render 渲染并缓存，渲染失败（None）不缓存"""
+        key = make_render_key(template_name, data)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        async def render_and_store():
+            pic_bytes = await render()
+            if pic_bytes:
+                self.set(key, pic_bytes, ttl)
+            return pic_bytes
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(render_and_store())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+
+render_cache = RenderCache()
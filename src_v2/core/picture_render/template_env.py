@@ -0,0 +1,98 @@
+"""
+图片渲染模板环境
+所有 PictureRender 渲染器共用一个 Jinja2 环境：
+    - 导入时创建，过滤器只注册一次
+    - 编译后的模板常驻内存（auto_reload=False，不再逐次检查模板文件），字节码缓存到临时目录，重启后免解析
+    - enable_async，渲染器通过 render_async 渲染
+修改模板文件后需要重启进程生效。
+"""
+
+# 标准库导入
+import os
+
+# 第三方库导入
+import jinja2
+
+# 本地导入
+from src_v2.core.log import logger
+from src_v2.core.utils.path import RESOURCE_PATH, TMP_PATH
+
+# 模板目录
+template_path = os.path.join(RESOURCE_PATH, "templates")
+# 模板字节码缓存目录
+template_cache_path = os.path.join(TMP_PATH, "jinja2_cache")
+
+# 导入时预编译的模板
+TEMPLATE_NAMES = (
+    "price_template.j2",
+    "single_cost.j2",
+    "sell_list_template.j2",
+    "refine_template.j2",
+    "t2mk_template.j2",
+    "buy_list_template.j2",
+    "asset_statistic_template.j2",
+    "order_state.j2",
+    "month_order_statistic.j2",
+    "moon_material_state_template.j2",
+    "coop_pay_template.j2",
+)
+
+
+def format_number(value):
+    """将数字格式化为带千位分隔符的字符串"""
+    try:
+        # 转换为浮点数
+        num = float(value)
+        # 如果是整数，不显示小数部分
+        if num.is_integer():
+            return "{:,}".format(int(num))
+        # 否则保留两位小数
+        return "{:,.2f}".format(num)
+    except (ValueError, TypeError):
+        # 如果无法转换为数字，返回原值
+        return value
+
+
+def round_filter(value, precision=2):
+    try:
+        return round(float(value), precision)
+    except (ValueError, TypeError):
+        return value
+
+
+def create_template_env(search_path: str = template_path) -> jinja2.Environment:
+    """创建渲染用的 Jinja2 环境，正常使用模块级的 template_env，基准测试等场景可指定模板目录"""
+    if not os.path.exists(template_cache_path):
+        os.makedirs(template_cache_path)
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(search_path),
+        autoescape=jinja2.select_autoescape(['html', 'xml']),
+        bytecode_cache=jinja2.FileSystemBytecodeCache(template_cache_path),
+        auto_reload=False,
+        enable_async=True,
+    )
+    env.filters['format_number'] = format_number
+    env.filters['format_currency'] = format_number
+    return env
+
+
+def preload_templates(env: jinja2.Environment, template_names=TEMPLATE_NAMES) -> int:
+    """预编译模板到环境缓存，返回成功加载的数量；缺失的模板在首次使用时报错"""
+    missing = []
+    for template_name in template_names:
+        try:
+            env.get_template(template_name)
+        except jinja2.exceptions.TemplateNotFound:
+            missing.append(template_name)
+    if missing:
+        logger.warning(f"模板文件不存在: {', '.join(missing)}，请确保模板文件已放置在 {template_path} 目录下")
+    return len(template_names) - len(missing)
+
+
+template_env = create_template_env()
+# 合作报酬模板的 round 默认保留两位小数，单独覆盖，不影响其他模板的内置 round
+coop_template_env = template_env.overlay()
+coop_template_env.filters['round'] = round_filter
+
+preload_templates(template_env, [name for name in TEMPLATE_NAMES if name != "coop_pay_template.j2"])
+preload_templates(coop_template_env, ["coop_pay_template.j2"])
@@ -28,6 +28,7 @@ from src_v2.core.database.kahuna_database_utils_v2 import (
 from src_v2.core.database.kahuna_database_utils_v2 import EveAliasCharacterDBUtils
 from src_v2.core.database.model import EveAliasCharacter as M_EveAliasCharacter
 from src_v2.core.log import logger
+from src_v2.core.permission.permission_resolver import permission_resolver
 from src_v2.model.EVE.character.character_manager import CharacterManager
 from src_v2.model.EVE.character.character import Character
 # import Exception
@@ -166,6 +167,8 @@ class UserManager(metaclass=SingletonMeta):
 
             # 删除user
             await UserDBUtils.delete_user_by_user_username(user_name, session=session)
+        # 角色、权限已删除，使缓存的权限解析结果失效，已签发的 token 不再通过鉴权
+        await permission_resolver.invalidate_user(user_name)
         
     #
     # async def clean_member_time(cls, qq: int) -> User:
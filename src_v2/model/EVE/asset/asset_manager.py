@@ -7,7 +7,7 @@ import uuid
 
 from tqdm.std import tqdm
 
-from src_v2.core.database.connect_manager import redis_manager as rdm, neo4j_manager, postgres_manager as dbm
+from src_v2.core.database.connect_manager import redis_manager as rdm, postgres_manager as dbm
 from src_v2.core.utils import SingletonMeta, tqdm_manager
 from src_v2.core.utils import KahunaException, get_beijing_utctime, get_random_token
 
@@ -29,11 +29,15 @@ from src_v2.core.database.neo4j_utils import Neo4jIndustryUtils as NIU
 from src_v2.model.EVE.sde.utils import SdeUtils
 
 from src_v2.model.EVE.eveesi import eveesi
+from src_v2.model.EVE.eveesi.eveutils import iter_esi_pages
+from src_v2.model.EVE.asset.asset_snapshot import AssetSnapshot, asset_digest
 
 # kahuna logger
 from src_v2.core.log import logger
 
 CREATE_STATION_SEMAPHORE = asyncio.Semaphore(1)
+# 资产导入每个 UNWIND 事务写入的行数
+ASSET_IMPORT_CHUNK_SIZE = 5000
 
 structure_sub_location_flags = [
     "OfficeFolder",
@@ -83,14 +87,13 @@ class AssetManager(metaclass=SingletonMeta):
         mission_obj.active = active
         await EveAssetPullMissionDBUtils.save_obj(mission_obj)
         
-    async def pull_asset_now(self, asset_owner_type: str, asset_owner_id: int):
+    async def pull_asset_now(self, asset_owner_type: str, asset_owner_id: int, full_resync: bool = False):
+        """拉取资产；默认与上次导入的快照比较后增量写入，full_resync 或快照不存在时全量重建"""
         mission_obj = await EveAssetPullMissionDBUtils.select_mission_by_owner_id_and_owner_type(asset_owner_id, asset_owner_type)
         if not mission_obj:
             raise KahunaException('任务不存在')
 
-        await rdm.r.hset(f'asset_pull_mission_status:{asset_owner_type}:{asset_owner_id}', 'step_name', "清理旧数据")
-        await self.clean_asset_pull_mission_assets(mission_obj)
-        await self.processing_asset_pull_mission(mission_obj)
+        await self.processing_asset_pull_mission(mission_obj, full_resync)
 
         mission_obj.last_pull_time = get_beijing_utctime(datetime.now())
         await EveAssetPullMissionDBUtils.merge(mission_obj)
@@ -183,213 +186,204 @@ class AssetManager(metaclass=SingletonMeta):
 
         return station_info, True
 
-    async def create_station_node(self, station_id: int):
-        async with CREATE_STATION_SEMAPHORE:
-            station_info, is_new = await self.get_station_info(station_id)
-            if not is_new:
-                return
-            system_info = await SdeUtils.get_system_info_by_id(station_info["system_id"])
-            station_node = {
-                'station_id': station_id,
-                'station_name': station_info["name"],
-                'system_id': station_info["system_id"],
-                'system_name': system_info['system_name'],
-            }
-            await NIU.merge_node(
-                "Station",
-                {
-                    "station_id": station_id,
-                },
-                station_node
+    async def get_station_node_rows(self, station_id: int):
+        """构建NPC空间站节点、所在星系节点及两者关系的批量写入行
+
+        Returns:
+            (station_row, system_row, link_row)；空间站信息已缓存（节点已创建）时返回 None
+        """
+        station_info, is_new = await self.get_station_info(station_id)
+        if not is_new:
+            return None
+        system_info = await SdeUtils.get_system_info_by_id(station_info["system_id"])
+        station_node = {
+            'station_id': station_id,
+            'station_name': station_info["name"],
+            'system_id': station_info["system_id"],
+            'system_name': system_info['system_name'],
+        }
+        system_node = {
+            'system_id': system_info['system_id'],
+            'system_name': system_info['system_name'],
+            'region_id': system_info['region_id'],
+            'region_name': system_info['region_name'],
+        }
+        return (
+            ({"station_id": station_id}, station_node),
+            ({"solar_system_id": system_info["system_id"]}, system_node),
+            (
+                {"station_id": station_id}, {},
+                {}, {},
+                {"solar_system_id": system_info['system_id']}, {}
             )
+        )
 
-            system_node = {
-                'system_id': system_info['system_id'],
-                'system_name': system_info['system_name'],
-                'region_id': system_info['region_id'],
-                'region_name': system_info['region_name'],
+    async def _classify_assets(self, assets_list: list[dict], mission_obj: M_EveAssetPullMission) -> dict:
+        """在内存中对资产分类，并一次批量解析物品名称和星系信息
+
+        Returns:
+            {
+                "nodes": 需要创建的资产节点（排除已是建筑节点的资产）,
+                "station": 位于 NPC 空间站的资产,
+                "solar_system": 直接位于星系的资产,
+                "structure": 位于玩家建筑的资产,
+                "nested": 位于其他资产（容器、机库）内的资产,
+                "system_infos": {system_id: system_info},
             }
-            await NIU.merge_node(
-                "SolarSystem",
-                {
-                    "solar_system_id": system_info["system_id"],
-                },
-                system_node
-            )
+        """
+        structure_nodes = await NAU.get_structure_nodes()
+        structure_item_id_set = {structure.get("item_id", None) for structure in structure_nodes}
+        structure_id_set = {structure.get("structure_id", None) for structure in structure_nodes}
+        type_names = await SdeUtils.get_names_by_ids({asset['type_id'] for asset in assets_list})
+
+        classified = {"nodes": [], "station": [], "solar_system": [], "structure": [], "nested": []}
+        for asset in assets_list:
+            asset.update({
+                'type_name': type_names.get(asset['type_id']),
+                'owner_id': mission_obj.asset_owner_id
+            })
+            if asset["item_id"] not in structure_item_id_set:
+                classified["nodes"].append(asset)
+
+            if asset["location_type"] == 'station':
+                classified["station"].append(asset)
+            elif asset["location_type"] == 'solar_system':
+                if asset["item_id"] in structure_id_set:
+                    continue
+                classified["solar_system"].append(asset)
+            elif asset["location_id"] in structure_id_set:
+                classified["structure"].append(asset)
+            else:
+                classified["nested"].append(asset)
 
-            await NIU.link_node(
-                "Station",
-                {"station_id": station_id},
-                {},
-                "LOCATED_IN",
-                {},
-                {},
-                "SolarSystem",
-                {"solar_system_id": system_info['system_id']},
-                {}
-            )
+        system_ids = list({asset["location_id"] for asset in classified["solar_system"]})
+        system_infos = await asyncio.gather(*[SdeUtils.get_system_info_by_id(system_id) for system_id in system_ids])
+        classified["system_infos"] = {
+            system_id: system_info for system_id, system_info in zip(system_ids, system_infos) if system_info
+        }
+        return classified
 
-    async def _generate_all_nodes(self, assets_list: list[dict], mission_obj: M_EveAssetPullMission):
-        stucture_list = await NAU.get_structure_nodes()
-        structure_item_id_list = [structure.get("item_id", None) for structure in stucture_list]
+    async def _generate_all_nodes(self, classified: dict, mission_obj: M_EveAssetPullMission):
         status_key = f'asset_pull_mission_status:{mission_obj.asset_owner_type}:{mission_obj.asset_owner_id}'
-
-        last_progress = 0
-        async def generate_with_semaphore(asset: dict):
-            nonlocal last_progress
-            async with neo4j_manager.semaphore:
-                if asset["item_id"] in structure_item_id_list:
-                    return
-                asset.update({
-                    'type_name': await SdeUtils.get_name_by_id(asset['type_id']),
-                    'owner_id': mission_obj.asset_owner_id
-                })
-                await NIU.merge_node(
-                    "Asset",
-                    {
-                        "item_id": asset["item_id"],
-                        "owner_id": asset["owner_id"],
-                    },
-                    asset
-                )
-
-                if asset["location_type"] == 'station':
-                    await self.create_station_node(asset["location_id"])
-
-                now_progress = await tqdm_manager.update_mission("_generate_all_nodes", 1)
-                if now_progress / len(assets_list) * 100 > last_progress + 0.1:
-                    await rdm.r.hset(status_key, 'step_progress', now_progress / len(assets_list))
-                    last_progress = now_progress / len(assets_list)
+        assets_list = classified["nodes"]
 
         await tqdm_manager.add_mission("_generate_all_nodes", len(assets_list))
         await rdm.r.hset(status_key, 'step_name', "生成资产树节点")
         await rdm.r.hset(status_key, 'step_progress', 0)
-        tasks = [asyncio.create_task(generate_with_semaphore(asset)) for asset in assets_list]
-        await asyncio.gather(*tasks)
+
+        asset_rows = [
+            ({"item_id": asset["item_id"], "owner_id": asset["owner_id"]}, asset)
+            for asset in assets_list
+        ]
+
+        # 每个空间站只需处理一次，未缓存的空间站信息并发拉取
+        station_id_set = {asset["location_id"] for asset in classified["station"]}
+        station_rows, system_rows, station_link_rows = [], [], []
+        for rows in await asyncio.gather(*[self.get_station_node_rows(station_id) for station_id in station_id_set]):
+            if not rows:
+                continue
+            station_rows.append(rows[0])
+            system_rows.append(rows[1])
+            station_link_rows.append(rows[2])
+
+        async with CREATE_STATION_SEMAPHORE:
+            await NIU.merge_node_batch("Asset", asset_rows, chunk_size=ASSET_IMPORT_CHUNK_SIZE)
+            await rdm.r.hset(status_key, 'step_progress', 0.5)
+            await NIU.merge_node_batch("Station", station_rows)
+            await NIU.merge_node_batch("SolarSystem", system_rows)
+            await NIU.link_node_batch("Station", "LOCATED_IN", "SolarSystem", station_link_rows)
+
+        await tqdm_manager.update_mission("_generate_all_nodes", len(assets_list))
+        await rdm.r.hset(status_key, 'step_progress', 1)
         await tqdm_manager.complete_mission("_generate_all_nodes")
 
-    async def _generate_all_locate_relation(self, assets_list: list[dict], mission_obj: M_EveAssetPullMission):
+    async def _generate_all_locate_relation(self, classified: dict, mission_obj: M_EveAssetPullMission):
         status_key = f'asset_pull_mission_status:{mission_obj.asset_owner_type}:{mission_obj.asset_owner_id}'
-        structure_nodes = await NAU.get_structure_nodes()
-        structure_item_id_list = [structure.get("structure_id", None) for structure in structure_nodes]
-        
-        last_progress = 0
-        async def generate_with_semaphore(asset: dict):
-            nonlocal last_progress
-            async with neo4j_manager.semaphore:
-                if asset["location_type"] == 'station':
-                    await NIU.link_node(
-                        "Asset",
-                        {
-                            "item_id": asset["item_id"],
-                            "type_id": asset["type_id"],
-                            "owner_id": mission_obj.asset_owner_id,
-                        },
-                        {},
-                        "LOCATED_IN",
-                        {},{},
-                        "Station",
-                        {
-                            "station_id": asset["location_id"],
-                        },
-                        {}
-                    )
-                elif asset["location_type"] == 'solar_system':
-                    if asset["item_id"] in structure_item_id_list:
-                        return
-                    system_info = await SdeUtils.get_system_info_by_id(asset["location_id"])
-                    system_node = {
-                        'system_id': system_info['system_id'],
-                        'system_name': system_info['system_name'],
-                        'region_id': system_info['region_id'],
-                        'region_name': system_info['region_name'],
-                    }
-                    async with CREATE_STATION_SEMAPHORE:
-                        await NIU.merge_node(
-                            "SolarSystem",
-                            {
-                                "solar_system_id": system_info["system_id"],
-                            },
-                            system_node
-                        )
-                    await NIU.link_node(
-                        "Asset",
-                        {
-                            "item_id": asset["item_id"],
-                            "type_id": asset["type_id"],
-                            "owner_id": mission_obj.asset_owner_id,
-                        },
-                        {
-                            "item_id": asset["item_id"],
-                            "type_id": asset["type_id"],
-                            "owner_id": mission_obj.asset_owner_id,
-                        },
-                        "LOCATED_IN",
-                        {},{},
-                        "SolarSystem",
-                        {"solar_system_id": system_info["system_id"]},
-                        {"solar_system_id": system_info["system_id"]}
-                    )
-                else:
-                    if asset["location_id"] in structure_item_id_list:
-                        await NIU.link_node(
-                            "Asset",
-                            {
-                                "item_id": asset["item_id"],
-                                "type_id": asset["type_id"],
-                                "owner_id": mission_obj.asset_owner_id,
-                            },
-                            {
-                                "item_id": asset["item_id"],
-                                "type_id": asset["type_id"],
-                                "owner_id": mission_obj.asset_owner_id,
-                            },
-                            "LOCATED_IN",
-                            {},{},
-                            "Structure",
-                            {"structure_id": asset["location_id"]},
-                            {"structure_id": asset["location_id"]}
-                        )
-                    else:
-                        await NIU.link_node(
-                            "Asset",
-                            {
-                                "item_id": asset["item_id"],
-                                "type_id": asset["type_id"],
-                                "owner_id": mission_obj.asset_owner_id,
-                            },
-                            {
-                                "item_id": asset["item_id"],
-                                "type_id": asset["type_id"],
-                                "owner_id": asset["owner_id"],
-                            },
-                            "LOCATED_IN",
-                            {},{},
-                            "Asset",
-                            {
-                                "item_id": asset["location_id"],
-                                "owner_id": asset["owner_id"],
-                            },
-                            {
-                                "item_id": asset["location_id"],
-                                "owner_id": mission_obj.asset_owner_id,
-                            }
-                        )
-                now_progress = await tqdm_manager.update_mission("_generate_all_locate_relation", 1)
-                if now_progress / len(assets_list) > last_progress + 0.1:
-                    await rdm.r.hset(status_key, 'step_progress', now_progress / len(assets_list))
-                    last_progress = now_progress / len(assets_list)
-
-        await tqdm_manager.add_mission("_generate_all_locate_relation", len(assets_list))
+        relation_count = sum(len(classified[key]) for key in ("station", "solar_system", "structure", "nested"))
+
+        await tqdm_manager.add_mission("_generate_all_locate_relation", relation_count)
         await rdm.r.hset(status_key, 'step_name', "生成资产树关系")
         await rdm.r.hset(status_key, 'step_progress', 0)
-        tasks = [asyncio.create_task(generate_with_semaphore(asset)) for asset in assets_list]
-        # await asyncio.gather(*tasks)
-        while True:
-            uncompleted_tasks = [task for task in tasks if not task.done()]
-            if not uncompleted_tasks:
-                break
-            await asyncio.sleep(0.1)  # 避免 CPU 占用过高
+
+        def asset_index(asset: dict) -> dict:
+            return {
+                "item_id": asset["item_id"],
+                "type_id": asset["type_id"],
+                "owner_id": mission_obj.asset_owner_id,
+            }
+
+        # 按目标节点类型分组，每组一次批量写入
+        station_link_rows = [
+            (asset_index(asset), {}, {}, {}, {"station_id": asset["location_id"]}, {})
+            for asset in classified["station"]
+        ]
+
+        system_rows = {}
+        system_link_rows = []
+        for asset in classified["solar_system"]:
+            system_info = classified["system_infos"].get(asset["location_id"])
+            if not system_info:
+                logger.error(f"星系{asset['location_id']}不存在，跳过资产{asset['item_id']}")
+                continue
+            system_rows[system_info["system_id"]] = (
+                {"solar_system_id": system_info["system_id"]},
+                {
+                    'system_id': system_info['system_id'],
+                    'system_name': system_info['system_name'],
+                    'region_id': system_info['region_id'],
+                    'region_name': system_info['region_name'],
+                }
+            )
+            system_link_rows.append((
+                asset_index(asset), asset_index(asset),
+                {}, {},
+                {"solar_system_id": system_info["system_id"]},
+                {"solar_system_id": system_info["system_id"]}
+            ))
+
+        structure_link_rows = [
+            (
+                asset_index(asset), asset_index(asset),
+                {}, {},
+                {"structure_id": asset["location_id"]},
+                {"structure_id": asset["location_id"]}
+            )
+            for asset in classified["structure"]
+        ]
+
+        asset_link_rows = [
+            (
+                asset_index(asset),
+                {
+                    "item_id": asset["item_id"],
+                    "type_id": asset["type_id"],
+                    "owner_id": asset["owner_id"],
+                },
+                {}, {},
+                {
+                    "item_id": asset["location_id"],
+                    "owner_id": asset["owner_id"],
+                },
+                {
+                    "item_id": asset["location_id"],
+                    "owner_id": mission_obj.asset_owner_id,
+                }
+            )
+            for asset in classified["nested"]
+        ]
+
+        await NIU.link_node_batch("Asset", "LOCATED_IN", "Station", station_link_rows, chunk_size=ASSET_IMPORT_CHUNK_SIZE)
+        await rdm.r.hset(status_key, 'step_progress', 0.25)
+        async with CREATE_STATION_SEMAPHORE:
+            await NIU.merge_node_batch("SolarSystem", list(system_rows.values()))
+        await NIU.link_node_batch("Asset", "LOCATED_IN", "SolarSystem", system_link_rows, chunk_size=ASSET_IMPORT_CHUNK_SIZE)
+        await rdm.r.hset(status_key, 'step_progress', 0.5)
+        await NIU.link_node_batch("Asset", "LOCATED_IN", "Structure", structure_link_rows, chunk_size=ASSET_IMPORT_CHUNK_SIZE)
+        await rdm.r.hset(status_key, 'step_progress', 0.75)
+        await NIU.link_node_batch("Asset", "LOCATED_IN", "Asset", asset_link_rows, chunk_size=ASSET_IMPORT_CHUNK_SIZE)
+        await rdm.r.hset(status_key, 'step_progress', 1)
+
+        await tqdm_manager.update_mission("_generate_all_locate_relation", relation_count)
         await tqdm_manager.complete_mission("_generate_all_locate_relation")
 
     async def _generate_forbidden_structure_node(self, mission_obj: M_EveAssetPullMission):
@@ -525,35 +519,80 @@ class AssetManager(metaclass=SingletonMeta):
             await rdm.r.hset(status_key, 'step_progress', now_progress / len(structure_asset_nodes))
         await tqdm_manager.complete_mission("_update_structure_node")
 
-    async def processing_asset_pull_mission(self, mission_obj: M_EveAssetPullMission):
+    async def processing_asset_pull_mission(self, mission_obj: M_EveAssetPullMission, full_resync: bool = False):
         status_key = f'asset_pull_mission_status:{mission_obj.asset_owner_type}:{mission_obj.asset_owner_id}'
+        snapshot = AssetSnapshot(mission_obj.asset_owner_type, mission_obj.asset_owner_id)
 
+        access_character = await CharacterManager().get_character_by_character_id(mission_obj.access_character_id)
         if mission_obj.asset_owner_type == 'character':
-            pull_function = eveesi.characters_character_assets
-
+            fetch_page = lambda page: eveesi.characters_character_assets_page(
+                access_character.ac_token, mission_obj.asset_owner_id, page
+            )
         elif mission_obj.asset_owner_type == 'corp':
-            pull_function = eveesi.corporations_corporation_assets
+            fetch_page = lambda page: eveesi.corporations_corporation_assets_page(
+                access_character.ac_token, mission_obj.asset_owner_id, page
+            )
+        else:
+            raise KahunaException(f"资产所有者类型{mission_obj.asset_owner_type}不存在")
+
+        last_snapshot = None if full_resync else await snapshot.load()
+        if last_snapshot is None:
+            # 全量重建
+            await rdm.r.hset(status_key, 'step_name', "清理旧数据")
+            await self.clean_asset_pull_mission_assets(mission_obj)
+
+        # 逐页拉取并写入：处理当前页时下一页已在请求中，内存中只保留各资产的摘要
+        new_digests = {}
+        upserted_digests = {}
+        finished_page = 0
+        async for _, assets_page, pages in iter_esi_pages(fetch_page):
+            if last_snapshot is None:
+                upserted_assets = assets_page
+                page_digests = {asset["item_id"]: asset_digest(asset) for asset in assets_page}
+            else:
+                # 增量同步：只写入新增、变化的资产
+                inserted_assets, changed_assets, page_digests = AssetSnapshot.diff(last_snapshot, assets_page)
+                # 位置变化的资产先删除旧的 LOCATED_IN，节点与子资产的入边保留
+                await NAU.delete_asset_locations(mission_obj.asset_owner_id, [asset["item_id"] for asset in changed_assets])
+                upserted_assets = inserted_assets + changed_assets
+            new_digests.update(page_digests)
+
+            if upserted_assets:
+                # 内存中分类并批量解析名称，再按类别批量写入节点和关系
+                classified = await self._classify_assets(upserted_assets, mission_obj)
+                await self._generate_all_nodes(classified, mission_obj)
+                await self._generate_all_locate_relation(classified, mission_obj)
+                upserted_digests.update({asset["item_id"]: page_digests[asset["item_id"]] for asset in upserted_assets})
+
+            finished_page += 1
+            await rdm.r.hset(status_key, mapping={
+                'step_name': "拉取并导入资产", 'total_page': pages, 'finished_page': finished_page,
+                'step_progress': finished_page / pages
+            })
 
-        access_character = await CharacterManager().get_character_by_character_id(mission_obj.access_character_id)
+        deleted_item_ids = []
+        if last_snapshot is not None:
+            # 删除已消失的资产
+            deleted_item_ids = [item_id for item_id in last_snapshot if item_id not in new_digests]
+            await NAU.delete_assets_by_item_ids(mission_obj.asset_owner_id, deleted_item_ids)
+            logger.info(
+                f"资产增量同步 {mission_obj.asset_owner_type}:{mission_obj.asset_owner_id}: "
+                f"写入 {len(upserted_digests)}, 删除 {len(deleted_item_ids)}"
+            )
 
-        await rdm.r.hset(status_key, 'step_name', "通过api拉取资产")
-        assets = await pull_function(
-            access_character.ac_token,
-            mission_obj.asset_owner_id,
-            status_key=status_key
-        )
-        assets_list = []
-        for assets_list_batch in assets:
-            assets_list.extend(assets_list_batch)
-
-        # 生成所有节点
-        await self._generate_all_nodes(assets_list, mission_obj)
-        await self._generate_all_locate_relation(assets_list, mission_obj)
-        await self._generate_forbidden_structure_node(mission_obj)
-        await self._update_structure_node(mission_obj)
+        if upserted_digests:
+            await self._generate_forbidden_structure_node(mission_obj)
+            await self._update_structure_node(mission_obj)
+
+        if last_snapshot is None:
+            await snapshot.replace(new_digests)
+        else:
+            await snapshot.update(upserted_digests, deleted_item_ids)
         
     async def clean_asset_pull_mission_assets(self, mission_obj: M_EveAssetPullMission):
+        """全量清理资产所有者的资产节点，同时清除增量同步快照"""
         owner_id = mission_obj.asset_owner_id
+        await AssetSnapshot(mission_obj.asset_owner_type, owner_id).clear()
         await NAU.delete_assets_by_owner_id(owner_id)
 
     async def search_container_by_item_name(self, user_name, item_name: str):
@@ -631,49 +670,54 @@ class AssetManager(metaclass=SingletonMeta):
 
         asset_data = await NAU.get_asset_in_container_list([asset_view.asset_container_id])
 
-        async def check_filter(asset: dict):
-            view_filter = asset_view.filter
+        # 过滤和名称所需的 SDE 属性按 type_id 一次批量查询
+        view_filter = asset_view.filter or []
+        filter_types = {f['type'] for f in view_filter}
+        type_ids = {asset.get('type_id', None) for asset in asset_data}
+        sde_lookup = {}
+        if 'group' in filter_types:
+            sde_lookup['group'] = (await SdeUtils.get_groupnames_by_ids(type_ids), await SdeUtils.get_groupnames_by_ids(type_ids, True))
+        if 'meta' in filter_types:
+            sde_lookup['meta'] = (await SdeUtils.get_metanames_by_typeids(type_ids), await SdeUtils.get_metanames_by_typeids(type_ids, True))
+        if 'category' in filter_types:
+            sde_lookup['category'] = (await SdeUtils.get_categories_by_ids(type_ids), await SdeUtils.get_categories_by_ids(type_ids, True))
+        if 'marketGroup' in filter_types:
+            sde_lookup['marketGroup'] = (await SdeUtils.get_market_group_lists_by_ids(type_ids), await SdeUtils.get_market_group_lists_by_ids(type_ids, True))
+
+        def check_filter(asset: dict):
+            type_id = asset.get('type_id', None)
             for f in view_filter:
                 if f['type'] == 'location_flag' and asset.get('location_flag', None) != f['value']:
                     return False
-                if f['type'] == 'type_id' and asset.get('type_id', None) != f['value']:
+                if f['type'] == 'type_id' and type_id != f['value']:
                     return False
-                if f['type'] == 'group':
-                    group = await SdeUtils.get_groupname_by_id(asset.get('type_id', None))
-                    group_zh = await SdeUtils.get_groupname_by_id(asset.get('type_id', None), True)
-                    if group != f['value'] and group_zh != f['value']:
-                        return False
-                if f['type'] == 'meta':
-                    meta = await SdeUtils.get_metaname_by_typeid(asset.get('type_id', None))
-                    meta_zh = await SdeUtils.get_metaname_by_typeid(asset.get('type_id', None), True)
-                    if meta != f['value'] and meta_zh != f['value']:
+                if f['type'] in ('group', 'meta', 'category'):
+                    en_values, zh_values = sde_lookup[f['type']]
+                    if en_values.get(type_id) != f['value'] and zh_values.get(type_id) != f['value']:
                         return False
                 if f['type'] == 'marketGroup':
-                    market_group_list = await SdeUtils.get_market_group_list(asset.get('type_id', None))
-                    market_group_list_zh = await SdeUtils.get_market_group_list(asset.get('type_id', None), True)
-                    if f['value'] not in market_group_list and f['value'] not in market_group_list_zh:
-                        return False
-                if f['type'] == 'category':
-                    category = await SdeUtils.get_category_by_id(asset.get('type_id', None))
-                    category_zh = await SdeUtils.get_category_by_id(asset.get('type_id', None), True)
-                    if category != f['value'] and category_zh != f['value']:
+                    en_values, zh_values = sde_lookup['marketGroup']
+                    if f['value'] not in en_values.get(type_id, []) and f['value'] not in zh_values.get(type_id, []):
                         return False
             return True
 
         asset_dict = {}
         for asset in asset_data:
             type_id = asset['type_id']
-            if not await check_filter(asset):
+            if not check_filter(asset):
                 continue
             if type_id not in asset_dict:
                 asset_dict[type_id] = {
                     'type_id': type_id,
-                    'type_name': await SdeUtils.get_name_by_id(type_id),
-                    'type_name_zh': await SdeUtils.get_name_by_id(type_id, 'zh'),
                     'quantity': 0
                 }
             asset_dict[type_id]['quantity'] += asset['quantity']
 
+        type_names = await SdeUtils.get_names_by_ids(asset_dict.keys())
+        type_names_zh = await SdeUtils.get_names_by_ids(asset_dict.keys(), True)
+        for type_id, item in asset_dict.items():
+            item['type_name'] = type_names.get(type_id)
+            item['type_name_zh'] = type_names_zh.get(type_id)
 
         return asset_dict
 
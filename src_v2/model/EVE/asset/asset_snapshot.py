@@ -0,0 +1,83 @@
+import hashlib
+import json
+from typing import Dict, List, Optional, Tuple
+
+from src_v2.core.config.config import config
+from src_v2.core.database.connect_manager import redis_manager as rdm
+
+# 快照过期后下一次拉取自动全量重建，用于纠正 Neo4j 与快照之间可能的偏差
+ASSET_SNAPSHOT_TTL = config.getint('ASSET', 'Snapshot_TTL', fallback=7 * 24 * 3600)
+
+# 参与比较的 ESI 资产字段
+SNAPSHOT_FIELDS = (
+    "type_id", "location_id", "location_type", "location_flag",
+    "quantity", "is_singleton", "is_blueprint_copy",
+)
+
+
+def asset_digest(asset: dict) -> str:
+    """资产的紧凑摘要，任一比较字段变化（移动、数量变化等）时摘要变化"""
+    values = json.dumps([asset.get(field) for field in SNAPSHOT_FIELDS], separators=(",", ":"))
+    return hashlib.blake2b(values.encode(), digest_size=8).hexdigest()
+
+
+class AssetSnapshot:
+    """某个资产所有者上次导入的资产快照
+
+    Redis hash asset_snapshot:{owner_type}:{owner_id}，field 为 item_id，value 为 asset_digest。
+    """
+
+    def __init__(self, owner_type: str, owner_id: int):
+        self.key = f"asset_snapshot:{owner_type}:{owner_id}"
+
+    async def load(self) -> Optional[Dict[int, str]]:
+        """返回 {item_id: digest}；快照不存在时返回 None"""
+        cached = await rdm.r.hgetall(self.key)
+        if not cached:
+            return None
+        return {int(item_id): digest for item_id, digest in cached.items()}
+
+    @staticmethod
+    def diff(snapshot: Dict[int, str], assets_list: List[dict]) -> Tuple[List[dict], List[dict], Dict[int, str]]:
+        """比较快照与一页新资产
+
+        Returns:
+            (新增资产, 变化资产, 本页全部资产的 {item_id: digest})
+        """
+        inserted, changed = [], []
+        digests = {}
+        for asset in assets_list:
+            item_id = asset["item_id"]
+            digest = asset_digest(asset)
+            digests[item_id] = digest
+            old_digest = snapshot.get(item_id)
+            if old_digest is None:
+                inserted.append(asset)
+            elif old_digest != digest:
+                changed.append(asset)
+        return inserted, changed, digests
+
+    async def replace(self, digests: Dict[int, str]):
+        """用新的 {item_id: digest} 整体替换快照"""
+        async with rdm.r.pipeline(transaction=True) as pipe:
+            pipe.delete(self.key)
+            if digests:
+                pipe.hset(self.key, mapping=digests)
+                pipe.expire(self.key, ASSET_SNAPSHOT_TTL)
+            await pipe.execute()
+
+    async def update(self, upserted: Dict[int, str], deleted: List[int]):
+        """增量更新快照，不刷新过期时间，保证定期全量重建"""
+        async with rdm.r.pipeline(transaction=True) as pipe:
+            if deleted:
+                pipe.hdel(self.key, *deleted)
+            if upserted:
+                pipe.hset(self.key, mapping=upserted)
+            pipe.ttl(self.key)
+            results = await pipe.execute()
+        # 快照被删空后重建的 key 没有过期时间
+        if results[-1] == -1:
+            await rdm.r.expire(self.key, ASSET_SNAPSHOT_TTL)
+
+    async def clear(self):
+        await rdm.r.delete(self.key)
@@ -1,7 +1,7 @@
 import asyncio
 
 from ..esi_req_manager import esi_request
-from ..eveutils import get_request_async, OUT_PAGE_ERROR
+from ..eveutils import get_request_async, OUT_PAGE_ERROR, parse_token
 from src_v2.core.utils import tqdm_manager
 
 from src_v2.core.database.connect_manager import redis_manager as rdm
@@ -93,4 +93,25 @@ async def characters_character_assets(access_token, character_id: int, page: int
         data.append(data_page)
     await tqdm_manager.complete_mission(f'characters_character_assets_{character_id}')
 
-    return data
\ No newline at end of file
+    return data
+
+# 单页版本，返回 (data, pages)，配合 iter_esi_pages 流式处理
+@esi_request
+async def corporations_corporation_assets_page(access_token, corporation_id: int, page: int=1, max_retries=3, log=True):
+    ac_token = await parse_token(access_token)
+    data, pages, _ = await get_request_async(
+        f"https://esi.evetech.net/latest/corporations/{corporation_id}/assets/",
+        headers={"Authorization": f"Bearer {ac_token}"}, params={"page": page}, log=log, max_retries=max_retries,
+        no_retry_code=[OUT_PAGE_ERROR]
+    )
+    return data, pages
+
+@esi_request
+async def characters_character_assets_page(access_token, character_id: int, page: int=1, max_retries=3, log=True):
+    ac_token = await parse_token(access_token)
+    data, pages, _ = await get_request_async(
+        f"https://esi.evetech.net/latest/characters/{character_id}/assets/",
+        headers={"Authorization": f"Bearer {ac_token}"}, params={"page": page}, log=log, max_retries=max_retries,
+        no_retry_code=[OUT_PAGE_ERROR]
+    )
+    return data, pages
@@ -48,6 +48,17 @@ async def characters_character_id_blueprints(access_token, character_id: int, pa
 
     return data
 
+# 单页版本，返回 (data, pages)，配合 iter_esi_pages 流式处理
+@esi_request
+async def characters_character_id_blueprints_page(access_token, character_id: int, page: int=1, max_retries=3, log=True):
+    access_token = await parse_token(access_token)
+    data, pages, _ = await get_request_async(
+        f"https://esi.evetech.net/latest/characters/{character_id}/blueprints/",
+        headers={"Authorization": f"Bearer {access_token}"}, params={"page": page}, log=log, max_retries=max_retries,
+        no_retry_code=[OUT_PAGE_ERROR]
+    )
+    return data, pages
+
 
 
 @esi_request
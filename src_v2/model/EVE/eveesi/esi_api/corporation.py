@@ -1,7 +1,7 @@
 import asyncio
 
 from ..esi_req_manager import esi_request
-from ..eveutils import get_request_async, OUT_PAGE_ERROR
+from ..eveutils import get_request_async, OUT_PAGE_ERROR, parse_token
 from src_v2.core.utils import tqdm_manager
 
 
@@ -55,6 +55,17 @@ async def corporations_corporation_id_blueprints(access_token, corporation_id: i
 
     return data
 
+# 单页版本，返回 (data, pages)，配合 iter_esi_pages 流式处理
+@esi_request(limit=2/3)
+async def corporations_corporation_id_blueprints_page(access_token, corporation_id: int, page: int=1, max_retries=3, log=True):
+    ac_token = await parse_token(access_token)
+    data, pages, _ = await get_request_async(
+        f"https://esi.evetech.net/latest/corporations/{corporation_id}/blueprints/",
+        headers={"Authorization": f"Bearer {ac_token}"}, params={"page": page}, log=log, max_retries=max_retries,
+        no_retry_code=[OUT_PAGE_ERROR]
+    )
+    return data, pages
+
 # Get corporation members
 # esi-corporations.read_corporation_membership.v1
 # https://esi.evetech.net/corporations/{corporation_id}/members
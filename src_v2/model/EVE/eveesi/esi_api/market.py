@@ -4,6 +4,8 @@ from ..esi_req_manager import esi_request
 from ..eveutils import get_request_async, OUT_PAGE_ERROR
 from src_v2.core.utils import tqdm_manager
 
+# 市场订单分页接口每页约 1 MB、每 5 分钟刷新，响应不进入 ESI 响应缓存（use_cache=False）
+
 
 # List orders in a structure
 # esi-markets.structure_markets.v1
@@ -17,7 +19,7 @@ async def markets_structures(access_token, structure_id: int, page: int=1, test=
     data, pages, _ = await get_request_async(
         f"https://esi.evetech.net/markets/structures/{structure_id}/",
         headers={"Authorization": f"Bearer {ac_token}"}, params={"page": page}, log=log, max_retries=max_retries,
-        no_retry_code=[OUT_PAGE_ERROR]
+        no_retry_code=[OUT_PAGE_ERROR], use_cache=False
     )
 
     if test or page != 1:
@@ -47,7 +49,7 @@ async def markets_region_orders(region_id: int, type_id: int = None, page: int=1
         params["type_id"] = type_id
     data, pages, _ = await get_request_async(
         f"https://esi.evetech.net/markets/{region_id}/orders/", headers={},
-       params=params, log=log, max_retries=max_retries, no_retry_code=[OUT_PAGE_ERROR]
+       params=params, log=log, max_retries=max_retries, no_retry_code=[OUT_PAGE_ERROR], use_cache=False
     )
     if page != 1:
         await tqdm_manager.update_mission(f'markets_region_orders_{region_id}')
@@ -65,6 +67,18 @@ async def markets_region_orders(region_id: int, type_id: int = None, page: int=1
     await tqdm_manager.complete_mission(f'markets_region_orders_{region_id}')
     return data
 
+# 单页版本，返回 (data, pages)，用于调用方逐页流式处理
+@esi_request(limit=20)
+async def markets_region_orders_page(region_id: int, page: int=1, type_id: int = None, max_retries=3, log=True):
+    params = {"page": page}
+    if type_id is not None:
+        params["type_id"] = type_id
+    data, pages, _ = await get_request_async(
+        f"https://esi.evetech.net/markets/{region_id}/orders/", headers={},
+       params=params, log=log, max_retries=max_retries, no_retry_code=[OUT_PAGE_ERROR], use_cache=False
+    )
+    return data, pages
+
 # List market prices
 # https://esi.evetech.net/markets/prices
 @esi_request
@@ -0,0 +1,124 @@
+import json
+import time
+import base64
+import hashlib
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Optional, Any, Dict
+
+from src_v2.core.config.config import config
+from src_v2.core.database.connect_manager import redis_manager as rdm
+from src_v2.core.log import logger
+
+ESI_CACHE_ENABLE = config.getboolean('ESI_CACHE', 'Enable', fallback=True)
+# 过期后继续保留缓存的时间为 Expires 窗口的 Retention_Factor 倍，最多 Retention 秒，用于 If-None-Match 条件请求
+ESI_CACHE_RETENTION = config.getint('ESI_CACHE', 'Retention', fallback=3600)
+ESI_CACHE_RETENTION_FACTOR = config.getint('ESI_CACHE', 'Retention_Factor', fallback=2)
+
+# 为 True 时 get_request_async 只读取未过期缓存，未命中则抛出 EsiCacheMiss（不发起请求）
+esi_cache_only: ContextVar[bool] = ContextVar('esi_cache_only', default=False)
+# get_request_async 未发起 HTTP 请求、直接返回缓存时置为 True，用于返还令牌
+esi_cache_served: ContextVar[bool] = ContextVar('esi_cache_served', default=False)
+
+
+class EsiCacheMiss(Exception):
+    """仅缓存模式下缓存未命中"""
+
+
+def _get_token_subject(headers: Optional[Dict[str, str]]) -> str:
+    """从 Authorization 头中取出 token 的 sub（角色），token 刷新后仍命中同一缓存"""
+    if not headers:
+        return ""
+    authorization = headers.get("Authorization", "")
+    if not authorization.startswith("Bearer "):
+        return ""
+    token = authorization[len("Bearer "):]
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload))["sub"]
+    except Exception:
+        return hashlib.sha1(token.encode()).hexdigest()
+
+
+def _parse_expires(expires: Optional[str]) -> float:
+    if not expires:
+        return 0.0
+    try:
+        return parsedate_to_datetime(expires).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _cache_ttl(expires_at: float) -> int:
+    """Redis 键的存活时间：Expires 窗口加上按窗口比例保留的时间"""
+    window = max(1, int(expires_at - time.time()))
+    return window + min(ESI_CACHE_RETENTION, window * ESI_CACHE_RETENTION_FACTOR)
+
+
+class EsiResponseCache:
+    """基于 Redis 的 ESI 响应缓存
+
+    以 URL + 参数 + token 角色为键，保存 ETag、响应体、X-Pages 和 Expires：
+        - Expires 之前直接返回缓存
+        - 过期后携带 If-None-Match 请求，304 时刷新过期时间并返回缓存
+    """
+
+    @staticmethod
+    def get_key(url: str, params: Optional[Dict[str, Any]], headers: Optional[Dict[str, str]]) -> str:
+        params_str = json.dumps(params or {}, sort_keys=True, default=str)
+        digest = hashlib.sha1(f"{url}|{params_str}|{_get_token_subject(headers)}".encode()).hexdigest()
+        return f"esi_cache:{digest}"
+
+    @staticmethod
+    async def get(key: str) -> Optional[Dict[str, Any]]:
+        if not ESI_CACHE_ENABLE:
+            return None
+        try:
+            cached = await rdm.r.hgetall(key)
+        except Exception as e:
+            logger.debug(f"读取 ESI 缓存失败: {e}")
+            return None
+        if not cached:
+            return None
+        return {
+            "etag": cached.get("etag", ""),
+            "body": cached.get("body", ""),
+            "pages": int(cached["pages"]) if cached.get("pages") else None,
+            "expires": float(cached.get("expires", 0)),
+        }
+
+    @staticmethod
+    async def set(key: str, etag: Optional[str], body: str, pages: Optional[int], expires: Optional[str]):
+        if not ESI_CACHE_ENABLE:
+            return
+        expires_at = _parse_expires(expires)
+        # 既没有 ETag 也没有 Expires 的响应无法复用
+        if not etag and expires_at <= time.time():
+            return
+        try:
+            async with rdm.r.pipeline(transaction=False) as pipe:
+                pipe.hset(key, mapping={
+                    "etag": etag or "",
+                    "body": body,
+                    "pages": pages or "",
+                    "expires": expires_at,
+                })
+                pipe.expire(key, _cache_ttl(expires_at))
+                await pipe.execute()
+        except Exception as e:
+            logger.debug(f"写入 ESI 缓存失败: {e}")
+
+    @staticmethod
+    async def refresh(key: str, expires: Optional[str]):
+        """304 时刷新过期时间"""
+        if not ESI_CACHE_ENABLE:
+            return
+        expires_at = _parse_expires(expires)
+        try:
+            async with rdm.r.pipeline(transaction=False) as pipe:
+                pipe.hset(key, "expires", expires_at)
+                pipe.expire(key, _cache_ttl(expires_at))
+                await pipe.execute()
+        except Exception as e:
+            logger.debug(f"刷新 ESI 缓存失败: {e}")
@@ -1,17 +1,20 @@
 import time
 import math
 import asyncio
+import inspect
 from collections import deque, defaultdict
 from functools import wraps
 from typing import Callable, Any, Awaitable, Dict, Optional, List, Tuple
 
 from src_v2.core.log import logger
+from .eveutils import esi_session_pool
+from .esi_cache import ESI_CACHE_ENABLE, EsiCacheMiss, esi_cache_only, esi_cache_served
 
 # 定义请求对象类型
 class EsiRequest:
-    def __init__(self, func: Callable, args: Tuple, kwargs: Dict, future: asyncio.Future, required_tokens: int = 60, limit: int = 5):
+    def __init__(self, func: Callable, args: Tuple, kwargs: Dict, future: asyncio.Future, required_tokens: int = 60, limit: int = 5, func_name: Optional[str] = None):
         self.func = func  # ESI函数
-        self.func_name = func.__name__  # 函数名称
+        self.func_name = func_name or func.__name__  # 函数名称（接口限速和轮询的分组键）
         self.args = args  # 位置参数
         self.kwargs = kwargs  # 关键字参数
         self.future = future  # 用于返回结果的Future对象
@@ -20,103 +23,76 @@ class EsiRequest:
         self.limit = limit  # 该接口的限速值（每秒请求上限）
 
 class EsiReqManager:
+    """ESI 请求调度器
+
+    全局令牌桶（每秒 token_generation_rate 个，上限 max_token_pool）+ 每个接口的令牌桶（每秒 limit 个）。
+    调度协程按接口轮询出队，令牌足够时立即派发；不足时精确计算需要等待的时间，
+    期间有新请求或令牌返还时会被唤醒重新计算。
+    所有队列和令牌操作都在同一个事件循环内、不跨越 await 完成，因此无需额外加锁。
+    """
     def __init__(self):
         # 使用字典存储不同函数类型的请求队列，实现轮询调度
         self.request_queues = defaultdict(deque)  # {func_name: deque([reqs])}
-        self.request_queue_keys = deque()  # 改为 deque，用于轮询
-        self.processing_queue = deque()
-        self.queue_event = asyncio.Event()  # 用于通知队列处理协程有新请求
-        self.process_event = asyncio.Event()
-        self.queue_lock = asyncio.Lock()  # 保护队列操作的锁
+        self.request_queue_keys = deque()  # 有待处理请求的函数名，用于轮询
+        self.queue_event = asyncio.Event()  # 新请求到达 / 令牌返还时唤醒调度协程
         
-        # 令牌池管理
+        # 全局令牌池管理
         self.token_pool = 0.0  # 当前可用令牌数（初始为0）
         self.token_generation_rate = 300  # 每秒产生300个令牌
         self.max_token_pool = 600  # 令牌池最大容量
-        self.last_token_update_time = time.time()  # 上次更新令牌的时间戳
+        self.last_token_update_time = time.monotonic()  # 上次更新令牌的时间戳
         self.lock = asyncio.Lock()  # 保护令牌池操作的锁
+
+        # 接口令牌桶 {func_name: [allowance, last_update_time]}，每秒产生 limit 个，上限 max(1, limit)
+        self.endpoint_allowance: Dict[str, List[float]] = {}
         
         # 日志
         self.logger = logger
         
-        # 启动队列处理协程
-        self._queue_task = None
-        self._processing_task = None
+        self._scheduler_task = None
+        self._active_tasks = set()
 
     async def start(self):
-        """启动请求处理协程"""
-        if self._queue_task is None or self._queue_task.done():
-            self._queue_task = asyncio.create_task(self._accept_request())
-            self.logger.info("ESI请求队列处理协程已启动")
-        if self._processing_task is None or self._processing_task.done():
-            self._processing_task = asyncio.create_task(self._process_request())
-            self.logger.info("ESI处理队列处理协程已启动")
+        """启动调度协程"""
+        if self._scheduler_task is None or self._scheduler_task.done():
+            self.last_token_update_time = time.monotonic()
+            self._scheduler_task = asyncio.create_task(self._schedule())
+            self.logger.info("ESI请求调度协程已启动")
 
     async def stop(self):
-        """停止请求处理协程"""
-        # 先停止处理任务，因为它可能依赖队列任务
-        if self._processing_task and not self._processing_task.done():
-            self._processing_task.cancel()
-            try:
-                await self._processing_task
-            except asyncio.CancelledError:
-                pass
-            self.logger.info("ESI处理队列处理协程已停止")
-        
-        # 然后停止队列任务
-        if self._queue_task and not self._queue_task.done():
-            self._queue_task.cancel()
+        """停止调度协程，等待已派发的请求完成，取消未派发的请求"""
+        if self._scheduler_task and not self._scheduler_task.done():
+            self._scheduler_task.cancel()
             try:
-                await self._queue_task
+                await self._scheduler_task
             except asyncio.CancelledError:
                 pass
-            self.logger.info("ESI请求队列处理协程已停止")
+            self.logger.info("ESI请求调度协程已停止")
 
-    async def get_tokens(self, required_tokens: int) -> bool:
-        """
-        获取指定数量的令牌，如果令牌不足则返回False
-        令牌按时间连续累积，每秒产生token_generation_rate个令牌
-        返回: True表示获取成功并已消耗令牌，False表示令牌不足
+    def _refill(self, now: float):
+        """按时间连续累积全局令牌（不超过最大容量）"""
+        time_passed = now - self.last_token_update_time
+        self.token_pool = min(self.max_token_pool, self.token_pool + time_passed * self.token_generation_rate)
+        self.last_token_update_time = now
+
+    def _endpoint_wait(self, req: EsiRequest, now: float) -> float:
+        """接口令牌桶还需等待的秒数，0 表示可以派发
+
+        桶容量至少为 1，limit < 1 的接口（如每 1.5 秒一次）也能攒满一个令牌。
         """
-        async with self.lock:
-            current_time = time.time()
-            
-            # 计算自上次更新以来的时间差
-            time_passed = current_time - self.last_token_update_time
-            
-            # 根据时间差累积令牌（不超过最大容量）
-            tokens_to_add = time_passed * self.token_generation_rate
-            token_pool_before = self.token_pool
-            self.token_pool = min(self.max_token_pool, self.token_pool + tokens_to_add)
-            self.last_token_update_time = current_time
-            
-            # Debug日志：记录令牌获取过程
-            self.logger.debug(
-                f"获取令牌请求: 需要 {required_tokens} 个, "
-                f"时间差 {time_passed:.3f}s, "
-                f"累积 {tokens_to_add:.2f} 个, "
-                f"令牌池: {token_pool_before:.2f} -> {self.token_pool:.2f} (最大 {self.max_token_pool})"
-            )
-            
-            # 检查是否有足够的令牌
-            if self.token_pool >= required_tokens:
-                # 立即消耗令牌
-                self.token_pool -= required_tokens
-                self.logger.debug(
-                    f"令牌获取成功: 消耗 {required_tokens} 个, "
-                    f"剩余令牌池: {self.token_pool:.2f}"
-                )
-                return True
-            
-            # 令牌不足
-            tokens_needed = required_tokens - self.token_pool
-            self.logger.debug(
-                f"令牌获取失败: 需要 {required_tokens} 个, "
-                f"当前可用 {self.token_pool:.2f} 个, "
-                f"还差 {tokens_needed:.2f} 个, "
-                f"预计等待时间: {tokens_needed / self.token_generation_rate:.2f}s"
-            )
-            return False
+        capacity = max(1.0, float(req.limit))
+        allowance = self.endpoint_allowance.setdefault(req.func_name, [capacity, now])
+        allowance[0] = min(capacity, allowance[0] + (now - allowance[1]) * req.limit)
+        allowance[1] = now
+        if allowance[0] >= 1:
+            return 0.0
+        return (1 - allowance[0]) / req.limit
+
+    def _global_wait(self, req: EsiRequest) -> float:
+        """全局令牌池还需等待的秒数，0 表示可以派发"""
+        if self.token_pool >= req.required_tokens:
+            return 0.0
+        return (req.required_tokens - self.token_pool) / self.token_generation_rate
     
     async def deduct_error_penalty(self, penalty_tokens: int = 220):
         """
@@ -127,13 +103,9 @@ class EsiReqManager:
         """
         async with self.lock:
             # 更新令牌池（先累积令牌）
-            current_time = time.time()
-            time_passed = current_time - self.last_token_update_time
-            tokens_to_add = time_passed * self.token_generation_rate
             token_pool_before = self.token_pool
-            self.token_pool = min(self.max_token_pool, self.token_pool + tokens_to_add)
+            self._refill(time.monotonic())
             token_pool_after_update = self.token_pool
-            self.last_token_update_time = current_time
             
             # 扣除惩罚令牌（允许为负数，表示需要等待更长时间）
             self.token_pool -= penalty_tokens
@@ -141,8 +113,6 @@ class EsiReqManager:
             # Debug日志：记录错误惩罚过程
             self.logger.debug(
                 f"错误惩罚: 扣除 {penalty_tokens} 个令牌, "
-                f"时间差 {time_passed:.3f}s, "
-                f"累积 {tokens_to_add:.2f} 个, "
                 f"令牌池: {token_pool_before:.2f} -> {token_pool_after_update:.2f} -> {self.token_pool:.2f}"
             )
             
@@ -152,176 +122,124 @@ class EsiReqManager:
                 f"当前令牌池: {self.token_pool:.2f}, "
                 f"预计恢复时间: {max(0, -self.token_pool) / self.token_generation_rate:.2f}s"
             )
-    
+
+    async def refund_tokens(self, tokens: int):
+        """返还令牌（请求未真正发出时使用），不超过最大容量"""
+        async with self.lock:
+            self.token_pool = min(self.max_token_pool, self.token_pool + tokens)
+        self.queue_event.set()
+
     async def add_request(self, req: EsiRequest):
-        """添加请求到队列（按函数名分组）"""
-        async with self.queue_lock:
-            func_name = req.func_name
-            # 如果这个函数类型还没有队列，添加到轮询列表
-            if func_name not in self.request_queues or len(self.request_queues[func_name]) == 0:
-                if func_name not in self.request_queue_keys:
-                    self.request_queue_keys.append(func_name)
-            self.request_queues[func_name].append(req)
-            self.queue_event.set()  # 通知队列处理协程
+        """添加请求到队列（按函数名分组），并唤醒调度协程"""
+        func_name = req.func_name
+        # 如果这个函数类型还没有待处理请求，加入轮询列表
+        if not self.request_queues[func_name]:
+            self.request_queue_keys.append(func_name)
+        self.request_queues[func_name].append(req)
+        self.queue_event.set()
 
-    def _get_next_request(self) -> Optional[EsiRequest]:
+    def _dispatch_ready(self) -> Optional[float]:
         """
-        轮询获取下一个请求，确保不同函数类型的请求都能得到公平处理
-        返回: 下一个要处理的请求，如果没有则返回None
+        轮询各接口队列，派发所有令牌足够的请求
+        返回: 下一个请求需要等待的秒数；没有待处理请求时返回 None
         """
-        if not self.request_queue_keys:
-            return None
-        
-        # 轮询所有有请求的函数类型
-        attempts = 0
-        max_attempts = len(self.request_queue_keys)
-        
-        while attempts < max_attempts:
-            # 取出第一个函数名，尝试获取其队列中的请求
-            func_name = self.request_queue_keys[0]
-            self.request_queue_keys.rotate(-1)  # 将第一个移到末尾，实现轮询
-            
-            queue = self.request_queues[func_name]
-            if queue:
-                req = queue.popleft()
-                # 如果这个函数类型的队列空了，从轮询列表中移除
-                if not queue:
-                    self.request_queue_keys.remove(func_name)
-                    max_attempts -= 1
-                return req
-            else:
-                # 队列为空，从轮询列表中移除
-                self.request_queue_keys.remove(func_name)
-                max_attempts -= 1
-            
-            attempts += 1
-        
-        return None
+        while self.request_queue_keys:
+            now = time.monotonic()
+            self._refill(now)
+            wait = None
+            dispatched = False
+            for _ in range(len(self.request_queue_keys)):
+                func_name = self.request_queue_keys[0]
+                queue = self.request_queues[func_name]
+                req = queue[0]
 
-    def process_request(self, req: EsiRequest):
-        self.processing_queue.append(req)
-        self.process_event.set()
+                endpoint_wait = self._endpoint_wait(req, now)
+                if endpoint_wait > 0:
+                    # 接口限速，不影响其他接口
+                    self.request_queue_keys.rotate(-1)
+                    wait = endpoint_wait if wait is None else min(wait, endpoint_wait)
+                    continue
 
-    async def _process_request(self):
-        """处理请求队列的协程"""
-        self.logger.info("开始处理ESI处理队列")
+                global_wait = self._global_wait(req)
+                if global_wait > 0:
+                    # 全局令牌不足，保持该接口在队首，避免小请求一直插队
+                    wait = global_wait if wait is None else min(wait, global_wait)
+                    break
 
-        active_set = set()
-        async def single_process(req):
-            try:
-                result = await req.func()
-                
-                # 检测错误响应：如果返回值是元组且包含状态码，检查是否为非2xx/3xx响应
-                # 注意：只有直接调用 get_request_async 并返回 (data, pages, status_code) 的函数才会被检测
-                # 其他函数如果返回 None，也可能表示错误，但为了准确性，我们只检测明确包含状态码的情况
-                if isinstance(result, tuple) and len(result) >= 3:
-                    status_code = result[2]
-                    # 检查状态码是否为非2xx/3xx响应
-                    if isinstance(status_code, int) and not (200 <= status_code < 400):
-                        # 检测到错误响应，扣除惩罚令牌
-                        await self.deduct_error_penalty(220)
-                        self.logger.warning(f"检测到ESI错误响应，状态码: {status_code}，已扣除惩罚令牌")
-                
-                if not req.future.done():
-                    req.future.set_result(result)
-            except Exception as e:
-                # 异常也视为错误，扣除惩罚令牌
-                await self.deduct_error_penalty(220)
-                self.logger.warning(f"ESI请求异常: {str(e)}，已扣除惩罚令牌")
-                
-                if not req.future.done():
-                    req.future.set_exception(e)
+                queue.popleft()
+                self.token_pool -= req.required_tokens
+                self.endpoint_allowance[func_name][0] -= 1
+                if queue:
+                    self.request_queue_keys.rotate(-1)
                 else:
-                    self.logger.error(f"Future already done when setting exception: {str(e)}", exc_info=True)
-        def done_call_back(task):
-            try:
-                active_set.discard(task)
-            except Exception:
-                pass
-
-        while True:
-            # 如果队列为空，等待新请求
-            if not self.processing_queue:
-                # self.logger.debug("处理队列为空，等待中。")
-                self.process_event.clear()
-                await self.process_event.wait()
-                # self.logger.debug("获得处理任务，进行处理。")
-        
-            try:
-                # 获取当前队列中的所有请求，但最多处理30个，避免内存占用过高
-                batch_size = min(len(self.processing_queue), 30)
-
-                # 为每个请求获取token
-                for _ in range(batch_size):
-                    if not self.processing_queue:
-                        break
-                    # 检查队列中第一个请求是否有足够的令牌
-                    req = self.processing_queue[0]  # 查看但不移除
-                    # 获取指定数量的令牌
-                    if await self.get_tokens(req.required_tokens):
-                        # 令牌足够，移除请求并处理
-                        req = self.processing_queue.popleft()
-                        task = asyncio.create_task(single_process(req))
-                        active_set.add(task)
-                        task.add_done_callback(done_call_back)
-                    else:
-                        # 令牌不足，跳过这个请求，等待下次循环（令牌会继续累积）
-                        break
-
-                await asyncio.sleep(1)
+                    self.request_queue_keys.popleft()
+                task = asyncio.create_task(self._run_request(req))
+                self._active_tasks.add(task)
+                task.add_done_callback(self._active_tasks.discard)
+                dispatched = True
 
-            except asyncio.CancelledError:
-                self.logger.info("ESI请求队列处理协程被取消")
-                # 等待所有活动任务完成
-                if active_set:
-                    await asyncio.gather(*active_set, return_exceptions=True)
-                # 将所有未处理的请求设置为取消状态
-                while self.processing_queue:
-                    req = self.processing_queue.popleft()
-                    if not req.future.done():
-                        req.future.cancel()
-                raise
-            except Exception as e:
-                self.logger.error(f"处理ESI请求队列时出错: {str(e)}", exc_info=True)
-                # 如果出错，短暂暂停后继续
-                await asyncio.sleep(1)
+            if not dispatched:
+                return wait
+        return None
 
-    async def _accept_request(self):
-        """处理请求队列的协程（使用轮询调度）"""
-        self.logger.info("开始处理ESI请求队列")
-        while True:
-            # 使用轮询方式获取下一个请求
-            async with self.queue_lock:
-                req = self._get_next_request()
+    async def _run_request(self, req: EsiRequest):
+        try:
+            esi_cache_served.set(False)
+            result = await req.func()
+            if esi_cache_served.get():
+                # 直接返回了未过期缓存，没有真正请求ESI，返还令牌
+                await self.refund_tokens(req.required_tokens)
             
-            if req is None:
-                # 没有请求，等待新请求
-                self.logger.debug("请求队列为空，等待中。")
-                self.queue_event.clear()
-                await self.queue_event.wait()
-                self.logger.debug("获得请求任务，进行处理。")
-                continue
+            # 检测错误响应：如果返回值是元组且包含状态码，检查是否为非2xx/3xx响应
+            # 注意：只有直接调用 get_request_async 并返回 (data, pages, status_code) 的函数才会被检测
+            # 其他函数如果返回 None，也可能表示错误，但为了准确性，我们只检测明确包含状态码的情况
+            if isinstance(result, tuple) and len(result) >= 3:
+                status_code = result[2]
+                # 检查状态码是否为非2xx/3xx响应
+                if isinstance(status_code, int) and not (200 <= status_code < 400):
+                    # 检测到错误响应，扣除惩罚令牌
+                    await self.deduct_error_penalty(220)
+                    self.logger.warning(f"检测到ESI错误响应，状态码: {status_code}，已扣除惩罚令牌")
+            
+            if not req.future.done():
+                req.future.set_result(result)
+        except Exception as e:
+            # 异常也视为错误，扣除惩罚令牌
+            await self.deduct_error_penalty(220)
+            self.logger.warning(f"ESI请求异常: {str(e)}，已扣除惩罚令牌")
+            
+            if not req.future.done():
+                req.future.set_exception(e)
+            else:
+                self.logger.error(f"Future already done when setting exception: {str(e)}", exc_info=True)
 
+    async def _schedule(self):
+        """调度协程：派发令牌足够的请求，其余按精确等待时间休眠或被新请求唤醒"""
+        self.logger.info("开始调度ESI请求")
+        while True:
             try:
-                # 执行ESI函数
+                self.queue_event.clear()
+                wait = self._dispatch_ready()
                 try:
-                    self.process_request(req)
-                except Exception as e:
-                    req.future.set_exception(e)
-                    self.logger.error(f"执行ESI请求时出错: {str(e)}", exc_info=True)
-
+                    # wait 为 None 表示没有待处理请求，只等待新请求
+                    await asyncio.wait_for(self.queue_event.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
             except asyncio.CancelledError:
-                self.logger.info("ESI请求队列处理协程被取消")
+                self.logger.info("ESI请求调度协程被取消")
+                # 等待所有已派发的请求完成
+                if self._active_tasks:
+                    await asyncio.gather(*self._active_tasks, return_exceptions=True)
                 # 将所有未处理的请求设置为取消状态
-                async with self.queue_lock:
-                    for queue in self.request_queues.values():
-                        while queue:
-                            req = queue.popleft()
-                            if not req.future.done():
-                                req.future.cancel()
+                for queue in self.request_queues.values():
+                    while queue:
+                        req = queue.popleft()
+                        if not req.future.done():
+                            req.future.cancel()
+                self.request_queue_keys.clear()
                 raise
             except Exception as e:
-                self.logger.error(f"处理ESI请求队列时出错: {str(e)}", exc_info=True)
+                self.logger.error(f"调度ESI请求时出错: {str(e)}", exc_info=True)
                 # 如果出错，短暂暂停后继续
                 await asyncio.sleep(1)
 
@@ -338,6 +256,16 @@ def esi_request(limit: int = 5):
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
+            # 参数中没有待 await 的 token 时，先尝试只读缓存执行：命中未过期缓存则不占用令牌
+            if ESI_CACHE_ENABLE and not any(inspect.isawaitable(arg) for arg in (*args, *kwargs.values())):
+                cache_only_token = esi_cache_only.set(True)
+                try:
+                    return await func(*args, **kwargs)
+                except EsiCacheMiss:
+                    pass
+                finally:
+                    esi_cache_only.reset(cache_only_token)
+
             # 计算该接口需要的令牌数量
             # required_tokens = token_generation_rate / limit，向上取整，确保至少为1
             token_generation_rate = esi_manager.token_generation_rate
@@ -354,7 +282,7 @@ def esi_request(limit: int = 5):
                     logger.error(f"执行ESI函数时出错: {str(e)}", exc_info=True)
                     raise
 
-            req = EsiRequest(execute_func, args, kwargs, future, required_tokens=required_tokens, limit=limit)
+            req = EsiRequest(execute_func, args, kwargs, future, required_tokens=required_tokens, limit=limit, func_name=func.__name__)
 
             # 将请求添加到队列
             await esi_manager.add_request(req)
@@ -380,8 +308,10 @@ def esi_request(limit: int = 5):
 
 # 确保应用启动时初始化ESI管理器
 async def init_esi_manager():
+    await esi_session_pool.start()
     await esi_manager.start()
 
 # 确保应用关闭时停止ESI管理器
 async def shutdown_esi_manager():
-    await esi_manager.stop()
\ No newline at end of file
+    await esi_manager.stop()
+    await esi_session_pool.close()
\ No newline at end of file
@@ -1,15 +1,108 @@
 import json
+import time
 from datetime import datetime, timezone
 import asyncio
-from typing import Optional, Any
+from typing import Optional, Any, AsyncIterator, Awaitable, Callable, Tuple
 import aiohttp
 import traceback
 
+from src_v2.core.config.config import config
 from src_v2.core.log import logger
+from .esi_cache import EsiResponseCache, EsiCacheMiss, esi_cache_only, esi_cache_served
 
 OUT_PAGE_ERROR = 404
 FORBIDDEN_ERROR = 403
 
+# 分页接口同时在途的页数
+ESI_PAGE_CONCURRENCY = config.getint('ESI_HTTP', 'Page_Concurrency', fallback=8)
+
+
+class EsiSessionPool:
+    """进程内共享的 ESI aiohttp 会话
+
+    所有 ESI 请求复用同一个 ClientSession / TCPConnector，保持 HTTP keep-alive 并缓存 DNS，
+    通过 TraceConfig 统计连接复用与新建次数。
+    由 init_esi_manager 启动、shutdown_esi_manager 关闭；未启动时首次请求会自动创建。
+    """
+
+    def __init__(self):
+        self.limit = config.getint('ESI_HTTP', 'Limit', fallback=100)
+        self.limit_per_host = config.getint('ESI_HTTP', 'Limit_Per_Host', fallback=50)
+        self.dns_cache_ttl = config.getint('ESI_HTTP', 'DNS_Cache_TTL', fallback=300)
+        self.keepalive_timeout = config.getint('ESI_HTTP', 'Keepalive_Timeout', fallback=30)
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {
+            "requests": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "dns_cache_hit": 0,
+            "dns_cache_miss": 0,
+        }
+
+    def _create_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        def counter(key):
+            async def on_event(session, ctx, params):
+                self.stats[key] += 1
+            return on_event
+
+        trace_config.on_request_start.append(counter("requests"))
+        trace_config.on_connection_create_end.append(counter("connections_created"))
+        trace_config.on_connection_reuseconn.append(counter("connections_reused"))
+        trace_config.on_dns_cache_hit.append(counter("dns_cache_hit"))
+        trace_config.on_dns_cache_miss.append(counter("dns_cache_miss"))
+        return trace_config
+
+    async def start(self):
+        """创建共享会话"""
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        self._session = aiohttp.ClientSession(connector=connector, trace_configs=[self._create_trace_config()])
+        self._loop = asyncio.get_running_loop()
+        logger.info(
+            f"ESI 会话池已启动: limit={self.limit}, limit_per_host={self.limit_per_host}, "
+            f"dns_cache_ttl={self.dns_cache_ttl}s, keepalive_timeout={self.keepalive_timeout}s"
+        )
+
+    async def close(self):
+        """关闭共享会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info(f"ESI 会话池已关闭: {self.stats}")
+        self._session = None
+        self._loop = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """获取共享会话；未启动或事件循环已变化时重新创建"""
+        if self._session is None or self._session.closed or self._loop is not asyncio.get_running_loop():
+            await self._drop_stale_session()
+            await self.start()
+        return self._session
+
+    async def _drop_stale_session(self):
+        """关闭属于旧事件循环的会话，释放其连接器和连接；旧循环已关闭导致无法关闭时记录后丢弃"""
+        if self._session is not None and not self._session.closed:
+            try:
+                await self._session.close()
+                logger.info("事件循环已变化，关闭旧的 ESI 会话")
+            except Exception as e:
+                logger.warning(f"关闭旧的 ESI 会话失败，直接丢弃: {e}")
+        self._session = None
+        self._loop = None
+
+
+esi_session_pool = EsiSessionPool()
+
 class DateTimeEncoder(json.JSONEncoder):
     """Custom JSONEncoder subclass to handle datetime objects."""
 
@@ -36,7 +129,7 @@ def parse_iso_datetime(dt_string):
 
 
 async def get_request_async(
-        url, headers=None, params=None, log=True, max_retries=2, timeout=60, no_retry_code = None
+        url, headers=None, params=None, log=True, max_retries=2, timeout=60, no_retry_code = None, use_cache=True
 ) -> Optional[Any]:
     """
     异步发送GET请求，带有重试机制
@@ -48,40 +141,59 @@ async def get_request_async(
         log: 是否记录日志
         max_retries: 最大重试次数
         timeout: 超时时间（秒）
+        use_cache: 是否使用 ETag / Expires 响应缓存
     Returns:
-        (data, pages, status_code): 成功时返回数据和页数及状态码
+        (data, pages, status_code): 成功时返回数据和页数及状态码（命中 ETag 时状态码为304）
         (None, 0, status_code): 失败时返回None和状态码
     """
+    cache_key = EsiResponseCache.get_key(url, params, headers) if use_cache else None
+    cached = await EsiResponseCache.get(cache_key) if cache_key else None
+    if cached and cached["expires"] > time.time():
+        esi_cache_served.set(True)
+        return json.loads(cached["body"]), cached["pages"], 200
+    if esi_cache_only.get():
+        raise EsiCacheMiss(url)
+    if cached and cached["etag"]:
+        headers = {**(headers or {}), "If-None-Match": cached["etag"]}
+
     for attempt in range(max_retries):
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, headers=headers,
-                                       timeout=aiohttp.ClientTimeout(total=timeout)) as response:
-                    status_code = response.status
-                    if status_code == 200:
-                        try:
-                            data = await asyncio.wait_for(response.json(), timeout=timeout)
-                            pages = response.headers.get('X-Pages')
-                            if pages:
-                                pages = int(pages)
-
-                            return data, pages, status_code
-                        except asyncio.TimeoutError:
-                            if log:
-                                logger.warning(f"JSON解析超时 (尝试 {attempt + 1}/{max_retries}): {url}")
-                            if attempt == max_retries - 1:
-                                raise
-                            continue
-                    elif no_retry_code and status_code in no_retry_code:
-                        return [], 0, status_code
-                    else:
-                        response_text = await response.text()
+            session = await esi_session_pool.get_session()
+            async with session.get(url, params=params, headers=headers,
+                                   timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                status_code = response.status
+                if status_code == 200:
+                    try:
+                        body = await asyncio.wait_for(response.text(), timeout=timeout)
+                        data = json.loads(body)
+                        pages = response.headers.get('X-Pages')
+                        if pages:
+                            pages = int(pages)
+
+                        if cache_key:
+                            await EsiResponseCache.set(
+                                cache_key, response.headers.get('ETag'), body, pages, response.headers.get('Expires')
+                            )
+                        return data, pages, status_code
+                    except asyncio.TimeoutError:
                         if log:
-                            logger.warning(f"请求失败 (尝试 {attempt + 1}/{max_retries}): {url}")
-                            logger.warning(f'{status_code}:{response_text}')
+                            logger.warning(f"JSON解析超时 (尝试 {attempt + 1}/{max_retries}): {url}")
                         if attempt == max_retries - 1:
-                            return None, 0, status_code
-                        await asyncio.sleep(1 * (attempt + 1))  # 指数退避
+                            raise
+                        continue
+                elif status_code == 304 and cached:
+                    await EsiResponseCache.refresh(cache_key, response.headers.get('Expires'))
+                    return json.loads(cached["body"]), cached["pages"], status_code
+                elif no_retry_code and status_code in no_retry_code:
+                    return [], 0, status_code
+                else:
+                    response_text = await response.text()
+                    if log:
+                        logger.warning(f"请求失败 (尝试 {attempt + 1}/{max_retries}): {url}")
+                        logger.warning(f'{status_code}:{response_text}')
+                    if attempt == max_retries - 1:
+                        return None, 0, status_code
+                    await asyncio.sleep(1 * (attempt + 1))  # 指数退避
         except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             if log:
                 logger.error(f"请求异常 (尝试 {attempt + 1}/{max_retries}): {str(e)}")
@@ -99,4 +211,56 @@ async def parse_token(token):
     if not isinstance(token, str):
         return await token
     else:
-        return token
\ No newline at end of file
+        return token
+
+
+class EsiPageError(Exception):
+    """分页请求中某一页失败"""
+
+    def __init__(self, page: int):
+        super().__init__(f"ESI 第 {page} 页请求失败")
+        self.page = page
+
+
+async def iter_esi_pages(
+        fetch_page: Callable[[int], Awaitable[Tuple[Any, Optional[int]]]],
+        concurrency: int = ESI_PAGE_CONCURRENCY
+) -> AsyncIterator[Tuple[int, Any, int]]:
+    """流式分页：按完成顺序逐页产出 (page, data, pages)
+
+    先请求第 1 页取得总页数，其余页最多 concurrency 页同时在途；
+    调用方处理当前页期间不会发起新的请求（背压），内存占用与总页数无关。
+    任一页返回 None 时抛出 EsiPageError；调用方提前结束迭代时取消在途请求。
+
+    Args:
+        fetch_page: async (page) -> (data, pages)，如 markets_region_orders_page
+        concurrency: 同时在途的页数
+    """
+    data, pages = await fetch_page(1)
+    if data is None:
+        raise EsiPageError(1)
+    pages = pages or 1
+    yield 1, data, pages
+    del data
+
+    async def fetch(page: int):
+        page_data, _ = await fetch_page(page)
+        return page, page_data
+
+    next_page = 2
+    pending = set()
+    try:
+        while next_page <= pages or pending:
+            while next_page <= pages and len(pending) < concurrency:
+                pending.add(asyncio.create_task(fetch(next_page)))
+                next_page += 1
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                page, page_data = task.result()
+                if page_data is None:
+                    raise EsiPageError(page)
+                yield page, page_data, pages
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
@@ -7,8 +7,8 @@ from sqlalchemy import select
 from ..sde import SdeUtils
 from ..sde.sde_builder import IndustryActivityMaterials, IndustryActivityProducts, IndustryBlueprints, InvTypes, IndustryActivities
 from ..sde.utils import get_db_manager
+from .blueprint_graph import blueprint_graph
 from src_v2.core.database.neo4j_utils import Neo4jIndustryUtils as NIU
-from src_v2.core.database.connect_manager import neo4j_manager
 from src_v2.core.utils import tqdm_manager
 
 from src_v2.core.log import logger
@@ -69,41 +69,18 @@ class BPManager:
     }
 
     @classmethod
-    @async_lru_cache(maxsize=1000)
     async def get_bp_materials(cls, type_id: int) -> dict:
-        async with (await get_db_manager()).get_session() as session:
-            stmt = (
-                select(IndustryActivityMaterials.materialTypeID, IndustryActivityMaterials.quantity)
-                .select_from(IndustryActivityMaterials)
-                .join(IndustryActivityProducts,
-                      IndustryActivityMaterials.blueprintTypeID == IndustryActivityProducts.blueprintTypeID)
-                .where((IndustryActivityProducts.productTypeID == type_id) &
-                       (IndustryActivityProducts.blueprintTypeID != 45732) &
-                       ((IndustryActivityMaterials.activityID == 1) | (IndustryActivityMaterials.activityID == 11)))
-            )
-            result = await session.execute(stmt)
-            return {row[0]: row[1] for row in result}
+        await blueprint_graph.ensure_loaded()
+        return blueprint_graph.get_materials(type_id)
 
     @classmethod
-    @async_lru_cache(maxsize=1000)
     async def get_bp_product_quantity_typeid(cls, type_id: int) -> int:
-        try:
-            #45732是一个测试用数据，会导致误判，需要特殊处理
-            async with (await get_db_manager()).get_session() as session:
-                stmt = (
-                    select(IndustryActivityProducts.quantity)
-                    .where((IndustryActivityProducts.productTypeID == type_id) &
-                           (IndustryActivityProducts.blueprintTypeID != 45732))
-                )
-                result = await session.execute(stmt)
-                product_quantity = result.scalar_one_or_none()
-                if product_quantity is None:
-                    logger.warning(f"get_bp_product_quantity_typeid: {type_id} not found")
-                    return 1
-                return product_quantity
-        except Exception as e:
-            logger.warning(f"get_bp_product_quantity_typeid: {type_id} error: {e}")
+        await blueprint_graph.ensure_loaded()
+        product_quantity = blueprint_graph.get_product_quantity(type_id)
+        if product_quantity is None:
+            logger.warning(f"get_bp_product_quantity_typeid: {type_id} not found")
             return 1
+        return product_quantity
 
     # @classmethod
     # def get_formula_id_by_prod_typeid(cls, type_id: int, unrefined: bool = False) -> int:
@@ -124,21 +101,10 @@ class BPManager:
     #              .where(IndustryActivityProducts.productTypeID == type_id)).scalar()
 
     @classmethod
-    @async_lru_cache(maxsize=100)
     async def get_bp_id_by_prod_typeid(cls, type_id: int) -> Optional[int]:
-        async with (await get_db_manager()).get_session() as session:
-            # 优先选择制造活动（activityID == 1），其次选择反应活动（activityID == 11）
-            # 因为同一个产品可能对应多个蓝图（制造、研究、复制等），需要明确选择
-            stmt = (
-                select(IndustryActivityProducts.blueprintTypeID)
-                .where((IndustryActivityProducts.productTypeID == type_id) &
-                       (IndustryActivityProducts.blueprintTypeID != 45732) &
-                       ((IndustryActivityProducts.activityID == 1) | (IndustryActivityProducts.activityID == 11)))
-                .order_by(IndustryActivityProducts.activityID)  # 优先 activityID == 1
-                .limit(1)
-            )
-            result = await session.execute(stmt)
-            return result.scalar_one_or_none()
+        # 优先选择制造活动（activityID == 1），其次选择反应活动（activityID == 11）
+        await blueprint_graph.ensure_loaded()
+        return blueprint_graph.get_blueprint_type_id(type_id)
 
     @classmethod
     @async_lru_cache(maxsize=100)
@@ -223,20 +189,10 @@ class BPManager:
         return max(1, 86400 // production_time)  # 86400秒 = 1天
 
     @classmethod
-    @async_lru_cache(maxsize=500)
     async def get_activity_id_by_product_typeid(cls, product_typeid: int) -> Optional[int]:
-        async with (await get_db_manager()).get_session() as session:
-            # 优先选择制造活动（activityID == 1），其次选择反应活动（activityID == 11）
-            stmt = (
-                select(IndustryActivityProducts.activityID)
-                .where((IndustryActivityProducts.productTypeID == product_typeid) &
-                       (IndustryActivityProducts.blueprintTypeID != 45732) &
-                       ((IndustryActivityProducts.activityID == 1) | (IndustryActivityProducts.activityID == 11)))
-                .order_by(IndustryActivityProducts.activityID)  # 优先 activityID == 1
-                .limit(1)
-            )
-            result = await session.execute(stmt)
-            return result.scalar_one_or_none()
+        # 优先选择制造活动（activityID == 1），其次选择反应活动（activityID == 11）
+        await blueprint_graph.ensure_loaded()
+        return blueprint_graph.get_activity_id(product_typeid)
 
     @classmethod
     @async_lru_cache(maxsize=1000)
@@ -357,97 +313,94 @@ class BPManager:
     async def init_bp_data_to_neo4j(cls):
         product_typeids = await cls.get_all_product_typeids()
         semaphore = asyncio.Semaphore(50)
-        # 使用信号量限制并发任务数量，防止连接池耗尽
+        # 使用信号量限制并发任务数量
         async def process_with_semaphore(product_typeid):
             async with semaphore:
-                return await cls.fill_bp_node_and_link_child(product_typeid, finished_set, root=True)
+                return await cls.fill_bp_node_and_link_child(product_typeid, finished_set, node_rows, link_rows, root=True)
 
         finished_set = set()
+        node_rows = []
+        link_rows = []
         await tqdm_manager.add_mission("init_bp_data_to_neo4j", len(product_typeids))
         tasks = [
             asyncio.create_task(process_with_semaphore(product_typeid)) for product_typeid in product_typeids
         ]
         await asyncio.gather(*tasks)
+        await cls.fill_bp_node_sde_properties(node_rows)
+
+        # 先写节点再写关系，整棵蓝图树按分片批量写入
+        await NIU.merge_node_batch("Blueprint", node_rows)
+        await NIU.link_node_batch("Blueprint", "BP_DEPEND_ON", "Blueprint", link_rows)
         await tqdm_manager.complete_mission("init_bp_data_to_neo4j")
 
     @classmethod
-    async def fill_bp_node_and_link_child(cls, product_typeid: int, finished_set: set, root=False):
+    async def fill_bp_node_sde_properties(cls, node_rows: list):
+        """批量查询并填充蓝图节点的名称、组、类别、meta 和市场组列表"""
+        type_ids = [properties["type_id"] for _, properties in node_rows]
+        type_names = await SdeUtils.get_names_by_ids(type_ids)
+        group_names = await SdeUtils.get_groupnames_by_ids(type_ids)
+        categories = await SdeUtils.get_categories_by_ids(type_ids)
+        metas = await SdeUtils.get_metanames_by_typeids(type_ids)
+        market_lists = await SdeUtils.get_market_group_lists_by_ids(type_ids)
+        for _, properties in node_rows:
+            type_id = properties["type_id"]
+            properties.update({
+                "type_name": type_names.get(type_id),
+                "group_name": group_names.get(type_id),
+                "category": categories.get(type_id),
+                "meta": metas.get(type_id),
+                "market_list": market_lists.get(type_id, []),
+            })
+
+    @classmethod
+    async def fill_bp_node_and_link_child(cls, product_typeid: int, finished_set: set, node_rows: list, link_rows: list, root=False):
+        """收集蓝图节点及其材料关系到 node_rows / link_rows，由调用方批量写入neo4j"""
         # 提前检查是否已完成，避免不必要的并发操作
         if f"fill_{product_typeid}" in finished_set:
             return
+        finished_set.add(f"fill_{product_typeid}")
         
         type_id = product_typeid
-        type_name = await SdeUtils.get_name_by_id(type_id)
-        group_name = await SdeUtils.get_groupname_by_id(type_id)
-        category = await SdeUtils.get_category_by_id(type_id)
-        meta = await SdeUtils.get_metaname_by_typeid(type_id)
-        market_list = await SdeUtils.get_market_group_list(type_id)
         activity_id = await cls.get_activity_id_by_product_typeid(type_id)
         bp_type_id = await cls.get_bp_id_by_prod_typeid(type_id)
 
-        async with neo4j_manager.semaphore:
-            # 再次检查，防止在等待信号量期间其他任务已完成
-            if f"fill_{product_typeid}" in finished_set:
-                return
-            finished_set.add(f"fill_{product_typeid}")
-            await NIU.merge_node(
-                "Blueprint",
-                {"type_id": type_id},
-                {
-                    "type_id": type_id,
-                    "type_name": type_name,
-                    "group_name": group_name,
-                    "category": category,
-                    "meta": meta,
-                    "market_list": market_list,
-                    "bp_type_id": bp_type_id
-                }
-            )
+        # 名称、组、类别等 SDE 属性由 fill_bp_node_sde_properties 统一批量填充
+        node_rows.append((
+            {"type_id": type_id},
+            {
+                "type_id": type_id,
+                "bp_type_id": bp_type_id
+            }
+        ))
 
         product_quantity = await cls.get_bp_product_quantity_typeid(type_id)
         childs = await cls.get_bp_materials(type_id)
         if not childs:
+            if root:
+                await tqdm_manager.update_mission("init_bp_data_to_neo4j", 1)
             return
 
-        # 使用信号量限制并发任务数量
-        async def link_with_semaphore(material_type_id, quantity):
-            # 提前检查是否已完成
+        # 安全获取 activity_type，如果 activity_id 为 None 或不在映射中，使用 "Unknown"
+        activity_type = cls.ACTIVITY_ID_MAP.get(activity_id, "Unknown") if activity_id is not None else "Unknown"
+        if activity_id is None:
+            logger.warning(f"[fill_bp_node_and_link_child] 产品 {type_id} 的 activity_id 为 None，使用默认 activity_type: Unknown")
+        for material_type_id, quantity in childs.items():
             if f"{type_id}_{material_type_id}" in finished_set:
-                return
-            async with neo4j_manager.semaphore:
-                # 再次检查，防止在等待信号量期间其他任务已完成
-                if f"{type_id}_{material_type_id}" in finished_set:
-                    return
-                finished_set.add(f"{type_id}_{material_type_id}")
-                # 安全获取 activity_type，如果 activity_id 为 None 或不在映射中，使用 "Unknown"
-                activity_type = cls.ACTIVITY_ID_MAP.get(activity_id, "Unknown") if activity_id is not None else "Unknown"
-                if activity_id is None:
-                    logger.warning(f"[link_with_semaphore] 产品 {type_id} 的 activity_id 为 None，使用默认 activity_type: Unknown")
-                return await NIU.link_node(
-                    "Blueprint",
-                    {"type_id": type_id}, {"type_id": type_id},
-                    "BP_DEPEND_ON",
-                    {"product": type_id, "material": material_type_id},
-                    {"product": type_id, "material": material_type_id,
-                    "material_num": quantity, "product_num": product_quantity,
-                    "activity_id": activity_id, "activity_type": activity_type},
-                    "Blueprint",
-                    {"type_id": material_type_id},
-                    {"type_id": material_type_id}
-                )
-        
-        tasks = [
-            asyncio.create_task(link_with_semaphore(material_type_id, quantity)) 
-            for material_type_id, quantity in childs.items() if f"{type_id}_{material_type_id}" not in finished_set
-        ]
-        await asyncio.gather(*tasks)
+                continue
+            finished_set.add(f"{type_id}_{material_type_id}")
+            link_rows.append((
+                {"type_id": type_id}, {"type_id": type_id},
+                {"product": type_id, "material": material_type_id},
+                {"product": type_id, "material": material_type_id,
+                 "material_num": quantity, "product_num": product_quantity,
+                 "activity_id": activity_id, "activity_type": activity_type},
+                {"type_id": material_type_id},
+                {"type_id": material_type_id}
+            ))
 
-        # 递归调用时也使用信号量限制并发
-        async def fill_with_semaphore(material_type_id):
-            return await cls.fill_bp_node_and_link_child(material_type_id, finished_set)
-        
         tasks = [
-            asyncio.create_task(fill_with_semaphore(material_type_id)) for material_type_id in childs if f"fill_{material_type_id}" not in finished_set
+            asyncio.create_task(cls.fill_bp_node_and_link_child(material_type_id, finished_set, node_rows, link_rows))
+            for material_type_id in childs if f"fill_{material_type_id}" not in finished_set
         ]
         await asyncio.gather(*tasks)
 
@@ -0,0 +1,229 @@
+# 标准库导入
+import asyncio
+import time
+from array import array
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+# 第三方库导入
+from sqlalchemy import select
+
+# 本地导入
+from src_v2.core.config.config import config
+from src_v2.core.log import logger
+from ..sde.sde_builder import IndustryActivityMaterials, IndustryActivityProducts
+from ..sde.utils import get_db_manager, get_sde_version
+
+# 45732是一个测试用数据，会导致误判，需要排除
+EXCLUDE_BLUEPRINT_TYPE_ID = 45732
+# 制造、反应
+MATERIAL_ACTIVITY_IDS = (1, 11)
+
+# SDE 版本检查间隔（秒），版本变化时自动重建
+VERSION_CHECK_INTERVAL = config.getint('INDUSTRY', 'Blueprint_Graph_Check_Interval', fallback=300)
+
+
+class BlueprintGraph:
+    """SDE 蓝图依赖图
+
+    启动时一次性读取 IndustryActivityProducts / IndustryActivityMaterials，
+    以产品 type_id 的稠密下标构建 CSR 邻接数组：
+        _material_offsets[i] : _material_offsets[i + 1] 为产品 i 的材料区间
+        _material_type_ids / _material_quantities 为材料 type_id 和数量
+    查询结果与 BPManager 原有 SQL 查询保持一致。
+    """
+
+    def __init__(self):
+        self._type_index: Dict[int, int] = {}
+        self._product_type_ids = array('q')
+        self._material_offsets = array('q', [0])
+        self._material_type_ids = array('q')
+        self._material_quantities = array('q')
+        # 0 表示产品行不唯一或不存在，按原逻辑返回 1
+        self._product_quantities = array('q')
+        # 0 表示没有制造/反应活动
+        self._activity_ids = array('q')
+        self._blueprint_type_ids = array('q')
+
+        self.sde_version: Optional[int] = None
+        self._loaded = False
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def invalidate(self):
+        """标记失效，下次访问时重建"""
+        self._loaded = False
+
+    async def ensure_loaded(self):
+        """确保图已加载；超过检查间隔时对比 SDE 版本，版本变化则重建"""
+        if self._loaded and time.monotonic() - self._checked_at < VERSION_CHECK_INTERVAL:
+            return
+        async with self._lock:
+            if self._loaded:
+                if time.monotonic() - self._checked_at < VERSION_CHECK_INTERVAL:
+                    return
+                self._checked_at = time.monotonic()
+                sde_version = await get_sde_version()
+                if sde_version == self.sde_version:
+                    return
+                logger.info(f"SDE 版本变化 {self.sde_version} -> {sde_version}，重建蓝图依赖图")
+            await self._load()
+
+    async def load(self):
+        """强制重建蓝图依赖图"""
+        async with self._lock:
+            await self._load()
+
+    async def _load(self):
+        start = time.perf_counter()
+        sde_version = await get_sde_version()
+        async with (await get_db_manager()).get_session() as session:
+            product_result = await session.execute(
+                select(
+                    IndustryActivityProducts.blueprintTypeID,
+                    IndustryActivityProducts.activityID,
+                    IndustryActivityProducts.productTypeID,
+                    IndustryActivityProducts.quantity
+                ).where(IndustryActivityProducts.blueprintTypeID != EXCLUDE_BLUEPRINT_TYPE_ID)
+            )
+            product_rows = product_result.all()
+            material_result = await session.execute(
+                select(
+                    IndustryActivityMaterials.blueprintTypeID,
+                    IndustryActivityMaterials.materialTypeID,
+                    IndustryActivityMaterials.quantity
+                ).where(IndustryActivityMaterials.activityID.in_(MATERIAL_ACTIVITY_IDS))
+            )
+            material_rows = material_result.all()
+
+        self.build(product_rows, material_rows)
+        self.sde_version = sde_version
+        self._checked_at = time.monotonic()
+        self._loaded = True
+        logger.info(
+            f"蓝图依赖图构建完成: sde_version={sde_version}, products={len(self._product_type_ids)}, "
+            f"edges={len(self._material_type_ids)}, 耗时 {time.perf_counter() - start:.2f}s"
+        )
+
+    def build(self, product_rows: List[Tuple[int, int, int, int]], material_rows: List[Tuple[int, int, int]]):
+        """由 SDE 行数据构建 CSR 数组
+
+        Args:
+            product_rows: [(blueprintTypeID, activityID, productTypeID, quantity), ...]，已排除测试蓝图
+            material_rows: [(blueprintTypeID, materialTypeID, quantity), ...]，仅制造/反应活动
+        """
+        bp_materials: Dict[int, List[Tuple[int, int]]] = {}
+        for bp_type_id, material_type_id, quantity in material_rows:
+            bp_materials.setdefault(bp_type_id, []).append((material_type_id, quantity))
+
+        product_bps: Dict[int, List[Tuple[int, int, int]]] = {}
+        for bp_type_id, activity_id, product_type_id, quantity in product_rows:
+            product_bps.setdefault(product_type_id, []).append((bp_type_id, activity_id, quantity))
+
+        type_index = {}
+        product_type_ids = array('q')
+        material_offsets = array('q', [0])
+        material_type_ids = array('q')
+        material_quantities = array('q')
+        product_quantities = array('q')
+        activity_ids = array('q')
+        blueprint_type_ids = array('q')
+
+        for product_type_id, bps in product_bps.items():
+            type_index[product_type_id] = len(product_type_ids)
+            product_type_ids.append(product_type_id)
+
+            # 与原 join 查询一致：产品的所有蓝图（不限活动）在制造/反应活动中的材料
+            materials: Dict[int, int] = {}
+            for bp_type_id, _, _ in bps:
+                for material_type_id, quantity in bp_materials.get(bp_type_id, ()):
+                    materials[material_type_id] = quantity
+            material_type_ids.extend(materials.keys())
+            material_quantities.extend(materials.values())
+            material_offsets.append(len(material_type_ids))
+
+            product_quantities.append(bps[0][2] if len(bps) == 1 else 0)
+
+            # 优先制造活动（activityID == 1），其次反应活动（activityID == 11）
+            activity_bps = [bp for bp in bps if bp[1] in MATERIAL_ACTIVITY_IDS]
+            if activity_bps:
+                bp_type_id, activity_id, _ = min(activity_bps, key=lambda bp: bp[1])
+                activity_ids.append(activity_id)
+                blueprint_type_ids.append(bp_type_id)
+            else:
+                activity_ids.append(0)
+                blueprint_type_ids.append(0)
+
+        self._type_index = type_index
+        self._product_type_ids = product_type_ids
+        self._material_offsets = material_offsets
+        self._material_type_ids = material_type_ids
+        self._material_quantities = material_quantities
+        self._product_quantities = product_quantities
+        self._activity_ids = activity_ids
+        self._blueprint_type_ids = blueprint_type_ids
+
+    def has_product(self, type_id: int) -> bool:
+        return type_id in self._type_index
+
+    def get_materials(self, type_id: int) -> Dict[int, int]:
+        """产品的材料 {material_type_id: quantity}"""
+        index = self._type_index.get(type_id)
+        if index is None:
+            return {}
+        start, end = self._material_offsets[index], self._material_offsets[index + 1]
+        return dict(zip(self._material_type_ids[start:end], self._material_quantities[start:end]))
+
+    def get_product_quantity(self, type_id: int) -> Optional[int]:
+        """单流程产出数量，产品行不存在或不唯一时返回 None"""
+        index = self._type_index.get(type_id)
+        if index is None:
+            return None
+        return self._product_quantities[index] or None
+
+    def get_activity_id(self, type_id: int) -> Optional[int]:
+        index = self._type_index.get(type_id)
+        if index is None:
+            return None
+        return self._activity_ids[index] or None
+
+    def get_blueprint_type_id(self, type_id: int) -> Optional[int]:
+        index = self._type_index.get(type_id)
+        if index is None:
+            return None
+        return self._blueprint_type_ids[index] or None
+
+    def expand_subtree(self, type_id: int) -> Tuple[List[int], List[Tuple[int, int, int, int, Optional[int]]]]:
+        """展开以 type_id 为根的完整依赖子树
+
+        Returns:
+            (type_ids, edges)
+            type_ids: 子树中所有节点的 type_id（按广度优先顺序，包含根节点）
+            edges: [(product, material, material_num, product_num, activity_id), ...]
+        """
+        type_ids = [type_id]
+        visited = {type_id}
+        edges = []
+        queue = deque([type_id])
+        while queue:
+            product_type_id = queue.popleft()
+            index = self._type_index.get(product_type_id)
+            if index is None:
+                continue
+            product_num = self._product_quantities[index] or 1
+            activity_id = self._activity_ids[index] or None
+            for offset in range(self._material_offsets[index], self._material_offsets[index + 1]):
+                material_type_id = self._material_type_ids[offset]
+                edges.append((product_type_id, material_type_id, self._material_quantities[offset], product_num, activity_id))
+                if material_type_id not in visited:
+                    visited.add(material_type_id)
+                    type_ids.append(material_type_id)
+                    queue.append(material_type_id)
+        return type_ids, edges
+
+
+blueprint_graph = BlueprintGraph()
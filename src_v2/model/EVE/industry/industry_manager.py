@@ -5,11 +5,12 @@ import json
 from asyncio import Queue
 from enum import Flag
 from itertools import product
-from math import ceil, sqrt
+from math import ceil
 from typing import Dict, List, Tuple
 from datetime import date, datetime
 
 # 本地导入 - 核心工具
+from src_v2.core.config.config import config
 from src_v2.core.database.connect_manager import (
     neo4j_manager,
     postgres_manager,
@@ -38,7 +39,9 @@ from src_v2.model.EVE.sde import SdeUtils
 
 # 本地导入 - 相对导入
 from .blueprint import BPManager as BPM
+from .blueprint_graph import blueprint_graph
 from .plan_configflow_operate import ConfigFlowOperateCenter
+from .industry_utils.configflow_cache import ConfigFlowCache
 
 # 本地导入 - industry_utils 工具模块
 from .industry_utils import (
@@ -63,10 +66,14 @@ from .industry_utils import (
     get_structure_list,
     get_structure_assign_keyword_suggestions,
     get_material_type,
+    get_material_types,
+    plan_logistics,
     get_item_info,
     get_type_list
 )
 
+# 计划树状态求解模式：memory（内存求解，批量写回）| neo4j（逐轮查询 Neo4j）
+PLAN_SOLVER_MODE = config.get('INDUSTRY', 'Plan_Solver', fallback='memory')
 
 
 class IndustryManager(metaclass=SingletonMeta):
@@ -108,17 +115,23 @@ class IndustryManager(metaclass=SingletonMeta):
         
         async for product in await EveIndustryPlanProductDBUtils.select_all_by_user_name(user_name):
             logger.info(f"获取计划表格数据: {product.plan_name} {product.product_type_id} {product.quantity}")
-            type_name = await SdeUtils.get_name_by_id(product.product_type_id)
-            type_name_zh = await SdeUtils.get_cn_name_by_id(product.product_type_id)
             plan_list[product.plan_name]["products"].append({
                 "row_id": await row_id_counter.next_node(),
                 "index_id": product.index_id,
                 "product_type_id": product.product_type_id,
                 "quantity": product.quantity,
-                "type_name": type_name,
-                "type_name_zh": type_name_zh
+                "type_name": None,
+                "type_name_zh": None
             })
 
+        products = [product for plan in plan_list.values() for product in plan["products"]]
+        product_type_ids = [product["product_type_id"] for product in products]
+        type_names = await SdeUtils.get_names_by_ids(product_type_ids)
+        type_names_zh = await SdeUtils.get_names_by_ids(product_type_ids, zh=True)
+        for product in products:
+            product["type_name"] = type_names.get(product["product_type_id"])
+            product["type_name_zh"] = type_names_zh.get(product["product_type_id"])
+
         return list(plan_list.values())
 
     @classmethod
@@ -195,6 +208,7 @@ class IndustryManager(metaclass=SingletonMeta):
 
         await rdm.r.hset(op.current_progress_key, mapping={"name": "数据汇总", "progress": 0})
         result_data = await IndustryManager.get_plan_tableview_data(op)
+        await op.save_derived_cache()
         await rdm.r.set(op.total_progress_key, 100)
         return result_data
 
@@ -229,6 +243,11 @@ class IndustryManager(metaclass=SingletonMeta):
 
     @classmethod
     async def create_plan_tree(cls, plan_data: dict, op: ConfigFlowOperateCenter):
+        """
+        为计划的所有产品创建 PlanBlueprint 节点树。
+        相同产品的依赖子树只展开一次，所有产品的节点与关系汇总后批量写入；
+        order_id 按产品顺序成块分配，与逐个产品创建时的结果一致。
+        """
         plan_name = plan_data["plan_name"]
         user_name = plan_data["user_name"]
         products = plan_data["products"]
@@ -238,31 +257,81 @@ class IndustryManager(metaclass=SingletonMeta):
         op.index_product_dict = {product["index_id"]: product["product_type_id"] for product in products}
         op.product_num_dict = {product["product_type_id"]: product["quantity"] for product in products}
 
-        last_progress = 0
-        await tqdm_manager.add_mission(f"create_plan_{plan_name}", len(products))
+        await rdm.r.hset(op.current_progress_key, mapping={"name": "创建计划树", "progress": 0})
+        # 1. 从内存蓝图依赖图展开子树，相同产品共享，节点属性从Blueprint节点一次批量读取
+        subtree_cache = {}
         for product in products:
-            # 将树连接到plan节点
-            await NIU.link_node(
-                "Plan",
+            if product["product_type_id"] not in subtree_cache:
+                subtree_cache[product["product_type_id"]] = await cls._expand_plan_bp_subtree(product["product_type_id"])
+        all_type_ids = list({node_type_id for type_ids, _ in subtree_cache.values() for node_type_id in type_ids})
+        blueprint_nodes = await NIU.get_nodes_properties_batch("Blueprint", "type_id", all_type_ids)
+
+        # 2. 按产品顺序生成所有节点与关系，同一节点保留最后一个产品写入的属性
+        node_properties = {}
+        root_link_rows = []
+        link_rows = []
+        for product in products:
+            type_id = product["product_type_id"]
+            index_id = product.get("index_id", 0)
+            subtree_type_ids, relationships_list = subtree_cache[type_id]
+            # 根关系与根节点各占一个计数，随后是子树的节点和关系（子树以根节点开头）
+            relation_start = await counter.allocate_relations(1 + len(relationships_list))
+            node_start = await counter.allocate_nodes(1 + len(subtree_type_ids))
+
+            # 将树连接到plan节点，根节点属性随子树节点写入
+            root_index = {**plan_user_dict, "type_id": type_id}
+            root_link_rows.append((
                 plan_user_dict,
                 plan_user_dict,
-                "PLAN_BP_DEPEND_ON",
-                {**plan_user_dict, "index_id": product["index_id"], "product": "root", "material": product["product_type_id"]},
-                {**plan_user_dict, "index_id": product["index_id"], "product": "root", "material": product["product_type_id"],
+                {**plan_user_dict, "index_id": index_id, "product": "root", "material": type_id},
+                {**plan_user_dict, "index_id": index_id, "product": "root", "material": type_id,
                  "status": "complete", "need_calculate": True, "quantity": product["quantity"], "real_quantity": product["quantity"],
-                 "product_num": 1, "material_num": product["quantity"], "order_id": await counter.next_relation()},
-                "PlanBlueprint",
-                {**plan_user_dict, "type_id": product["product_type_id"]},
-                {**plan_user_dict, "type_id": product["product_type_id"], "order_id": await counter.next_node()}
-            )
-            await cls._create_plan_bp_tree(plan_user_dict, product, counter)
-            mission_count = await tqdm_manager.update_mission(f"create_plan_{plan_name}", 1)
-            now_progress = mission_count / len(products) * 100
-            if now_progress > last_progress + 1:
-                await rdm.r.hset(op.current_progress_key, mapping={"name": "创建计划树", "progress": now_progress})
-                last_progress = now_progress
+                 "product_num": 1, "material_num": product["quantity"], "order_id": relation_start},
+                root_index,
+                root_index,
+            ))
 
-            # index_root节点更新需求数量，更新状态为finished.
+            # 从Blueprint节点复制属性，但添加plan_user_dict的属性
+            for offset, node_type_id in enumerate(subtree_type_ids, start=1):
+                node_properties[node_type_id] = {
+                    **node_properties.get(node_type_id, {}),
+                    **plan_user_dict,
+                    **blueprint_nodes.get(node_type_id, {"type_id": node_type_id}),
+                    "order_id": node_start + offset
+                }
+
+            for offset, (parent_type_id, child_type_id, rel_props) in enumerate(relationships_list, start=1):
+                source_index = {**plan_user_dict, "type_id": parent_type_id}
+                target_index = {**plan_user_dict, "type_id": child_type_id}
+                # 构建关系属性，包含plan_user_dict和原始关系的属性
+                plan_rel_properties = {
+                    **plan_user_dict,
+                    "index_id": index_id,
+                    **rel_props,  # 包含原始BP_DEPEND_ON关系的属性（如material_num, product_num等）
+                    "status": "disable",
+                    "order_id": relation_start + offset
+                }
+                # 构建关系索引（用于匹配已存在的关系）
+                plan_rel_index = {
+                    **plan_user_dict,
+                    "index_id": index_id,
+                    "product": parent_type_id,
+                    "material": child_type_id
+                }
+                # 源节点/目标节点属性与索引相同
+                link_rows.append((source_index, source_index, plan_rel_index, plan_rel_properties, target_index, target_index))
+
+        # 3. 批量写入：节点、根关系、子树关系
+        node_rows = [({**plan_user_dict, "type_id": node_type_id}, props) for node_type_id, props in node_properties.items()]
+        await tqdm_manager.add_mission(f"create_plan_{plan_name}", len(node_rows) + len(root_link_rows) + len(link_rows))
+        await NIU.merge_node_batch("PlanBlueprint", node_rows)
+        await tqdm_manager.update_mission(f"create_plan_{plan_name}", len(node_rows))
+        await rdm.r.hset(op.current_progress_key, mapping={"name": "创建计划树", "progress": 33})
+
+        await NIU.link_node_batch("Plan", "PLAN_BP_DEPEND_ON", "PlanBlueprint", root_link_rows)
+        await NIU.link_node_batch("PlanBlueprint", "PLAN_BP_DEPEND_ON", "PlanBlueprint", link_rows)
+        await tqdm_manager.update_mission(f"create_plan_{plan_name}", len(root_link_rows) + len(link_rows))
+        await rdm.r.hset(op.current_progress_key, mapping={"name": "创建计划树", "progress": 100})
         await tqdm_manager.complete_mission(f"create_plan_{plan_name}")
 
     @classmethod
@@ -278,6 +347,8 @@ class IndustryManager(metaclass=SingletonMeta):
         await EveIndustryPlanProductDBUtils.delete_all_by_user_name_and_plan_name(user_name, plan_name)
         # 2. 删除计划配置流
         await EveIndustryPlanConfigFlowDBUtils.delete_by_user_name_and_plan_name(user_name, plan_name)
+        # 同名计划重新创建时不能读到已删除计划的配置流缓存
+        await ConfigFlowCache.invalidate(user_name)
         # 3. 删除计划设置
         await EveIndustryPlanDBUtils.delete_by_user_name_and_plan_name(user_name, plan_name)
         # 4. 删除 Neo4j 中的计划节点及其关系
@@ -299,6 +370,16 @@ class IndustryManager(metaclass=SingletonMeta):
         """获取材料类型（内部方法，调用工具模块）"""
         return await get_material_type(type_id)
 
+    @staticmethod
+    async def _get_jita_prices(type_ids) -> Dict[int, Tuple]:
+        """一次 pipeline 读取吉他价格 {type_id: (max_buy, min_sell)}，无报价为 None"""
+        type_ids = list(type_ids)
+        async with rdm.r.pipeline(transaction=False) as pipe:
+            for type_id in type_ids:
+                pipe.hmget(f"market_price:jita:{type_id}", "max_buy", "min_sell")
+            prices = await pipe.execute()
+        return {type_id: tuple(price) for type_id, price in zip(type_ids, prices)}
+
     @classmethod
     async def get_plan_tableview_data(cls, op: ConfigFlowOperateCenter):
         """
@@ -322,13 +403,12 @@ class IndustryManager(metaclass=SingletonMeta):
         await rdm.r.hset(op.current_progress_key, mapping={"name": "获取材料报价", "progress": 50, "is_indeterminate": 1})
         await MarketManager().update_jita_price()
 
-        job_deal_set = set()
         logger.info("收集关系数据")
-        
         relations = await NIU.get_user_plan_relation(user_name, plan_name)
-        await tqdm_manager.add_mission(f"收集关系数据 {plan_name}", len(relations))
         await rdm.r.hset(op.current_progress_key, mapping={"name": "收集关系数据", "progress": 0, "is_indeterminate": 1})
-        last_progress = 0
+
+        # 第一遍：纯内存汇总数量、eiv 成本和任务，名称与价格在批量查询后填充
+        job_deal_set = set()
         eiv_cost_dict = {}
         for relation in relations:
             relation_need_calculate = relation.get("need_calculate", None)
@@ -336,7 +416,6 @@ class IndustryManager(metaclass=SingletonMeta):
             # 汇总材料节点计算后真实需求数量【缺失】
             material_id = relation['material']
             product_id = relation['product']
-            await tqdm_manager.update_mission(f"收集关系数据 {plan_name}", 1)
             node_dict[material_id].update({
                 "quantity": node_dict[material_id].get('quantity', 0) + relation['quantity'],
                 "real_quantity": node_dict[material_id].get('real_quantity', 0) + relation['real_quantity'],
@@ -349,27 +428,23 @@ class IndustryManager(metaclass=SingletonMeta):
                     eiv_cost_dict[top_product_type_id] = {
                         "eiv_cost": 0,
                         "type_id": top_product_type_id,
-                        "type_name": await SdeUtils.get_name_by_id(top_product_type_id),
+                        "type_name": None,
                         "index_id": relation["index_id"],
                         "product_num": op.product_num_dict[top_product_type_id],
                         "children": [],
                     }
                 # 所有边的eiv_cost汇总到最上层节点
-                eiv_cost_dict[top_product_type_id].update({
-                    "eiv_cost": eiv_cost_dict[top_product_type_id].get('eiv_cost', 0) + relation['real_eiv_cost_total'],
-                })
-                if op.get_node_type(relation['material']) != "product":
-                    material_type_node = await cls._get_material_type(relation['material'])
-                    jita_buy_price = await rdm.r.hget(f"market_price:jita:{relation['material']}", "max_buy")
+                eiv_cost_dict[top_product_type_id]["eiv_cost"] += relation['real_eiv_cost_total']
+                if op.get_node_type(material_id) != "product":
                     eiv_cost_dict[top_product_type_id]['children'].append({
-                        "type_id": relation['material'],
-                        "type_name": await SdeUtils.get_name_by_id(relation['material']),
+                        "type_id": material_id,
+                        "type_name": None,
                         "index_id": relation["index_id"],
                         "quantity": relation['quantity'],
-                        "jita_buy_price": jita_buy_price if jita_buy_price else 0,
-                        "material_type_node": material_type_node,
+                        "jita_buy_price": 0,
+                        "material_type_node": None,
                     })
-            
+
             # 汇总产品节点计算后真实任务数据【job】
             # 处理product任务 每个 (product_id, index_id) 只处理一次
             if (product_id, relation["index_id"]) not in job_deal_set and product_id in node_dict:
@@ -381,24 +456,49 @@ class IndustryManager(metaclass=SingletonMeta):
                         "real_jobs": node_dict[product_id].get('real_jobs', 0) + sum(work['runs'] for work in real_job_list),
                         "real_job_list": node_dict[product_id].get('real_job_list', []) + real_job_list,
                     })
-        await tqdm_manager.complete_mission(f"收集关系数据 {plan_name}")
+
+        # 批量查询：名称、材料类型、吉他价格、活动类型、单流程产量各一次
+        logger.info("批量查询名称与价格")
+        await rdm.r.hset(op.current_progress_key, mapping={"name": "整理节点", "progress": 50, "is_indeterminate": 1})
+        work_type_ids = {work["type_id"] for node in node_dict.values() for work in node.get("real_job_list", []) if work}
+        all_type_ids = set(node_dict) | set(eiv_cost_dict) | work_type_ids
+        material_type_ids = {type_id for type_id in node_dict if op.get_node_type(type_id) != "product"}
+        type_names = await SdeUtils.get_names_by_ids(all_type_ids)
+        type_names_zh = await SdeUtils.get_names_by_ids(all_type_ids, zh=True)
+        material_types = await get_material_types(material_type_ids)
+        jita_prices = await cls._get_jita_prices(material_type_ids)
+        await blueprint_graph.ensure_loaded()
+
+        for eiv_cost in eiv_cost_dict.values():
+            eiv_cost["type_name"] = type_names.get(eiv_cost["type_id"])
+            for child in eiv_cost["children"]:
+                child["type_name"] = type_names.get(child["type_id"])
+                child["jita_buy_price"] = jita_prices[child["type_id"]][0] or 0
+                child["material_type_node"] = material_types[child["type_id"]]
 
         # 获取库存和冗余
         logger.info("获取库存和冗余")
+        considerate_asset = plan_settings.get('considerate_asset', False)
+        considerate_running_job = plan_settings.get('considerate_running_job', False)
+        if considerate_asset:
+            await op.get_asset_snapshot()
+        if considerate_running_job:
+            await op.get_running_job_list()
         for node in node_dict.values():
             # 计算库存
             type_id = node['type_id']
-            if plan_settings.get('considerate_asset', False):
+            if considerate_asset:
                 product_assets_quantity = await op.get_type_assets_quantity(type_id)
                 node["store_quantity"] = product_assets_quantity
                 node['real_quantity'] -= product_assets_quantity
 
             # 计算运行中任务产物
-            if plan_settings.get('considerate_running_job', False):
+            if considerate_running_job:
                 running_jobs = await op.get_running_job_count(type_id)
-                unfinish_output = running_jobs * await BPM.get_bp_product_quantity_typeid(type_id)
+                product_quantity = blueprint_graph.get_product_quantity(type_id) or 1
+                unfinish_output = running_jobs * product_quantity
                 node['real_quantity'] -= unfinish_output
-                node['running_jobs'] = f"{unfinish_output:,}({running_jobs}x{await BPM.get_bp_product_quantity_typeid(type_id)})" if unfinish_output > 0 else 0
+                node['running_jobs'] = f"{unfinish_output:,}({running_jobs}x{product_quantity})" if unfinish_output > 0 else 0
 
             node["redundant"] = - node['real_quantity'] if node['real_quantity'] < 0 else 0
 
@@ -421,31 +521,26 @@ class IndustryManager(metaclass=SingletonMeta):
 
         logger.info("整理节点")
         work_flow = []
-        await rdm.r.hset(op.current_progress_key, mapping={"name": "整理节点", "progress": 50, "is_indeterminate": 1})
-        await tqdm_manager.add_mission(f"分类节点 {plan_name}", len(node_dict))
+        considerate_bp_relation = plan_settings.get('considerate_bp_relation', False)
+        if considerate_bp_relation:
+            await op.prepare_bp_asset()
         for node in node_dict.values():
             # 整理库存状态
-            node['tpye_name_zh'] = await SdeUtils.get_cn_name_by_id(node['type_id'])
-            if op.get_node_type(node['type_id']) != "product":
-                material_type_node = await cls._get_material_type(node['type_id'])
-                buy_price = await rdm.r.hget(f"market_price:jita:{node['type_id']}", "max_buy")
-                sell_price = await rdm.r.hget(f"market_price:jita:{node['type_id']}", "min_sell")
+            node['tpye_name_zh'] = type_names_zh.get(node['type_id'])
+            if node['type_id'] in material_type_ids:
+                buy_price, sell_price = jita_prices[node['type_id']]
                 node['buy_price'] = buy_price if buy_price else 0
                 node['sell_price'] = sell_price if sell_price else 0
-                material_output[material_type_node]['children'].append(node)
+                material_output[material_types[node['type_id']]]['children'].append(node)
             else:
                 flow_output[node['max_distance'] - 1]["children"].append(node)
-            mission_count = await tqdm_manager.update_mission(f"分类节点 {plan_name}", 1)
-            now_progress = mission_count / len(node_dict) * 100
-            if now_progress / 3 + 66 > last_progress + 1:
-                last_progress = now_progress
-            
+
             # 整理工作流输出
             work_flow.extend([{
                     "type_id": work["type_id"],
-                    "active_id": await BPM.get_activity_id_by_product_typeid(work["type_id"]),
-                    "type_name_zh": await SdeUtils.get_cn_name_by_id(work["type_id"]),
-                    "type_name": await SdeUtils.get_name_by_id(work["type_id"]),
+                    "active_id": blueprint_graph.get_activity_id(work["type_id"]),
+                    "type_name_zh": type_names_zh.get(work["type_id"]),
+                    "type_name": type_names.get(work["type_id"]),
                     "avaliable": work["avaliable"],
                     "runs": work["runs"],
                     "bp_object": work["bp_object"],
@@ -456,9 +551,7 @@ class IndustryManager(metaclass=SingletonMeta):
             ])
 
             # 整理蓝图库存
-            await rdm.r.hset(op.current_progress_key, mapping={"name": "整理蓝图库存", "progress": 50, "is_indeterminate": 1})
-            node['bp_quantity'], node['bp_jobs'] = await op.get_bp_status(node['type_id'], plan_settings.get('considerate_bp_relation', False))
-        await tqdm_manager.complete_mission(f"分类节点 {plan_name}")
+            node['bp_quantity'], node['bp_jobs'] = await op.get_bp_status(node['type_id'], considerate_bp_relation)
         
         # 整理物流信息
         # 建筑需求
@@ -478,82 +571,8 @@ class IndustryManager(metaclass=SingletonMeta):
         # 建筑供给
         structure_material_provide_dict = await op.get_structure_material_provide_dict()
 
-        # 处理本地库存
-        for structure_id, structure_info in structure_material_need_dict.items():
-            for material_type_id, material_quantity in structure_info["material_need"].items():
-                if structure_info["structure_id"] in structure_material_provide_dict:
-                    provide_quantity = structure_material_provide_dict[structure_info["structure_id"]]["material_provide"].get(material_type_id, 0)
-                    if provide_quantity >= material_quantity:
-                        provide_quantity -= material_quantity
-                        material_quantity = 0
-                    else:
-                        material_quantity -= provide_quantity
-                        provide_quantity = 0
-                    structure_material_provide_dict[structure_info["structure_id"]]["material_provide"][material_type_id] = provide_quantity
-                    structure_info["material_need"][material_type_id] = material_quantity
-
-        # 处理异地建筑供给
-        # 计算物流线路
-        # 遍历缺少物资的建筑与物资
-        logistic_dict = {}
-        for lack_structure_id, lack_structure_info in structure_material_need_dict.items():
-            for lack_type_id, lack_quantity in lack_structure_info["material_need"].items():
-                # 遍历供给的建筑与物资，寻找匹配
-                for provide_structure_id, provide_structure_info in structure_material_provide_dict.items():
-                    if lack_structure_id == provide_structure_id:
-                        continue
-                    if lack_quantity <= 0:
-                        break
-                    if lack_type_id in provide_structure_info["material_provide"]:
-                        provide_quantity = provide_structure_info["material_provide"][lack_type_id]
-                        if provide_quantity >= lack_quantity:
-                            provide_quantity -= lack_quantity
-                            lack_quantity = 0
-                        else:
-                            lack_quantity -= provide_quantity
-                            provide_quantity = 0
-                        # 匹配成功，更新供给和需求，记录物流线路
-                        provide_structure_info["material_provide"][lack_type_id] = provide_quantity
-                        lack_structure_info["material_need"][lack_type_id] = lack_quantity
-                        if (lack_structure_id, provide_structure_id, lack_type_id) not in logistic_dict:
-                            logistic_dict[(lack_structure_id, provide_structure_id, lack_type_id)] = {
-                                "provide_quantity": provide_quantity,
-                                "provide_structure_info": provide_structure_info,
-                                "lack_structure_info": lack_structure_info,
-                            }
-                        else:
-                            logistic_dict[(lack_structure_id, provide_structure_id, lack_type_id)]["provide_quantity"] += provide_quantity
-        # 整理为可执行的计划的数据
-        save_logistic_data = []
-        for d, logistic_info in logistic_dict.items():
-            lack_structure_id, provide_structure_id, lack_type_id = d
-            provide_structure_info = logistic_info["provide_structure_info"]
-            lack_structure_info = logistic_info["lack_structure_info"]
-            light_year = 9.461e15
-            provide_system_info = await SdeUtils.get_system_info_by_id(provide_structure_info["system_id"])
-            lack_system_info = await SdeUtils.get_system_info_by_id(lack_structure_info["system_id"])
-            save_logistic_data.append({
-                "lack_structure_id": lack_structure_id,
-                "lack_structure_name": lack_structure_info["structure_name"],
-                "provide_structure_id": provide_structure_id,
-                "provide_structure_name": provide_structure_info["structure_name"],
-                "provide_system_id": provide_structure_info["system_id"],
-                "provide_system_name": provide_structure_info["system_name"],
-                "provide_system_coordinate": [provide_system_info["x"] / light_year, provide_system_info["y"] / light_year, provide_system_info["z"] / light_year],
-                "lack_system_id": lack_structure_info["system_id"],
-                "lack_system_name": lack_structure_info["system_name"],
-                "lack_system_coordinate": [lack_system_info["x"] / light_year, lack_system_info["y"] / light_year, lack_system_info["z"] / light_year],
-                "provide_system_distance": sqrt(
-                    (provide_system_info["x"] - lack_system_info["x"])**2 +
-                    (provide_system_info["y"] - lack_system_info["y"])**2 +
-                    (provide_system_info["z"] - lack_system_info["z"])**2
-                ) / light_year,
-                "lack_type_id": lack_type_id,
-                "lack_type_name": await SdeUtils.get_cn_name_by_id(lack_type_id),
-                "provide_quantity": logistic_info["provide_quantity"],
-                "provide_volume": await SdeUtils.get_volume_by_type_id(lack_type_id) * logistic_info["provide_quantity"],
-            })
-
+        # 本地库存抵扣后按距离匹配异地供给，生成物流明细与合并线路
+        save_logistic_data, logistic_routes = await plan_logistics(structure_material_need_dict, structure_material_provide_dict)
 
         # 获取劳动力数据
         await rdm.r.hset(op.current_progress_key, mapping={"name": "获取劳动力数据", "progress": 50, "is_indeterminate": 1})
@@ -568,6 +587,7 @@ class IndustryManager(metaclass=SingletonMeta):
             "purchase_output": None,
             "running_job_tableview_data": running_job_tableview_data,
             "logistic_dict": save_logistic_data,
+            "logistic_routes": logistic_routes,
             "plan_settings": plan_settings
         }
 
@@ -581,120 +601,60 @@ class IndustryManager(metaclass=SingletonMeta):
         pass
 
     @classmethod
-    async def _create_plan_bp_tree(cls, plan_user_dict: dict, product_data: dict, counter: AsyncCounter):
-        """
-        从neo4j中搜索blueprint的typeid的节点，并找到以BP_DEPEND_ON连接的所有子节点，
-        以这棵树为蓝本复制一个以PlanBlueprint代替Blueprint的节点树。
-        
-        Args:
-            plan_user_dict: 包含 plan_name 和 user_name 的字典
-            product_data: 包含 id, type_id, quantity 的字典
-                {
-                    "id": 1,
-                    "type_id": 28661,
-                    "quantity": 16
-                }
+    async def _expand_plan_bp_subtree(cls, type_id: int):
         """
+        从内存蓝图依赖图展开以 type_id 为根的子树，作为 PlanBlueprint 节点树的蓝本。
 
-        type_id = product_data["product_type_id"]
-        quantity = product_data.get("quantity", 1)
-        index_id = product_data.get("index_id", 0)
-        
-        # 1. 查询Blueprint树（从给定的type_id开始，通过BP_DEPEND_ON关系）
-        # 查询所有Blueprint节点和BP_DEPEND_ON关系
-        # 使用MATCH找到根节点及其所有子节点
-        nodes_dict, relationships_list = await NIU.get_blueprint_tree(type_id)
-        type_name = await SdeUtils.get_cn_name_by_id(type_id)
-        await tqdm_manager.add_mission(f"create_plan_bp_tree_{type_id}_{type_name}_nodes", len(nodes_dict))
-        await tqdm_manager.add_mission(f"create_plan_bp_tree_{type_id}_{type_name}_relationships", len(relationships_list))
-
-        # 2. 创建PlanBlueprint节点树
-        # 首先创建所有PlanBlueprint节点
-        tasks = []
-        async def merge_node_with_semaphore(plan_bp_index, plan_bp_properties):
-            async with neo4j_manager.semaphore:
-                await NIU.merge_node("PlanBlueprint", plan_bp_index, plan_bp_properties)
-                await tqdm_manager.update_mission(f"create_plan_bp_tree_{type_id}_{type_name}_nodes", 1)
-        for node_type_id, node_props in nodes_dict.items():
-            # 构建PlanBlueprint节点的索引和属性
-            plan_bp_index = {
-                **plan_user_dict,
-                "type_id": node_type_id
-            }
-            
-            # 从Blueprint节点复制属性，但添加plan_user_dict的属性
-            plan_bp_properties = {
-                **plan_user_dict,
-                **node_props,
-                "order_id": await counter.next_node()
+        Returns:
+            (subtree_type_ids, relationships_list)
+            relationships_list: [(product, material, rel_props), ...]，rel_props 与 BP_DEPEND_ON 关系属性保持一致
+        """
+        await blueprint_graph.ensure_loaded()
+        subtree_type_ids, subtree_edges = blueprint_graph.expand_subtree(type_id)
+        relationships_list = []
+        for product, material, material_num, product_num, activity_id in subtree_edges:
+            rel_props = {
+                "product": product,
+                "material": material,
+                "material_num": material_num,
+                "product_num": product_num,
+                "activity_type": BPM.ACTIVITY_ID_MAP.get(activity_id, "Unknown") if activity_id is not None else "Unknown",
             }
-            
-            tasks.append(
-                asyncio.create_task(
-                    merge_node_with_semaphore(plan_bp_index, plan_bp_properties)
-                )
-            )
-        
-        await asyncio.gather(*tasks)
-        
-        # 3. 创建关系
-        tasks = []
-        async def link_node_with_semaphore(source_index, target_index, plan_rel_index, plan_rel_properties):
-            async with neo4j_manager.semaphore:
-                await NIU.link_node(
-                    "PlanBlueprint",  # 源节点标签
-                    source_index,  # 源节点索引
-                    source_index,  # 源节点属性（与索引相同）
-                    "PLAN_BP_DEPEND_ON",  # 关系类型
-                    plan_rel_index,  # 关系索引
-                    plan_rel_properties,  # 关系属性
-                    "PlanBlueprint",  # 目标节点标签
-                    target_index,  # 目标节点索引
-                    target_index  # 目标节点属性（与索引相同）
-                )
-                await tqdm_manager.update_mission(f"create_plan_bp_tree_{type_id}_{type_name}_relationships", 1)
+            if activity_id is not None:
+                rel_props["activity_id"] = activity_id
+            relationships_list.append((product, material, rel_props))
+        return subtree_type_ids, relationships_list
 
-        for parent_type_id, child_type_id, rel_props in relationships_list:
-            # 构建源节点（父节点）的索引
-            source_index = {
-                **plan_user_dict,
-                "type_id": parent_type_id
-            }
-            
-            # 构建目标节点（子节点）的索引
-            target_index = {
-                **plan_user_dict,
-                "type_id": child_type_id
-            }
-            
-            # 构建关系属性，包含plan_user_dict和原始关系的属性
-            plan_rel_properties = {
-                **plan_user_dict,
-                "index_id": index_id,
-                **rel_props,  # 包含原始BP_DEPEND_ON关系的属性（如material_num, product_num等）
-                "status": "disable",
-                "order_id": await counter.next_relation()
-            }
-            
-            # 构建关系索引（用于匹配已存在的关系）
-            plan_rel_index = {
-                **plan_user_dict,
-                "index_id": index_id,
-                "product": parent_type_id,
-                "material": child_type_id
-            }
-            
-            tasks.append(asyncio.create_task(link_node_with_semaphore(
-                source_index, target_index, plan_rel_index, plan_rel_properties
-            )))
-        
-        await asyncio.gather(*tasks)
+    @classmethod
+    async def _relation_calculater(cls, plan_settings: dict, relation: dict, product_node_in_relation: List[dict], same_route_relations: List[dict]):
+        self_relation = relation['relation']
+        relation_properties = await cls._calculate_relation_properties(
+            plan_settings, relation, product_node_in_relation, same_route_relations
+        )
+        await NIU.update_relation_properties(
+            "PLAN_BP_DEPEND_ON",
+            cls._get_relation_index(self_relation),
+            relation_properties
+        )
+        logger.debug(f"relation index {self_relation['index_id']} {self_relation['product']}->{self_relation['material']} calculate complete")
+        await tqdm_manager.update_mission("relation_moniter_process", 1)
 
-        await tqdm_manager.complete_mission(f"create_plan_bp_tree_{type_id}_{type_name}_nodes")
-        await tqdm_manager.complete_mission(f"create_plan_bp_tree_{type_id}_{type_name}_relationships")
+    @staticmethod
+    def _get_relation_index(self_relation: dict) -> dict:
+        return {
+            "user_name": self_relation['user_name'],
+            "plan_name": self_relation["plan_name"],
+            "index_id": self_relation['index_id'],
+            "product": self_relation['product'],
+            "material": self_relation['material']
+        }
 
     @classmethod
-    async def _relation_calculater(cls, plan_settings: dict, relation: dict, product_node_in_relation: List[dict], same_route_relations: List[dict]):
+    async def _calculate_relation_properties(cls, plan_settings: dict, relation: dict, product_node_in_relation: List[dict], same_route_relations: List[dict]) -> dict:
+        """
+        计算单条 PLAN_BP_DEPEND_ON 关系的结果属性，不写入数据库。
+        product_node_in_relation 与 same_route_relations 中的关系必须均已完成。
+        """
         op = plan_settings["operate_center"]
 
         self_relation = relation['relation']
@@ -712,30 +672,18 @@ class IndustryManager(metaclass=SingletonMeta):
 
         # 判断是否需要计算 ==============================================================================================
         if not await op.get_relation_need_calculate(product_type_id):
-            await NIU.update_relation_properties(
-                "PLAN_BP_DEPEND_ON",
-                {
-                    "user_name": self_relation['user_name'],
-                    "plan_name": self_relation["plan_name"],
-                    "index_id": self_relation['index_id'],
-                    "product": self_relation['product'],
-                    "material": self_relation['material']
-                },
-                {
-                    "quantity": 0,
-                    "real_quantity": 0,
-                    "index_quantity_work": 0,
-                    "index_real_quantity_work": 0,
-                    "product_remain": 0,
-                    "real_product_remain": 0,
-                    "real_work_remain": 0,
-                    "status": "complete",
-                    "real_eiv_cost_total": 0,
-                    "need_calculate": False
-                }
-            )
-            await tqdm_manager.update_mission("relation_moniter_process", 1)
-            return
+            return {
+                "quantity": 0,
+                "real_quantity": 0,
+                "index_quantity_work": 0,
+                "index_real_quantity_work": 0,
+                "product_remain": 0,
+                "real_product_remain": 0,
+                "real_work_remain": 0,
+                "status": "complete",
+                "real_eiv_cost_total": 0,
+                "need_calculate": False
+            }
         
         # 收集父节点需求数量 ==============================================================================================
         all_index_quantity = sum([relation['relation']['quantity'] for relation in product_node_in_relation])
@@ -934,31 +882,18 @@ class IndustryManager(metaclass=SingletonMeta):
         real_eiv_cost_total = sum(real_eiv_cost_list)
 
         # 更新状态
-        res = await NIU.update_relation_properties(
-            "PLAN_BP_DEPEND_ON",
-            {
-                "user_name": self_relation['user_name'],
-                "plan_name": self_relation["plan_name"],
-                "index_id": self_relation['index_id'],
-                "product": self_relation['product'],
-                "material": self_relation['material']
-            },
-            {
-                "quantity": quantity_material_need,
-                "real_quantity": real_quantity_material_need,
-                "real_eiv_cost_total": real_eiv_cost_total,
-                "index_quantity_work": min_self_index_quantity_work,
-                "index_real_quantity_work": min_self_index_real_quantity_work,
-                "product_remain": self_product_remain,
-                "real_product_remain": self_real_product_remain,
-                "real_work_remain": real_all_index_remain_work,
-                "status": "complete",
-                "need_calculate": True
-            }
-        )
-
-        logger.debug(f"relation index {self_relation['index_id']} {self_relation['product']}->{self_relation['material']} calculate complete")
-        await tqdm_manager.update_mission("relation_moniter_process", 1)
+        return {
+            "quantity": quantity_material_need,
+            "real_quantity": real_quantity_material_need,
+            "real_eiv_cost_total": real_eiv_cost_total,
+            "index_quantity_work": min_self_index_quantity_work,
+            "index_real_quantity_work": min_self_index_real_quantity_work,
+            "product_remain": self_product_remain,
+            "real_product_remain": self_real_product_remain,
+            "real_work_remain": real_all_index_remain_work,
+            "status": "complete",
+            "need_calculate": True
+        }
 
     @classmethod
     async def _get_uncomplete_relation_list(cls, user_name: str, plan_name: str):
@@ -1017,6 +952,11 @@ class IndustryManager(metaclass=SingletonMeta):
         plan_settings = json.loads(plan_node['plan_settings'])
         plan_settings["operate_center"] = op
         all_relation_list = await NIU.get_relations("PLAN_BP_DEPEND_ON", {"user_name": user_name, "plan_name": plan_name})
+        # 计划内全部物品的属性指纹一次批量构建，关键词匹配不再逐个查询 SDE
+        await op.prepare_type_fingerprints(
+            {relation['relation']['material'] for relation in all_relation_list} |
+            {relation['relation']['product'] for relation in all_relation_list if relation['relation']['product'] != "root"}
+        )
 
         async def relation_calculater_with_semaphore(relation: dict, product_node_in_relation: List[dict], same_route_relations: List[dict]):
             async with neo4j_manager.semaphore:
@@ -1047,9 +987,100 @@ class IndustryManager(metaclass=SingletonMeta):
         await tqdm_manager.complete_mission("relation_moniter_process")
         logger.info(f"plan {plan_name} status update complete")
 
+    @staticmethod
+    def _is_relation_calculate_avaliable_in_memory(
+        self_relation: dict,
+        same_route_relations: List[dict],
+        product_node_in_relation: List[dict]
+    ) -> bool:
+        """与 _is_relation_calculate_avaliable 判定规则一致，只读取内存中的关系"""
+        if self_relation['status'] == "complete":
+            return False
+        route_order_ids = [relation['relation']['order_id'] for relation in same_route_relations]
+        order_index = route_order_ids.index(self_relation['order_id'])
+        if order_index > 0 and same_route_relations[order_index - 1]['relation']['status'] != "complete":
+            return False
+        for r in product_node_in_relation:
+            if r['relation']['status'] != "complete":
+                return False
+        return True
+
+    @classmethod
+    async def _relation_memory_solver_process(cls, user_name: str, plan_name: str, op: ConfigFlowOperateCenter):
+        """
+        内存求解模式：一次性读取计划的全部 PLAN_BP_DEPEND_ON 关系，
+        在内存中按轮次拓扑推进（轮内按 (product, material, order_id) 排序），
+        计算完成后以一条批量 UNWIND 写回 Neo4j。
+
+        每一轮的可计算判定与 _relation_moniter_process 相同，计算结果与其一致。
+        """
+        plan_node = await NIU.get_node_properties("Plan", {"user_name": user_name, "plan_name": plan_name})
+        plan_settings = json.loads(plan_node['plan_settings'])
+        plan_settings["operate_center"] = op
+        all_relation_list = await NIU.get_relations("PLAN_BP_DEPEND_ON", {"user_name": user_name, "plan_name": plan_name})
+        # 计划内全部物品的属性指纹一次批量构建，关键词匹配不再逐个查询 SDE
+        await op.prepare_type_fingerprints(
+            {relation['relation']['material'] for relation in all_relation_list} |
+            {relation['relation']['product'] for relation in all_relation_list if relation['relation']['product'] != "root"}
+        )
+
+        # 同一 (product, material) 路线上的关系，按 order_id 排序
+        same_route_dict = {}
+        # 指向某个 type_id 的所有入边
+        product_node_in_relation_dict = {}
+        for relation in all_relation_list:
+            self_relation = relation['relation']
+            same_route_dict.setdefault((self_relation['product'], self_relation['material']), []).append(relation)
+            product_node_in_relation_dict.setdefault(self_relation['material'], []).append(relation)
+        for same_route_relations in same_route_dict.values():
+            same_route_relations.sort(key=lambda x: x['relation']['order_id'])
+
+        await tqdm_manager.add_mission("relation_moniter_process", len(all_relation_list))
+
+        update_rows = []
+        last_progress = 0
+        uncomplete_relation_list = [relation for relation in all_relation_list if relation['relation']['status'] != "complete"]
+        while uncomplete_relation_list:
+            avaliable_relation_list = [
+                relation for relation in uncomplete_relation_list
+                if cls._is_relation_calculate_avaliable_in_memory(
+                    relation['relation'],
+                    same_route_dict[(relation['relation']['product'], relation['relation']['material'])],
+                    product_node_in_relation_dict.get(relation['relation']['product'], [])
+                )
+            ]
+            if not avaliable_relation_list:
+                raise KahunaException(f"计划 {plan_name} 存在无法完成计算的关系，请重新计算计划")
+            avaliable_relation_list.sort(key=lambda x: (x['relation']['product'], x['relation']['material'], x['relation']['order_id']))
+
+            for relation in avaliable_relation_list:
+                self_relation = relation['relation']
+                relation_properties = await cls._calculate_relation_properties(
+                    plan_settings,
+                    relation,
+                    product_node_in_relation_dict.get(self_relation['product'], []),
+                    same_route_dict[(self_relation['product'], self_relation['material'])]
+                )
+                update_rows.append((cls._get_relation_index(self_relation), relation_properties))
+                self_relation.update(relation_properties)
+            await tqdm_manager.update_mission("relation_moniter_process", len(avaliable_relation_list))
+
+            uncomplete_relation_list = [relation for relation in uncomplete_relation_list if relation['relation']['status'] != "complete"]
+            now_progress = (len(all_relation_list) - len(uncomplete_relation_list)) / len(all_relation_list) * 100
+            if now_progress > last_progress + 1:
+                await rdm.r.hset(op.current_progress_key, mapping={"name": "更新树状态", "progress": now_progress, "is_indeterminate": 0})
+                last_progress = now_progress
+
+        await NIU.update_relation_properties_batch("PLAN_BP_DEPEND_ON", update_rows)
+        await tqdm_manager.complete_mission("relation_moniter_process")
+        logger.info(f"plan {plan_name} status update complete, {len(update_rows)} relations written")
+
     @classmethod
     async def update_plan_status(cls, plan_name: str, user_name: str, op: ConfigFlowOperateCenter):
-        await cls._relation_moniter_process(user_name, plan_name, op)
+        if PLAN_SOLVER_MODE == "neo4j":
+            await cls._relation_moniter_process(user_name, plan_name, op)
+        else:
+            await cls._relation_memory_solver_process(user_name, plan_name, op)
 
     # 权限管理方法（代理方法，保持向后兼容）
     @classmethod
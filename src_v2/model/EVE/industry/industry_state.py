@@ -0,0 +1,168 @@
+# 标准库导入
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# 本地导入
+from src_v2.core.config.config import config
+from src_v2.core.database.connect_manager import redis_manager as rds
+from src_v2.core.log import logger
+from src_v2.core.user.user_manager import UserManager
+from src_v2.model.EVE.character.character_manager import CharacterManager
+from src_v2.model.EVE.eveesi import eveesi
+from src_v2.model.EVE.eveesi.eveutils import iter_esi_pages, EsiPageError
+
+# 缓存时间与 ESI 对应接口的缓存时间一致（秒）
+JOBS_CACHE_TTL = config.getint('INDUSTRY', 'Jobs_Cache_TTL', fallback=300)
+BLUEPRINTS_CACHE_TTL = config.getint('INDUSTRY', 'Blueprints_Cache_TTL', fallback=3600)
+
+
+class IndustryStateSnapshot:
+    """用户可见的运行中作业和蓝图（个人角色 + 公司总监）
+
+    jobs_by_product_type_id / jobs_by_output_location_id: 作业索引
+    blueprints_by_type_id / blueprints_by_location_id: 蓝图索引
+    """
+
+    def __init__(self, jobs: List[dict], blueprints: List[dict]):
+        self.jobs = jobs
+        self.blueprints = blueprints
+        self.jobs_by_product_type_id: Dict[int, List[dict]] = {}
+        self.jobs_by_output_location_id: Dict[int, List[dict]] = {}
+        self.blueprints_by_type_id: Dict[int, List[dict]] = {}
+        self.blueprints_by_location_id: Dict[int, List[dict]] = {}
+
+        for job in jobs:
+            self.jobs_by_product_type_id.setdefault(job['product_type_id'], []).append(job)
+            self.jobs_by_output_location_id.setdefault(job['output_location_id'], []).append(job)
+        for bp in blueprints:
+            self.blueprints_by_type_id.setdefault(bp['type_id'], []).append(bp)
+            self.blueprints_by_location_id.setdefault(bp['location_id'], []).append(bp)
+
+
+class IndustryStateService:
+    """工业状态共享服务
+
+    并发拉取用户所有角色和公司总监的运行中作业与蓝图，按角色 / 公司缓存：
+        Redis: industry_state:{jobs|blueprints}:{cha|cor}:{id}，过期时间与 ESI 缓存时间一致
+        进程内: 已解码的数据及过期时间，同一公司的所有用户、所有计划共享
+    同一个键的并发请求只会发起一次 ESI 拉取。
+    """
+
+    def __init__(self):
+        self._local: Dict[str, Tuple[float, List[dict]]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def _get_cached(self, key: str, ttl: int, fetch) -> List[dict]:
+        local = self._local.get(key)
+        if local and local[0] > time.time():
+            return local[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, ttl, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, ttl: int, fetch) -> List[dict]:
+        cached = await rds.r.get(key)
+        if cached:
+            remain_ttl = await rds.r.ttl(key)
+            data = json.loads(cached)
+            self._local[key] = (time.time() + max(remain_ttl, 0), data)
+            return data
+
+        try:
+            data = await fetch()
+        except Exception as e:
+            logger.error(f"拉取工业状态 {key} 失败: {e}")
+            return []
+        if data is None:
+            return []
+        await rds.r.set(key, json.dumps(data), ex=ttl)
+        self._local[key] = (time.time() + ttl, data)
+        return data
+
+    @staticmethod
+    async def _collect_pages(fetch_page) -> Optional[List[dict]]:
+        """流式拉取全部分页并合并；任一页失败时返回 None，不写入缓存"""
+        res = []
+        try:
+            async for _, page_data, _ in iter_esi_pages(fetch_page):
+                res.extend(page_data)
+        except EsiPageError as e:
+            logger.error(f"分页拉取失败: 第 {e.page} 页")
+            return None
+        return res
+
+    @staticmethod
+    def _flatten_pages(pages) -> List[dict]:
+        res = []
+        for page in pages or []:
+            if page:
+                res.extend(page)
+        return res
+
+    async def get_character_jobs(self, character_id: int) -> List[dict]:
+        async def fetch():
+            character = await CharacterManager().get_character_by_character_id(character_id)
+            return await eveesi.characters_character_id_industry_jobs(character.ac_token, character_id)
+        return await self._get_cached(f"industry_state:jobs:cha:{character_id}", JOBS_CACHE_TTL, fetch)
+
+    async def get_corporation_jobs(self, director_id: int, corporation_id: int) -> List[dict]:
+        async def fetch():
+            director = await CharacterManager().get_character_by_character_id(director_id)
+            pages = await eveesi.corporations_corporation_id_industry_jobs(director.ac_token, corporation_id)
+            return self._flatten_pages(pages) if pages is not None else None
+        return await self._get_cached(f"industry_state:jobs:cor:{corporation_id}", JOBS_CACHE_TTL, fetch)
+
+    async def get_character_blueprints(self, character_id: int) -> List[dict]:
+        async def fetch():
+            character = await CharacterManager().get_character_by_character_id(character_id)
+            return await self._collect_pages(
+                lambda page: eveesi.characters_character_id_blueprints_page(character.ac_token, character_id, page)
+            )
+        return await self._get_cached(f"industry_state:blueprints:cha:{character_id}", BLUEPRINTS_CACHE_TTL, fetch)
+
+    async def get_corporation_blueprints(self, director_id: int, corporation_id: int) -> List[dict]:
+        async def fetch():
+            director = await CharacterManager().get_character_by_character_id(director_id)
+            return await self._collect_pages(
+                lambda page: eveesi.corporations_corporation_id_blueprints_page(director.ac_token, corporation_id, page)
+            )
+        return await self._get_cached(f"industry_state:blueprints:cor:{corporation_id}", BLUEPRINTS_CACHE_TTL, fetch)
+
+    async def _get_owners(self, user_name: str) -> Tuple[List[int], Optional[Any]]:
+        """返回 (角色 id 列表, 总监角色)，总监同时计入角色列表"""
+        characters = await CharacterManager().get_user_all_characters(user_name)
+        character_ids = [character.character_id for character in characters]
+
+        # 检查主角色同公司是否有总监
+        main_character_id = await UserManager().get_main_character_id(user_name)
+        main_character = await CharacterManager().get_character_by_character_id(main_character_id)
+        director_id = await CharacterManager().get_director_character_id_of_corporation(main_character.corporation_id)
+        director = None
+        if director_id:
+            director = await CharacterManager().get_character_by_character_id(director_id)
+            character_ids.append(director.character_id)
+        return character_ids, director
+
+    async def get_user_snapshot(self, user_name: str) -> IndustryStateSnapshot:
+        """并发获取用户可见的全部作业和蓝图"""
+        character_ids, director = await self._get_owners(user_name)
+
+        job_tasks = [self.get_character_jobs(character_id) for character_id in character_ids]
+        bp_tasks = [self.get_character_blueprints(character_id) for character_id in character_ids]
+        if director:
+            job_tasks.append(self.get_corporation_jobs(director.character_id, director.corporation_id))
+            bp_tasks.append(self.get_corporation_blueprints(director.character_id, director.corporation_id))
+
+        results = await asyncio.gather(*job_tasks, *bp_tasks)
+        jobs = [job for result in results[:len(job_tasks)] for job in result]
+        blueprints = [bp for result in results[len(job_tasks):] for bp in result]
+        return IndustryStateSnapshot(jobs, blueprints)
+
+
+industry_state = IndustryStateService()
@@ -28,7 +28,9 @@ from .structure_utils import (
     get_structure_list,
     get_structure_assign_keyword_suggestions
 )
-from .material_utils import get_material_type
+from .material_utils import get_material_type, get_material_types
+from .logistics_planner import LogisticsPlanner, plan_logistics
+from .keyword_matcher import KeywordRuleMatcher, build_type_fingerprints
 from .item_utils import (
     get_item_info,
     get_type_list
@@ -56,6 +58,11 @@ __all__ = [
     'get_structure_list',
     'get_structure_assign_keyword_suggestions',
     'get_material_type',
+    'get_material_types',
+    'LogisticsPlanner',
+    'plan_logistics',
+    'KeywordRuleMatcher',
+    'build_type_fingerprints',
     'get_item_info',
     'get_type_list',
 ]
@@ -34,6 +34,30 @@ class AsyncCounter():
             self.relation_counter += 1
             return current
     
+    async def allocate_nodes(self, count: int) -> int:
+        """
+        一次分配 count 个连续的node计数
+        
+        Returns:
+            int: 分配块的起始值，块内为 [start, start + count)
+        """
+        async with self._lock:
+            start = self.node_counter
+            self.node_counter += count
+            return start
+    
+    async def allocate_relations(self, count: int) -> int:
+        """
+        一次分配 count 个连续的relation计数
+        
+        Returns:
+            int: 分配块的起始值，块内为 [start, start + count)
+        """
+        async with self._lock:
+            start = self.relation_counter
+            self.relation_counter += count
+            return start
+    
     async def init_count(self):
         """
         重置所有计数器为0
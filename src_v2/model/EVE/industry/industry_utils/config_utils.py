@@ -8,6 +8,7 @@ from src_v2.core.database.kahuna_database_utils_v2 import (
 from src_v2.core.database.neo4j_utils import Neo4jIndustryUtils as NIU
 from src_v2.core.utils import KahunaException
 from src_v2.model.EVE.industry.config import DEFAULT_STRUCTURE_ASSIGN_CONFIG
+from .configflow_cache import ConfigFlowCache
 
 VIRTUAL_STRUCTURE_DICT = {
     "虚拟-Sotiyo": 1,
@@ -92,6 +93,7 @@ async def modify_config_flow_config(user_id: str, data):
     # 更新配置值
     config_obj.config_value = data['config_value']
     await EveIndustryPlanConfigFlowConfigDBUtils.merge(config_obj)
+    await ConfigFlowCache.invalidate(user_id)
 
 
 async def delete_config_flow_config(user_id: str, data):
@@ -116,6 +118,7 @@ async def delete_config_flow_config(user_id: str, data):
                 await EveIndustryPlanConfigFlowDBUtils.merge(config_list, session)
 
         await EveIndustryPlanConfigFlowConfigDBUtils.delete_obj(config_obj)
+    await ConfigFlowCache.invalidate(user_id)
 
 
 async def get_config_flow_config_list(user_id: str):
@@ -173,6 +176,7 @@ async def add_config_to_plan(user_id: str, data):
             raise KahunaException(f"配置已存在")
         plan_config_obj.config_list.insert(0, config_id)
         await EveIndustryPlanConfigFlowDBUtils.merge(plan_config_obj)
+    await ConfigFlowCache.invalidate(user_id)
 
 
 async def get_config_flow_list(user_id: str, plan_name: str):
@@ -223,6 +227,7 @@ async def delete_config_from_plan(user_id: str, data):
         raise KahunaException(f"配置不存在")
     plan_config_flow_obj.config_list.remove(config_id)
     await EveIndustryPlanConfigFlowDBUtils.merge(plan_config_flow_obj)
+    await ConfigFlowCache.invalidate(user_id)
 
 
 async def save_config_flow_to_plan(user_id: str, plan_name: str, data):
@@ -245,6 +250,7 @@ async def save_config_flow_to_plan(user_id: str, plan_name: str, data):
     else:
         config_flow_obj.config_list = config_id_list
         await EveIndustryPlanConfigFlowDBUtils.merge(config_flow_obj)
+    await ConfigFlowCache.invalidate(user_id)
 
 
 async def save_config_flow_preset(user_id: str, preset_name: str, config_list):
@@ -0,0 +1,103 @@
+"""
+配置流缓存
+跨请求缓存计划配置流解析结果和按物品推导的计算结果，保存在 Redis：
+    configflow_cache:version:{user}                      用户配置版本，配置或配置流变更时自增
+    configflow_cache:configs:{user}:{plan}:{version}     解析后的配置列表 [(config_type, config_value), ...]
+    configflow_cache:derived:{user}:{plan}:{hash}        效率、建筑分配、材料/产品分类
+hash 由配置内容、SDE 版本和建筑分配引用的建筑节点信息计算，配置、SDE 或建筑节点变更后旧缓存不再命中，由 TTL 自然过期。
+"""
+
+# 标准库导入
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# 本地导入 - 核心工具
+from src_v2.core.config.config import config
+from src_v2.core.database.connect_manager import redis_manager as rdm
+from src_v2.core.log import logger
+
+CONFIGFLOW_CACHE_TTL = config.getint('INDUSTRY', 'ConfigFlow_Cache_TTL', fallback=86400)
+
+
+def _version_key(user_name: str) -> str:
+    return f"configflow_cache:version:{user_name}"
+
+
+class ConfigFlowCache:
+    """计划配置流的 Redis 缓存，读写失败时退化为不使用缓存"""
+
+    @staticmethod
+    def get_hash(configs: List[Tuple[str, Any]], sde_version: Optional[int], structure_state: Any = None) -> str:
+        """structure_state 为推导结果依赖的建筑节点信息，资产拉取更新建筑节点后 hash 随之变化"""
+        configs_str = json.dumps(configs, sort_keys=True, ensure_ascii=False, default=str)
+        structure_str = json.dumps(structure_state, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(f"{configs_str}|{sde_version}|{structure_str}".encode()).hexdigest()
+
+    @staticmethod
+    async def get_version(user_name: str) -> int:
+        try:
+            version = await rdm.r.get(_version_key(user_name))
+        except Exception as e:
+            logger.debug(f"读取配置流缓存版本失败: {e}")
+            return 0
+        return int(version) if version else 0
+
+    @staticmethod
+    async def invalidate(user_name: str):
+        """用户的配置或任一计划的配置流变更后调用，使该用户所有计划的缓存失效"""
+        try:
+            await rdm.r.incr(_version_key(user_name))
+        except Exception as e:
+            logger.warning(f"配置流缓存失效失败: {e}")
+
+    @staticmethod
+    async def get_configs(user_name: str, plan_name: str, version: int) -> Optional[List[Tuple[str, Any]]]:
+        try:
+            cached = await rdm.r.get(f"configflow_cache:configs:{user_name}:{plan_name}:{version}")
+        except Exception as e:
+            logger.debug(f"读取配置流缓存失败: {e}")
+            return None
+        if cached is None:
+            return None
+        return [tuple(item) for item in json.loads(cached)]
+
+    @staticmethod
+    async def set_configs(user_name: str, plan_name: str, version: int, configs: List[Tuple[str, Any]]):
+        try:
+            await rdm.r.set(
+                f"configflow_cache:configs:{user_name}:{plan_name}:{version}",
+                json.dumps(configs, ensure_ascii=False, default=str),
+                ex=CONFIGFLOW_CACHE_TTL
+            )
+        except Exception as e:
+            logger.debug(f"写入配置流缓存失败: {e}")
+
+    @staticmethod
+    async def get_derived(user_name: str, plan_name: str, configflow_hash: str) -> Dict[str, dict]:
+        """返回 {"eff": {type_id: (mater_eff, time_eff)}, "assign": {type_id: structure_info}, "node_type": {type_id: str}}"""
+        res = {"eff": {}, "assign": {}, "node_type": {}}
+        try:
+            cached = await rdm.r.hgetall(f"configflow_cache:derived:{user_name}:{plan_name}:{configflow_hash}")
+        except Exception as e:
+            logger.debug(f"读取配置流推导缓存失败: {e}")
+            return res
+        for field, value in cached.items():
+            if field not in res:
+                continue
+            res[field] = {int(type_id): data for type_id, data in json.loads(value).items()}
+        res["eff"] = {type_id: tuple(eff) for type_id, eff in res["eff"].items()}
+        return res
+
+    @staticmethod
+    async def set_derived(user_name: str, plan_name: str, configflow_hash: str, derived: Dict[str, dict]):
+        key = f"configflow_cache:derived:{user_name}:{plan_name}:{configflow_hash}"
+        try:
+            async with rdm.r.pipeline(transaction=False) as pipe:
+                pipe.hset(key, mapping={
+                    field: json.dumps(data, ensure_ascii=False, default=str) for field, data in derived.items()
+                })
+                pipe.expire(key, CONFIGFLOW_CACHE_TTL)
+                await pipe.execute()
+        except Exception as e:
+            logger.debug(f"写入配置流推导缓存失败: {e}")
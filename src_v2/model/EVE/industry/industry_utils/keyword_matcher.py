@@ -0,0 +1,92 @@
+"""
+关键词规则匹配
+将配置流中带 keyword_groups 的配置编译为倒排索引，按物品属性指纹做集合匹配，
+匹配结果与逐条扫描配置、逐个比较关键词一致（返回列表顺序中第一个命中的配置）。
+"""
+
+# 标准库导入
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+# 本地导入 - EVE 模块
+from src_v2.model.EVE.sde import SdeUtils
+from src_v2.model.EVE.industry.blueprint_graph import blueprint_graph
+
+KEYWORD_TYPES = ("marketGroup", "group", "meta", "blueprint", "category")
+
+# 物品属性指纹：{(keyword_type, keyword), ...}
+TypeFingerprint = FrozenSet[Tuple[str, str]]
+
+
+class KeywordRuleMatcher:
+    """编译后的关键词规则
+
+    _index: (keyword_type, keyword) -> 需要该关键词的配置下标集合
+    _required: 每个配置需要满足的 (keyword_type, keyword) 集合
+    _always: 没有关键词、对所有物品都命中的配置下标
+    含未知 keyword_type 的配置永远不会命中，不进入索引。
+    """
+
+    def __init__(self, conf_list: List[dict]):
+        self.conf_list = conf_list
+        self._index: Dict[Tuple[str, str], Set[int]] = {}
+        self._required: List[Optional[FrozenSet[Tuple[str, str]]]] = []
+        self._always: Set[int] = set()
+
+        for conf_index, config in enumerate(conf_list):
+            required = frozenset((kw['keyword_type'], kw['keyword']) for kw in config['keyword_groups'])
+            if any(keyword_type not in KEYWORD_TYPES for keyword_type, _ in required):
+                self._required.append(None)
+                continue
+            self._required.append(required)
+            if not required:
+                self._always.add(conf_index)
+            for key in required:
+                self._index.setdefault(key, set()).add(conf_index)
+
+    def match(self, fingerprint: TypeFingerprint) -> Tuple[bool, Optional[dict]]:
+        """返回 (是否命中, 第一个命中的配置)"""
+        candidates = set(self._always)
+        for key in fingerprint:
+            conf_indexes = self._index.get(key)
+            if conf_indexes:
+                candidates |= conf_indexes
+        for conf_index in sorted(candidates):
+            if self._required[conf_index] <= fingerprint:
+                return True, self.conf_list[conf_index]
+        return False, None
+
+
+async def build_type_fingerprints(type_ids: Iterable[int]) -> Dict[int, TypeFingerprint]:
+    """批量构建物品属性指纹，包含组、meta、蓝图名、类别、市场组的中英文名称"""
+    type_ids = {type_id for type_id in type_ids if type_id is not None}
+    if not type_ids:
+        return {}
+
+    await blueprint_graph.ensure_loaded()
+    bp_type_ids = {type_id: blueprint_graph.get_blueprint_type_id(type_id) for type_id in type_ids}
+    bp_id_set = {bp_type_id for bp_type_id in bp_type_ids.values() if bp_type_id}
+
+    attribute_values: Dict[int, Set[Tuple[str, str]]] = {type_id: set() for type_id in type_ids}
+
+    def collect(keyword_type: str, values: Dict[int, Optional[str]]):
+        for type_id, value in values.items():
+            if value is not None and type_id in attribute_values:
+                attribute_values[type_id].add((keyword_type, value))
+
+    for zh in (False, True):
+        collect("group", await SdeUtils.get_groupnames_by_ids(type_ids, zh=zh))
+        collect("meta", await SdeUtils.get_metanames_by_typeids(type_ids, zh=zh))
+        collect("category", await SdeUtils.get_categories_by_ids(type_ids, zh=zh))
+
+        bp_names = await SdeUtils.get_names_by_ids(bp_id_set, zh=zh) if bp_id_set else {}
+        collect("blueprint", {
+            type_id: bp_names.get(bp_type_id) for type_id, bp_type_id in bp_type_ids.items() if bp_type_id
+        })
+
+        market_group_lists = await SdeUtils.get_market_group_lists_by_ids(type_ids, zh=zh)
+        for type_id, market_group_list in market_group_lists.items():
+            attribute_values[type_id].update(
+                ("marketGroup", name) for name in market_group_list or [] if name is not None
+            )
+
+    return {type_id: frozenset(values) for type_id, values in attribute_values.items()}
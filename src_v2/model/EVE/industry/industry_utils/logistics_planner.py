@@ -0,0 +1,192 @@
+"""
+物流规划
+根据建筑的材料需求与供给计算物流线路：
+    1. 先用建筑本地库存抵扣本建筑的需求
+    2. 供给按 type_id 建立索引，每项缺口按距离由近到远选择供给建筑
+    3. 同一对 (供给建筑, 需求建筑) 的物品合并为一条线路，汇总体积
+星系距离矩阵在构造时按涉及的星系一次算好，匹配过程只做内存计算，可直接用构造数据单独测试。
+
+need_dict:    {structure_id: {"structure_id", "structure_name", "system_id", "system_name", "material_need": {type_id: quantity}}}
+provide_dict: {structure_id: {"structure_id", "structure_name", "system_id", "system_name", "material_provide": {type_id: quantity}}}
+"""
+
+# 标准库导入
+import asyncio
+from math import sqrt
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 本地导入 - EVE 模块
+from src_v2.model.EVE.sde import SdeUtils
+
+LIGHT_YEAR = 9.461e15
+
+# (需求建筑, 供给建筑, type_id) -> 调拨数量
+LogisticMatches = Dict[Tuple[int, int, int], int]
+
+
+class LogisticsPlanner:
+    """建筑供需匹配
+
+    system_coordinates: {system_id: (x, y, z)}，单位米；缺少坐标的星系距离视为无穷远
+    """
+
+    def __init__(self, system_coordinates: Dict[int, Tuple[float, float, float]]):
+        self.system_coordinates = system_coordinates
+        # 星系距离矩阵（光年）
+        self._distance: Dict[Tuple[int, int], float] = {}
+        for system_a, coord_a in system_coordinates.items():
+            for system_b, coord_b in system_coordinates.items():
+                self._distance[(system_a, system_b)] = sqrt(
+                    (coord_a[0] - coord_b[0]) ** 2 +
+                    (coord_a[1] - coord_b[1]) ** 2 +
+                    (coord_a[2] - coord_b[2]) ** 2
+                ) / LIGHT_YEAR
+
+    def distance(self, system_a: int, system_b: int) -> float:
+        return self._distance.get((system_a, system_b), float("inf"))
+
+    def coordinate(self, system_id: int) -> List[float]:
+        """光年坐标，缺少坐标时为原点"""
+        coord = self.system_coordinates.get(system_id)
+        if coord is None:
+            return [0, 0, 0]
+        return [value / LIGHT_YEAR for value in coord]
+
+    @staticmethod
+    def consume_local_stock(need_dict: dict, provide_dict: dict):
+        """用建筑本地库存抵扣本建筑的需求，原地修改两侧数量"""
+        for structure_id, need_info in need_dict.items():
+            provide_info = provide_dict.get(structure_id)
+            if provide_info is None:
+                continue
+            material_provide = provide_info["material_provide"]
+            for type_id, need_quantity in need_info["material_need"].items():
+                used = min(material_provide.get(type_id, 0), need_quantity)
+                if used <= 0:
+                    continue
+                material_provide[type_id] -= used
+                need_info["material_need"][type_id] = need_quantity - used
+
+    def match(self, need_dict: dict, provide_dict: dict) -> LogisticMatches:
+        """为每项缺口按距离由近到远分配异地供给，原地扣减两侧数量"""
+        providers_by_type: Dict[int, List[int]] = {}
+        for structure_id, provide_info in provide_dict.items():
+            for type_id, quantity in provide_info["material_provide"].items():
+                if quantity > 0:
+                    providers_by_type.setdefault(type_id, []).append(structure_id)
+
+        # 同一星系、同一物品的候选供给顺序只排序一次
+        sorted_providers: Dict[Tuple[int, int], List[int]] = {}
+        matches: LogisticMatches = {}
+        for lack_structure_id, need_info in need_dict.items():
+            lack_system_id = need_info["system_id"]
+            material_need = need_info["material_need"]
+            for type_id, lack_quantity in material_need.items():
+                if lack_quantity <= 0 or type_id not in providers_by_type:
+                    continue
+                key = (lack_system_id, type_id)
+                if key not in sorted_providers:
+                    sorted_providers[key] = sorted(
+                        providers_by_type[type_id],
+                        key=lambda structure_id: self.distance(lack_system_id, provide_dict[structure_id]["system_id"])
+                    )
+                for provide_structure_id in sorted_providers[key]:
+                    if lack_quantity <= 0:
+                        break
+                    if provide_structure_id == lack_structure_id:
+                        continue
+                    material_provide = provide_dict[provide_structure_id]["material_provide"]
+                    quantity = min(material_provide.get(type_id, 0), lack_quantity)
+                    if quantity <= 0:
+                        continue
+                    material_provide[type_id] -= quantity
+                    lack_quantity -= quantity
+                    match_key = (lack_structure_id, provide_structure_id, type_id)
+                    matches[match_key] = matches.get(match_key, 0) + quantity
+                material_need[type_id] = lack_quantity
+        return matches
+
+    def build_output(
+            self,
+            matches: LogisticMatches,
+            need_dict: dict,
+            provide_dict: dict,
+            type_names: Dict[int, Optional[str]],
+            type_volumes: Dict[int, float]
+    ) -> Tuple[List[dict], List[dict]]:
+        """返回 (物流明细, 合并线路)
+
+        物流明细每项为一种物品的调拨；合并线路按 (供给建筑, 需求建筑) 汇总物品与总体积。
+        """
+        logistic_data = []
+        routes: Dict[Tuple[int, int], dict] = {}
+        for (lack_structure_id, provide_structure_id, type_id), quantity in matches.items():
+            lack_info = need_dict[lack_structure_id]
+            provide_info = provide_dict[provide_structure_id]
+            volume = type_volumes.get(type_id, 0.0) * quantity
+            distance = self.distance(provide_info["system_id"], lack_info["system_id"])
+            logistic_data.append({
+                "lack_structure_id": lack_structure_id,
+                "lack_structure_name": lack_info["structure_name"],
+                "provide_structure_id": provide_structure_id,
+                "provide_structure_name": provide_info["structure_name"],
+                "provide_system_id": provide_info["system_id"],
+                "provide_system_name": provide_info["system_name"],
+                "provide_system_coordinate": self.coordinate(provide_info["system_id"]),
+                "lack_system_id": lack_info["system_id"],
+                "lack_system_name": lack_info["system_name"],
+                "lack_system_coordinate": self.coordinate(lack_info["system_id"]),
+                "provide_system_distance": distance,
+                "lack_type_id": type_id,
+                "lack_type_name": type_names.get(type_id),
+                "provide_quantity": quantity,
+                "provide_volume": volume,
+            })
+
+            route_key = (provide_structure_id, lack_structure_id)
+            if route_key not in routes:
+                routes[route_key] = {
+                    "provide_structure_id": provide_structure_id,
+                    "provide_structure_name": provide_info["structure_name"],
+                    "provide_system_name": provide_info["system_name"],
+                    "lack_structure_id": lack_structure_id,
+                    "lack_structure_name": lack_info["structure_name"],
+                    "lack_system_name": lack_info["system_name"],
+                    "distance": distance,
+                    "total_volume": 0.0,
+                    "items": [],
+                }
+            route = routes[route_key]
+            route["total_volume"] += volume
+            route["items"].append({
+                "type_id": type_id,
+                "type_name": type_names.get(type_id),
+                "quantity": quantity,
+                "volume": volume,
+            })
+        return logistic_data, list(routes.values())
+
+
+async def load_system_coordinates(system_ids: Iterable[int]) -> Dict[int, Tuple[float, float, float]]:
+    """并发获取星系坐标 {system_id: (x, y, z)}，查询不到的星系不返回"""
+    system_ids = [system_id for system_id in set(system_ids) if system_id is not None]
+    system_infos = await asyncio.gather(*[SdeUtils.get_system_info_by_id(system_id) for system_id in system_ids])
+    return {
+        system_id: (info["x"], info["y"], info["z"])
+        for system_id, info in zip(system_ids, system_infos) if info
+    }
+
+
+async def plan_logistics(need_dict: dict, provide_dict: dict) -> Tuple[List[dict], List[dict]]:
+    """计算计划的物流线路，返回 (物流明细, 合并线路)，会原地扣减 need_dict / provide_dict 中的数量"""
+    system_ids = [info["system_id"] for info in need_dict.values()]
+    system_ids.extend(info["system_id"] for info in provide_dict.values())
+    planner = LogisticsPlanner(await load_system_coordinates(system_ids))
+
+    planner.consume_local_stock(need_dict, provide_dict)
+    matches = planner.match(need_dict, provide_dict)
+
+    type_ids = {type_id for _, _, type_id in matches}
+    type_names = await SdeUtils.get_names_by_ids(type_ids, zh=True)
+    type_volumes = await SdeUtils.get_volumes_by_ids(type_ids)
+    return planner.build_output(matches, need_dict, provide_dict, type_names, type_volumes)
@@ -1,3 +1,6 @@
+# 标准库导入
+from typing import Dict, Iterable, Optional
+
 # 本地导入 - EVE 模块
 from src_v2.model.EVE.sde import SdeUtils
 
@@ -13,7 +16,22 @@ async def get_material_type(type_id: int) -> str:
     """
     group = await SdeUtils.get_groupname_by_id(type_id)
     category = await SdeUtils.get_category_by_id(type_id)
-    # 根据 group 或 category 进行判断和分类
+    return classify_material_type(group, category)
+
+
+async def get_material_types(type_ids: Iterable[int]) -> Dict[int, str]:
+    """批量获取材料类型 {type_id: 材料类型名称}，与 get_material_type 一致"""
+    type_ids = set(type_ids)
+    groups = await SdeUtils.get_groupnames_by_ids(type_ids)
+    categories = await SdeUtils.get_categories_by_ids(type_ids)
+    return {
+        type_id: classify_material_type(groups.get(type_id), categories.get(type_id))
+        for type_id in type_ids if type_id is not None
+    }
+
+
+def classify_material_type(group: Optional[str], category: Optional[str]) -> str:
+    """根据 group 或 category 进行判断和分类"""
     if group == "Mineral":
         return "矿石"
     elif group == 'Ice Product':
@@ -28,4 +46,3 @@ async def get_material_type(type_id: int) -> str:
         return "行星工业"
     else:
         return "杂货"
-
@@ -13,17 +13,21 @@ from src_v2.core.database.neo4j_utils import Neo4jAssetUtils as NAU
 from src_v2.core.utils import KahunaException
 
 from src_v2.model.EVE.character.character_manager import CharacterManager
-from src_v2.core.user.user_manager import UserManager
 from src_v2.core.database.kahuna_database_utils_v2 import EveIndustryPlanDBUtils
 from src_v2.model.EVE.eveesi import eveesi
 from src_v2.model.EVE.sde import SdeUtils
 from src_v2.model.EVE.industry.blueprint import BPManager as BPM
+from src_v2.model.EVE.industry.blueprint_graph import blueprint_graph
+from src_v2.model.EVE.industry.industry_state import industry_state
+from src_v2.model.EVE.industry.industry_utils.keyword_matcher import KeywordRuleMatcher, build_type_fingerprints
+from src_v2.model.EVE.industry.industry_utils.configflow_cache import ConfigFlowCache
 
 from src_v2.core.database.connect_manager import redis_manager as rds
 
 running_job_update_lock = asyncio.Lock()
 bp_asset_prepare_lock = asyncio.Lock()
 asset_prepare_lock = asyncio.Lock()
+asset_snapshot_lock = asyncio.Lock()
 running_asset_prepare_lock = asyncio.Lock()
 refresh_system_cost_lock = asyncio.Lock()
 refresh_market_price_lock = asyncio.Lock()
@@ -68,6 +72,14 @@ LARGE_COST_EFF = 0.05
 MID_COST_EFF = 0.04
 SMALL_COST_EFF = 0.03
 
+# 按关键词匹配物品的配置：规则名 -> 配置列表属性名
+KEYWORD_CONF_ATTRS = {
+    "structure_assign": "structure_assign_confs",
+    "material_tag": "material_tag_confs",
+    "default_blueprint": "default_blueprint_confs",
+    "max_job_split_count": "max_job_split_count_confs",
+}
+
 class ConfigFlowOperateCenter():
     def __init__(self, user_name: str, plan_name: str):
         # 同步初始化基本属性
@@ -85,6 +97,7 @@ class ConfigFlowOperateCenter():
         self.cache = {}
         self._running_jobs_update = False
         self._running_jobs = []
+        self._industry_state = None
 
         self._bp_prepare = False
         self._bp_asset = {}
@@ -93,6 +106,10 @@ class ConfigFlowOperateCenter():
         self._structure_info = {}
         self._node_type_dict = {}
 
+        # 一次计算内共享的配置容器资产快照，按 type_id 索引
+        self._asset_snapshot = None
+        self._asset_type_index = {}
+
         self._asset_prepare = False
         self._asset = {}
         self._asset_allocate = {}
@@ -123,6 +140,12 @@ class ConfigFlowOperateCenter():
         self.index_product_dict = {}
         self.product_num_dict = {}
 
+        # 编译后的关键词规则 {规则名: KeywordRuleMatcher}（规则名见 KEYWORD_CONF_ATTRS），物品属性指纹 {type_id: fingerprint}
+        self._keyword_matchers = {}
+        self._type_fingerprints = {}
+
+        self.config_flow_hash = ""
+
     @classmethod
     async def create(cls, user_name: str, plan_name: str):
         """异步工厂方法，用于创建并初始化对象"""
@@ -132,44 +155,101 @@ class ConfigFlowOperateCenter():
     
     async def _async_init(self):
         """异步初始化逻辑"""
-        config_flow = await EveIndustryPlanConfigFlowDBUtils.select_configflow_by_user_name_and_plan_name(
-            self.user_name, self.plan_name
-        )
-        if not config_flow:
-            self.config_flow = []
-        else:
-            self.config_flow = config_flow.config_list
-
-        for config_id in self.config_flow:
-            config = await EveIndustryPlanConfigFlowConfigDBUtils.select_by_id(config_id)
-            if not config:
-                raise KahunaException(f"配置{config_id}不存在")
-
-            if config.config_type == 'StructureRigConfig':
-                self.structure_rig_confs.append(config.config_value)
-            elif config.config_type == 'StructureAssignConf':
-                self.structure_assign_confs.append(config.config_value)
-            elif config.config_type == 'MaterialTagConf':
-                self.material_tag_confs.append(config.config_value)
-            elif config.config_type == 'DefaultBlueprintConf':
-                self.default_blueprint_confs.append(config.config_value)
-            elif config.config_type == 'LoadAssetConf':
-                self.load_asset_confs.append(config.config_value)
-            elif config.config_type == 'MaxJobSplitCountConf':
-                self.max_job_split_count_confs.append(config.config_value)
+        # 优先读取缓存的配置流，未命中时一次查询所有配置
+        version = await ConfigFlowCache.get_version(self.user_name)
+        configs = await ConfigFlowCache.get_configs(self.user_name, self.plan_name, version)
+        if configs is None:
+            config_flow = await EveIndustryPlanConfigFlowDBUtils.select_configflow_by_user_name_and_plan_name(
+                self.user_name, self.plan_name
+            )
+            config_id_list = config_flow.config_list if config_flow else []
+            config_dict = await EveIndustryPlanConfigFlowConfigDBUtils.select_by_ids(config_id_list)
+            configs = []
+            for config_id in config_id_list:
+                config = config_dict.get(config_id)
+                if not config:
+                    raise KahunaException(f"配置{config_id}不存在")
+                configs.append((config.config_type, config.config_value))
+            await ConfigFlowCache.set_configs(self.user_name, self.plan_name, version, configs)
+        self.config_flow = configs
+
+        for config_type, config_value in configs:
+            if config_type == 'StructureRigConfig':
+                self.structure_rig_confs.append(config_value)
+            elif config_type == 'StructureAssignConf':
+                self.structure_assign_confs.append(config_value)
+            elif config_type == 'MaterialTagConf':
+                self.material_tag_confs.append(config_value)
+            elif config_type == 'DefaultBlueprintConf':
+                self.default_blueprint_confs.append(config_value)
+            elif config_type == 'LoadAssetConf':
+                self.load_asset_confs.append(config_value)
+            elif config_type == 'MaxJobSplitCountConf':
+                self.max_job_split_count_confs.append(config_value)
             else:
-                raise KahunaException(f"配置类型{config.config_type}不存在")
+                raise KahunaException(f"配置类型{config_type}不存在")
+
+        # 相同配置流的推导结果跨请求复用
+        await blueprint_graph.ensure_loaded()
+        structure_state = await self._load_assign_structures()
+        self.config_flow_hash = ConfigFlowCache.get_hash(configs, blueprint_graph.sde_version, structure_state)
+        derived = await ConfigFlowCache.get_derived(self.user_name, self.plan_name, self.config_flow_hash)
+        self.type_eff_cache.update(derived["eff"])
+        self.type_assign_structure_info_cache.update(derived["assign"])
+        self._node_type_dict.update(derived["node_type"])
+
+        self.build_keyword_matchers()
+
+    async def _load_assign_structures(self):
+        """读取建筑分配配置引用的建筑节点，填充 _structure_info，返回参与推导缓存 hash 的建筑信息"""
+        structure_names = sorted({conf['structure_name'] for conf in self.structure_assign_confs})
+        if not structure_names:
+            return []
+        for info in await NAU.get_structure_nodes():
+            if info['structure_name'] in structure_names:
+                self._structure_info.setdefault(info['structure_name'], info)
+        return [[name, self._structure_info.get(name)] for name in structure_names]
+
+    def build_keyword_matchers(self):
+        """按当前配置编译关键词规则，配置重新加载后需要再次调用"""
+        self._keyword_matchers = {
+            conf_name: KeywordRuleMatcher(getattr(self, conf_attr))
+            for conf_name, conf_attr in KEYWORD_CONF_ATTRS.items()
+        }
+
+    async def save_derived_cache(self):
+        """将本次计算得到的效率、建筑分配、材料/产品分类写回缓存"""
+        await ConfigFlowCache.set_derived(self.user_name, self.plan_name, self.config_flow_hash, {
+            "eff": self.type_eff_cache,
+            "assign": self.type_assign_structure_info_cache,
+            "node_type": self._node_type_dict,
+        })
+
+    async def prepare_type_fingerprints(self, type_ids):
+        """批量预计算计划内物品的属性指纹，之后的关键词匹配不再查询 SDE"""
+        missing_type_ids = {type_id for type_id in type_ids if type_id not in self._type_fingerprints}
+        if missing_type_ids:
+            self._type_fingerprints.update(await build_type_fingerprints(missing_type_ids))
     
+    async def get_asset_snapshot(self):
+        """一次读取配置许可容器内的全部资产，供 get_type_assets、prepare_asset、
+        get_structure_material_provide_dict 共用"""
+        async with asset_snapshot_lock:
+            if self._asset_snapshot is not None:
+                return self._asset_snapshot
+
+            container_id_list = [conf['asset_container_id'] for conf in self.load_asset_confs]
+            assets = await NAU.get_asset_in_container_list(container_id_list) if container_id_list else []
+            for asset in assets:
+                self._asset_type_index.setdefault(asset['type_id'], []).append(asset)
+            self._asset_snapshot = assets
+            return self._asset_snapshot
+
     # 获取指定typeid在配置许可中的资产列表
     async def get_type_assets(self, type_id: int):
-        if f"get_type_assets_{type_id}" in self.cache:
-            return self.cache[f"get_type_assets_{type_id}"]
-        container_list = []
-        for config in self.load_asset_confs:
-            container_list.append(config['asset_container_id'])
-        assets = await NAU.get_asset_by_type_id_in_container_list(type_id, container_list)
-        self.cache[f"get_type_assets_{type_id}"] = assets
-        return assets
+        if self._asset_snapshot is None:
+            await self.get_asset_snapshot()
+        return self._asset_type_index.get(type_id, [])
 
     # 获取指定typeid在配置许可中的资产总数量
     async def get_type_assets_quantity(self, type_id: int):
@@ -181,52 +261,21 @@ class ConfigFlowOperateCenter():
         async with running_job_update_lock:
             if self._running_jobs_update:
                 return self._running_jobs
-            # 获取能访问的权限
-            # 获取个人角色  
-            characters = await CharacterManager().get_user_all_characters(self.user_name)
-            character_ids = [character.character_id for character in characters]
-
-            # 检查主角色同公司是否有总监
-            main_character_id = await UserManager().get_main_character_id(self.user_name)
-            main_character = await CharacterManager().get_character_by_character_id(main_character_id)
-            director = await CharacterManager().get_director_character_id_of_corporation(main_character.corporation_id)
-            if director:
-                director = await CharacterManager().get_character_by_character_id(director)
-                character_ids.append(director.character_id)
-            else:
-                director = None
-
-            running_job_list = []
-            # 获取运行中的job
-            for character_id in character_ids:
-                character = await CharacterManager().get_character_by_character_id(character_id)
-                jobs = await eveesi.characters_character_id_industry_jobs(character.ac_token, character_id)
-                if not jobs:
-                    continue
-                running_job_list.extend(jobs)
-
-            # 获取公司运行中的job
-            if director:
-                corp_jobs =  await eveesi.corporations_corporation_id_industry_jobs(director.ac_token, director.corporation_id)
-                for job in corp_jobs:
-                    running_job_list.extend(job)
-
-            self._running_jobs = running_job_list
+            # 个人角色与公司总监的作业由 industry_state 并发拉取并按角色 / 公司缓存
+            self._industry_state = await industry_state.get_user_snapshot(self.user_name)
+            self._running_jobs = self._industry_state.jobs
             self._running_jobs_update = True
-            return running_job_list
+            return self._running_jobs
 
     # 获取某typeid正在运行的作业数量
     # 或通过container权限进行过滤，输出目标符才会计数
     async def get_running_job_count(self, type_id: int):
-        running_job_list = await self.get_running_job_list()
-        access_container_list = []
-        for config in self.load_asset_confs:
-            access_container_list.append(config['asset_container_id'])
+        await self.get_running_job_list()
+        access_container_set = {config['asset_container_id'] for config in self.load_asset_confs}
         count = 0
-        for job in running_job_list:
-            if job['product_type_id'] == type_id:
-                if job['output_location_id'] in access_container_list:
-                    count += job['runs']
+        for job in self._industry_state.jobs_by_product_type_id.get(type_id, []):
+            if job['output_location_id'] in access_container_set:
+                count += job['runs']
         return count
 
     async def get_running_job_tableview_data(self, consider_running_job: bool):
@@ -261,42 +310,20 @@ class ConfigFlowOperateCenter():
 
         return installer_data
 
-    async def _is_match_keyword(self, conf_list, type_id: int):
-        group_list = [await SdeUtils.get_groupname_by_id(type_id), await SdeUtils.get_groupname_by_id(type_id, zh=True)]
-        meta_list = [await SdeUtils.get_metaname_by_typeid(type_id), await SdeUtils.get_metaname_by_typeid(type_id, zh=True)]
-        bp_name_list = [await BPM.get_bp_name_by_typeid(type_id), await BPM.get_bp_name_by_typeid(type_id, zh=True)]
-        category_list = [await SdeUtils.get_category_by_id(type_id), await SdeUtils.get_category_by_id(type_id, zh=True)]
-        market_group_list = await SdeUtils.get_market_group_list(type_id)
-        market_group_list.extend(await SdeUtils.get_market_group_list(type_id, zh=True))
-
-        for config in conf_list:
-            match = True
-            res = None
-            for kw in config['keyword_groups']:
-                if kw['keyword_type'] == 'marketGroup' and kw['keyword'] in market_group_list:
-                    continue
-                elif kw['keyword_type'] == 'group' and kw['keyword'] in group_list:
-                    continue
-                elif kw['keyword_type'] == 'meta' and kw['keyword'] in meta_list:
-                    continue
-                elif kw['keyword_type'] == 'blueprint' and kw['keyword'] in bp_name_list:
-                    continue
-                elif kw['keyword_type'] == 'category' and kw['keyword'] in category_list:
-                    continue
-                else:
-                    match = False
-                    break
-            
-            if match:
-                return True, config
-        return False, None
+    async def _is_match_keyword(self, conf_name: str, type_id: int):
+        if type_id not in self._type_fingerprints:
+            await self.prepare_type_fingerprints([type_id])
+        matcher = self._keyword_matchers.get(conf_name)
+        if matcher is None:
+            matcher = self._keyword_matchers[conf_name] = KeywordRuleMatcher(getattr(self, KEYWORD_CONF_ATTRS[conf_name]))
+        return matcher.match(self._type_fingerprints.get(type_id, frozenset()))
 
     async def is_material_type(self, type_id: int):
-        res, _ = await self._is_match_keyword(self.material_tag_confs, type_id)
+        res, _ = await self._is_match_keyword("material_tag", type_id)
         return res
 
     async def get_max_job_run(self, type_id: int):
-        res, conf = await self._is_match_keyword(self.max_job_split_count_confs, type_id)
+        res, conf = await self._is_match_keyword("max_job_split_count", type_id)
         if not res:
             return 100000000
         if conf["judge_type"] == 'count':
@@ -332,72 +359,22 @@ class ConfigFlowOperateCenter():
         async with bp_asset_prepare_lock:
             if self._bp_prepare:
                 return
-            # 可访问的容器list
-            container_id_list = [conf['asset_container_id'] for conf in self.load_asset_confs]
-
-            # 获取个人角色  
-            characters = await CharacterManager().get_user_all_characters(self.user_name)
-            character_ids = [character.character_id for character in characters]
-
-            # 检查主角色同公司是否有总监
-            main_character_id = await UserManager().get_main_character_id(self.user_name)
-            main_character = await CharacterManager().get_character_by_character_id(main_character_id)
-            director = await CharacterManager().get_director_character_id_of_corporation(main_character.corporation_id)
-            if director:
-                director = await CharacterManager().get_character_by_character_id(director)
-                character_ids.append(director.character_id)
-            else:
-                director = None
+            snapshot = await industry_state.get_user_snapshot(self.user_name)
 
             bp_assets = {}
-            # 获取运行中的job
-            for character_id in character_ids:
-                assets_json = await rds.r.get(f"bp_assets_cha_{character_id}")
-                if not assets_json:
-                    character = await CharacterManager().get_character_by_character_id(character_id)
-                    assets = await eveesi.characters_character_id_blueprints(character.ac_token, character_id)
-                    if assets:
-                        await rds.r.set(f"bp_assets_cha_{character_id}", json.dumps(assets), ex=15 * 60)
-                else:
-                    assets = json.loads(assets_json)
-                for page in assets:
-                    for bp in page:
-                        if bp['location_id'] not in container_id_list:
-                            continue
-                        if bp["runs"] == -1:
-                            bp_type = "bpo"
-                        else:
-                            bp_type = "bpc"
-                        if bp['type_id'] not in bp_assets:
-                            bp_assets[bp['type_id']] = {
-                                "bpc": [],
-                                "bpo": []
-                            }
-                        bp_assets[bp['type_id']][bp_type].append(bp)
-
-            # 获取公司的蓝图资产
-            if director:
-                assets_json = await rds.r.get(f"bp_assets_cor_{director.corporation_id}")
-                if not assets_json:
-                    assets = await eveesi.corporations_corporation_id_blueprints(director.ac_token, director.corporation_id)
-                    if assets:
-                        await rds.r.set(f"bp_assets_cor_{director.corporation_id}", json.dumps(assets), ex=15 * 60)
-                else:
-                    assets = json.loads(assets_json)
-                for page in assets:
-                    for bp in page:
-                        if bp['location_id'] not in container_id_list:
-                            continue
-                        if bp["runs"] == -1:
-                            bp_type = "bpo"
-                        else:
-                            bp_type = "bpc"
-                        if bp['type_id'] not in bp_assets:
-                            bp_assets[bp['type_id']] = {
-                                "bpc": [],
-                                "bpo": []
-                            }
-                        bp_assets[bp['type_id']][bp_type].append(bp)
+            # 只统计可访问容器内的蓝图
+            for config in self.load_asset_confs:
+                for bp in snapshot.blueprints_by_location_id.get(config['asset_container_id'], []):
+                    if bp["runs"] == -1:
+                        bp_type = "bpo"
+                    else:
+                        bp_type = "bpc"
+                    if bp['type_id'] not in bp_assets:
+                        bp_assets[bp['type_id']] = {
+                            "bpc": [],
+                            "bpo": []
+                        }
+                    bp_assets[bp['type_id']][bp_type].append(bp)
 
             self._bp_asset = bp_assets
             self._bp_prepare = True
@@ -530,7 +507,7 @@ class ConfigFlowOperateCenter():
         if type_id in self.type_assign_structure_info_cache:
             return self.type_assign_structure_info_cache[type_id]
 
-        res, conf = await self._is_match_keyword(self.structure_assign_confs, type_id)
+        res, conf = await self._is_match_keyword("structure_assign", type_id)
         if res:
             # 获取建筑
             structure_name = conf['structure_name']
@@ -567,7 +544,7 @@ class ConfigFlowOperateCenter():
         }
 
         # 找到物品分配的建筑
-        res, conf = await self._is_match_keyword(self.structure_assign_confs, type_id)
+        res, conf = await self._is_match_keyword("structure_assign", type_id)
         active_type = await BPM.get_activity_id_by_product_typeid(type_id)
         if res:
             # 获取建筑
@@ -636,7 +613,7 @@ class ConfigFlowOperateCenter():
     async def get_conf_eff(self, type_id: int):
         if f"get_conf_eff_{type_id}" in self.cache:
             return self.cache[f"get_conf_eff_{type_id}"]
-        res, conf = await self._is_match_keyword(self.default_blueprint_confs, type_id)
+        res, conf = await self._is_match_keyword("default_blueprint", type_id)
         if res:
             self.cache[f"get_conf_eff_{type_id}"] = (1 - 0.01 * conf['mater_eff'], 1 - 0.01 * conf['time_eff'])
         else: 
@@ -648,11 +625,9 @@ class ConfigFlowOperateCenter():
             if self._asset_prepare:
                 return
 
-            container_id_list = [conf['asset_container_id'] for conf in self.load_asset_confs]
-            
-            assets = await NAU.get_asset_in_container_list(container_id_list)
-            for asset in assets:
-                self._asset[asset['type_id']] = self._asset.get(asset['type_id'], 0) + asset['quantity']
+            await self.get_asset_snapshot()
+            for type_id, assets in self._asset_type_index.items():
+                self._asset[type_id] = sum(asset['quantity'] for asset in assets)
             self._asset_prepare = True
 
     async def deal_asset_quantity(self, quantity: int, type_id: int, index_id: int):
@@ -690,7 +665,7 @@ class ConfigFlowOperateCenter():
         structure_material_provide_dict = {}
         contaier_conf_dict = {conf['asset_container_id']: conf for conf in self.load_asset_confs}
 
-        assets = await NAU.get_asset_in_container_list(list(contaier_conf_dict.keys()))
+        assets = await self.get_asset_snapshot()
         for asset in assets:
             asset_container_conf = contaier_conf_dict.get(asset['location_id'], None)
             if not asset_container_conf:
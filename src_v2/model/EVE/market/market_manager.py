@@ -7,9 +7,11 @@ from src_v2.core.database.connect_manager import redis_manager as rdm
 from src_v2.model.EVE.character.character_manager import CharacterManager
 from src_v2.core.config.config import config, update_config
 #import Exception
-from src_v2.core.utils import KahunaException, SingletonMeta
+from src_v2.core.utils import KahunaException, SingletonMeta, tqdm_manager
 
 from src_v2.model.EVE.eveesi import eveesi
+from src_v2.model.EVE.eveesi.eveutils import iter_esi_pages, EsiPageError
+from src_v2.core.database.kahuna_database_utils_v2 import MarketOrderDBUtils
 
 # kahuna logger
 from src_v2.core.log import logger
@@ -24,14 +26,172 @@ S33RB_O_STRUCTURE_ID = 1045441547980
 B_9C24_KEEPSTAR_ID = 1046831245129
 PIMI_STRUCTURE_LIST = [1042508032148, 1042499803831, 1044752365771]
 
+# 同时在途的订单页数上限，导入时内存峰值约为该数量的页
+ORDER_PAGE_CONCURRENCY = config.getint('MARKET', 'Order_Page_Concurrency', fallback=8)
+# 是否在价格更新后导入吉他订单到 market_order
+JITA_ORDER_INGEST = config.getboolean('MARKET', 'Jita_Order_Ingest', fallback=True)
+
+# 价格写入 Redis 时每个 pipeline 的物品数量
+PRICE_REDIS_BATCH_SIZE = 1000
+# 深度价格统计的挂单量比例
+PRICE_DEPTH_PERCENT = 0.05
+# 没有卖单时 min_sell 的占位值
+NO_SELL_PRICE = 1000000000000000000000
+
+
+class PriceAggregator:
+    """按物品聚合订单价格
+
+    add_page 逐页过滤地点，并按 (type_id, 买/卖) 分组记录 (price, volume_remain)；
+    result 对每组排序一次，得到：
+        max_buy / min_sell: 最高收单价 / 最低卖单价
+        buy_volume / sell_volume: 收单 / 卖单总挂单量
+        buy_5pct / sell_5pct: 从最优价开始累计到总挂单量 5% 的成交量加权均价
+    """
+
+    def __init__(self, location_id: int = None):
+        self.location_id = location_id
+        self._buy_orders: dict = {}
+        self._sell_orders: dict = {}
+
+    def add_page(self, orders: list):
+        buy_orders, sell_orders = self._buy_orders, self._sell_orders
+        location_id = self.location_id
+        for order in orders:
+            if location_id is not None and order["location_id"] != location_id:
+                continue
+            group = buy_orders if order["is_buy_order"] else sell_orders
+            entries = group.get(order["type_id"])
+            if entries is None:
+                entries = group[order["type_id"]] = []
+            entries.append((order["price"], order["volume_remain"]))
+
+    @staticmethod
+    def _depth_price(entries: list, total_volume: int) -> float:
+        """entries 已按最优价在前排序，返回前 PRICE_DEPTH_PERCENT 挂单量的加权均价"""
+        target = max(total_volume * PRICE_DEPTH_PERCENT, 1)
+        taken = 0
+        amount = 0.0
+        for price, volume in entries:
+            take = min(volume, target - taken)
+            amount += price * take
+            taken += take
+            if taken >= target:
+                break
+        return amount / taken if taken else 0
+
+    def result(self) -> dict:
+        """{type_id: {max_buy, min_sell, buy_volume, sell_volume, buy_5pct, sell_5pct}}"""
+        res = {}
+        for type_id in self._buy_orders.keys() | self._sell_orders.keys():
+            price_data = {
+                "max_buy": 0,
+                "min_sell": NO_SELL_PRICE,
+                "buy_volume": 0,
+                "sell_volume": 0,
+                "buy_5pct": 0,
+                "sell_5pct": 0,
+            }
+            buy_entries = self._buy_orders.get(type_id)
+            if buy_entries:
+                buy_entries.sort(reverse=True)
+                volume = sum(entry[1] for entry in buy_entries)
+                price_data["max_buy"] = buy_entries[0][0]
+                price_data["buy_volume"] = volume
+                price_data["buy_5pct"] = self._depth_price(buy_entries, volume)
+            sell_entries = self._sell_orders.get(type_id)
+            if sell_entries:
+                sell_entries.sort()
+                volume = sum(entry[1] for entry in sell_entries)
+                price_data["min_sell"] = sell_entries[0][0]
+                price_data["sell_volume"] = volume
+                price_data["sell_5pct"] = self._depth_price(sell_entries, volume)
+            res[type_id] = price_data
+        return res
+
+
 class MarketManager(metaclass=SingletonMeta):
     def __init__(self):
         self.update_jita_price_lock = asyncio.Lock()
+        self.refresh_jita_order_lock = asyncio.Lock()
+        self._jita_order_task = None
+
+    async def _ingest_order_pages(self, mission_id: str, fetch_page, scope_column: str, scope_value,
+                                  order_filter=None) -> int | None:
+        """流式导入订单页并整体替换 market_order 中的目标范围
+
+        通过 iter_esi_pages 逐页拉取（在途页数受 ORDER_PAGE_CONCURRENCY 限制），
+        每页到达即过滤、转换为元组并 COPY 进暂存表；全部页写入后在一个事务内替换。
+        任一页失败则放弃替换，market_order 保持原数据。
+
+        Args:
+            mission_id: 进度条任务名
+            fetch_page: async (page) -> (data, pages)
+            scope_column / scope_value: 被替换的订单范围，如 ('location_id', JITA_TRADE_HUB_STRUCTURE_ID)
+            order_filter: 订单过滤函数，为 None 时保留全部订单
+        Returns:
+            写入的订单数，放弃替换时返回 None
+        """
+        def to_records(data):
+            return [
+                MarketOrderDBUtils.to_record(order) for order in data
+                if order_filter is None or order_filter(order)
+            ]
 
-    async def _batch_insert_redis(self, batch: list):
-        """批量插入Redis的辅助方法"""
-        for type_id, price_data in batch:
-            await rdm.r.hset(f"market_price:jita:{type_id}", mapping=price_data)
+        mission_started = False
+        try:
+            async with MarketOrderDBUtils.staging() as staging:
+                async for page, data, pages in iter_esi_pages(fetch_page, ORDER_PAGE_CONCURRENCY):
+                    if not mission_started:
+                        await tqdm_manager.add_mission(mission_id, pages)
+                        mission_started = True
+                    await staging.copy(to_records(data))
+                    del data
+                    await tqdm_manager.update_mission(mission_id)
+
+                await staging.swap(scope_column, scope_value)
+                logger.info(f"{mission_id} 导入完成: {pages} 页, {staging.record_count} 条订单")
+                return staging.record_count
+        except EsiPageError as e:
+            logger.error(f"{mission_id} 第 {e.page} 页请求失败，放弃本次订单导入")
+            return None
+        finally:
+            if mission_started:
+                await tqdm_manager.complete_mission(mission_id)
+
+    async def refresh_jita_order(self):
+        """导入吉他 4-4 空间站订单到 market_order，与价格更新相互独立，失败只记录日志"""
+        async with self.refresh_jita_order_lock:
+            if await rdm.r.get("market_order_update_flag:jita"):
+                return
+            try:
+                record_count = await self._ingest_order_pages(
+                    f'market_order_{REGION_FORGE_ID}',
+                    lambda page: eveesi.markets_region_orders_page(REGION_FORGE_ID, page),
+                    'location_id', JITA_TRADE_HUB_STRUCTURE_ID,
+                    order_filter=lambda order: order["location_id"] == JITA_TRADE_HUB_STRUCTURE_ID
+                )
+            except Exception as e:
+                logger.error(f"吉他订单导入失败: {e}")
+                return
+            if record_count is not None:
+                await rdm.r.set("market_order_update_flag:jita", "1", ex=60*60*4)
+
+    def start_refresh_jita_order(self):
+        """在后台启动吉他订单导入，已有导入在进行时不重复启动"""
+        if not JITA_ORDER_INGEST:
+            return
+        if self._jita_order_task is not None and not self._jita_order_task.done():
+            return
+        self._jita_order_task = asyncio.create_task(self.refresh_jita_order())
+
+    async def _batch_insert_redis(self, items: list, batch_size: int = PRICE_REDIS_BATCH_SIZE):
+        """通过 pipeline 分批写入价格，每批一次往返"""
+        for i in range(0, len(items), batch_size):
+            async with rdm.r.pipeline(transaction=False) as pipe:
+                for type_id, price_data in items[i:i + batch_size]:
+                    pipe.hset(f"market_price:jita:{type_id}", mapping=price_data)
+                await pipe.execute()
 
     async def update_jita_price(self):
         async with self.update_jita_price_lock:
@@ -39,40 +199,26 @@ class MarketManager(metaclass=SingletonMeta):
             if update_flag:
                 return
 
-        type_price_cache = {}
-        jita_order = await eveesi.markets_region_orders(REGION_FORGE_ID)
-        for order_list in jita_order:
-            for order in order_list:
-                if order["location_id"] != JITA_TRADE_HUB_STRUCTURE_ID:
-                    continue
-                    
-                if order["type_id"] not in type_price_cache:
-                    type_price_cache[order["type_id"]] = {
-                        "max_buy": 0,
-                        "min_sell": 1000000000000000000000,
-                    }
-                else:
-                    if order["is_buy_order"]:
-                        type_price_cache[order["type_id"]]["max_buy"] = max(type_price_cache[order["type_id"]]["max_buy"], order["price"])
-                    else:
-                        type_price_cache[order["type_id"]]["min_sell"] = min(type_price_cache[order["type_id"]]["min_sell"], order["price"])
-
-
-        
-        # 分批处理并并发插入Redis
-        batch_size = 100  # 每批处理100个type_id
-        items = list(type_price_cache.items())
-        tasks = []
-        
-        for i in range(0, len(items), batch_size):
-            batch = items[i:i + batch_size]
-            task = asyncio.create_task(self._batch_insert_redis(batch))
-            tasks.append(task)
-        
-        # 等待所有批次完成
-        await asyncio.gather(*tasks)
-
-        await rdm.r.set(f"market_update_flag:jita", "1", ex=60*60*4)
+            # 订单页到达即分组，下一页的请求与当前页的处理并行；价格只写 Redis，不依赖 market_order 导入
+            aggregator = PriceAggregator(JITA_TRADE_HUB_STRUCTURE_ID)
+            try:
+                async for _, order_list, _ in iter_esi_pages(
+                    lambda page: eveesi.markets_region_orders_page(REGION_FORGE_ID, page)
+                ):
+                    aggregator.add_page(order_list)
+            except EsiPageError as e:
+                logger.error(f"吉他订单第 {e.page} 页请求失败，放弃本次价格更新")
+                return
+
+            # 聚合在线程中完成，避免阻塞事件循环
+            type_price_cache = await asyncio.to_thread(aggregator.result)
+            await self._batch_insert_redis(list(type_price_cache.items()))
+
+            await rdm.r.set(f"market_update_flag:jita", "1", ex=60*60*4)
+            logger.info(f"吉他价格更新完成: {len(type_price_cache)} 种物品")
+
+        # 订单导入作为独立的后台任务，数据库异常不影响价格更新
+        self.start_refresh_jita_order()
 
 
 # class MarketManagerOld():
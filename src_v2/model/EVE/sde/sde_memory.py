@@ -0,0 +1,325 @@
+# 标准库导入
+import asyncio
+import time
+from array import array
+from typing import Dict, List, Optional
+
+# 第三方库导入
+from sqlalchemy import select
+
+# 本地导入
+from src_v2.core.config.config import config
+from src_v2.core.log import logger
+from .sde_builder import (
+    InvTypes,
+    InvGroups,
+    InvCategories,
+    MetaGroups,
+    MarketGroups,
+    MapSolarSystems,
+    MapRegions,
+)
+
+# 启动时是否将 SDE 常用表整体加载到内存，开启后 SdeUtils 的查询不再访问数据库
+SDE_IN_MEMORY = config.getboolean('SDEDB', 'In_Memory', fallback=False)
+# 内存表的 SDE 版本检查间隔（秒），版本变化时自动重新加载
+VERSION_CHECK_INTERVAL = config.getint('SDEDB', 'Version_Check_Interval', fallback=300)
+
+# 下标列中表示“无”的值
+NO_INDEX = -1
+
+
+def _build_index(ids) -> Dict[int, int]:
+    return {id_: index for index, id_ in enumerate(ids)}
+
+
+def _index_column(ids, index: Dict[int, int]) -> array:
+    """外键 id 列转为目标表的稠密下标列，不存在时为 NO_INDEX"""
+    return array('l', (index.get(id_, NO_INDEX) if id_ is not None else NO_INDEX for id_ in ids))
+
+
+def _name_index(en_names: List[Optional[str]], zh_names: List[Optional[str]], ids) -> Dict[str, int]:
+    """名称 -> id，英文优先，同名时保留第一条"""
+    res = {}
+    for names in (en_names, zh_names):
+        for name, id_ in zip(names, ids):
+            if name is not None:
+                res.setdefault(name, id_)
+    return res
+
+
+class SdeMemoryTable:
+    """SDE 内存表
+
+    一次性读取 invTypes / invGroups / invCategories / metaGroups / marketGroups / mapSolarSystems / mapRegions，
+    每张表以 id 的稠密下标存储为定长数组列，外键列直接存目标表下标，名称按语言分列存储。
+    启动时加载；update_sde.py 可能在服务运行时导入新 SDE，因此 ensure_fresh 每隔 VERSION_CHECK_INTERVAL
+    对比 _sde.buildNumber（与蓝图依赖图相同），版本变化时重新加载。
+    所有查询都是同步的 O(1) 下标访问，返回值与 SdeUtils 对应的数据库查询一致。
+    """
+
+    def __init__(self):
+        self._loaded = False
+        self.sde_version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+        self._type_index: Dict[int, int] = {}
+        self._type_group = array('l')
+        self._type_meta = array('l')
+        self._type_market_group = array('l')
+        self._type_volume = array('d')
+        self._type_packaged_volume = array('d')
+        self._type_names = ([], [])  # (en, zh)
+        self._type_id_by_name: Dict[str, int] = {}
+
+        self._group_index: Dict[int, int] = {}
+        self._group_category = array('l')
+        self._group_names = ([], [])
+        self._group_id_by_name: Dict[str, int] = {}
+
+        self._category_index: Dict[int, int] = {}
+        self._category_names = ([], [])
+
+        self._meta_index: Dict[int, int] = {}
+        self._meta_names = ([], [])
+        self._meta_id_by_name: Dict[str, int] = {}
+
+        self._market_group_index: Dict[int, int] = {}
+        self._market_group_parent_ids = array('q')  # 0 表示没有父节点
+        self._market_group_names = ([], [])
+        self._market_group_id_by_name: Dict[str, int] = {}
+
+        self._system_index: Dict[int, int] = {}
+        self._system_ids = array('q')
+        self._system_region = array('l')
+        self._system_region_ids = array('q')
+        self._system_xyz = array('d')  # 每个星系 3 个值
+        self._system_names = ([], [])
+
+        self._region_names = ([], [])
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    async def ensure_fresh(self) -> bool:
+        """内存表是否可用；已加载且超过检查间隔时对比 SDE 版本，版本变化则重新加载"""
+        if not self._loaded:
+            return False
+        if time.monotonic() - self._checked_at < VERSION_CHECK_INTERVAL:
+            return True
+        from .utils import get_sde_version
+
+        async with self._lock:
+            if time.monotonic() - self._checked_at < VERSION_CHECK_INTERVAL:
+                return self._loaded
+            self._checked_at = time.monotonic()
+            sde_version = await get_sde_version()
+            if sde_version is not None and sde_version != self.sde_version:
+                logger.info(f"SDE 版本变化 {self.sde_version} -> {sde_version}，重新加载 SDE 内存表")
+                await self.load()
+        return self._loaded
+
+    async def load(self):
+        """从 SDE 数据库加载全部内存表"""
+        from .utils import get_db_manager, get_sde_version
+
+        start = time.perf_counter()
+        sde_version = await get_sde_version()
+        async with (await get_db_manager()).get_readonly_session() as session:
+            async def fetch(*columns):
+                return (await session.execute(select(*columns))).all()
+
+            type_rows = await fetch(
+                InvTypes.typeID, InvTypes.groupID, InvTypes.metaGroupID, InvTypes.marketGroupID,
+                InvTypes.volume, InvTypes.packagedVolume, InvTypes.typeName_en, InvTypes.typeName_zh
+            )
+            group_rows = await fetch(InvGroups.groupID, InvGroups.categoryID, InvGroups.groupName_en, InvGroups.groupName_zh)
+            category_rows = await fetch(InvCategories.categoryID, InvCategories.categoryName_en, InvCategories.categoryName_zh)
+            meta_rows = await fetch(MetaGroups.metaGroupID, MetaGroups.nameID_en, MetaGroups.nameID_zh)
+            market_group_rows = await fetch(
+                MarketGroups.marketGroupID, MarketGroups.parentGroupID, MarketGroups.nameID_en, MarketGroups.nameID_zh
+            )
+            system_rows = await fetch(
+                MapSolarSystems.solarSystemID, MapSolarSystems.regionID,
+                MapSolarSystems.solarSystemName_en, MapSolarSystems.solarSystemName_zh,
+                MapSolarSystems.x, MapSolarSystems.y, MapSolarSystems.z
+            )
+            region_rows = await fetch(MapRegions.regionID, MapRegions.regionName_en, MapRegions.regionName_zh)
+
+        self.build(type_rows, group_rows, category_rows, meta_rows, market_group_rows, system_rows, region_rows)
+        self.sde_version = sde_version
+        self._checked_at = time.monotonic()
+        logger.info(
+            f"SDE 内存表加载完成: sde_version={sde_version}, types={len(self._type_index)}, groups={len(self._group_index)}, "
+            f"market_groups={len(self._market_group_index)}, systems={len(self._system_index)}, "
+            f"耗时 {time.perf_counter() - start:.2f}s"
+        )
+
+    def build(self, type_rows, group_rows, category_rows, meta_rows, market_group_rows, system_rows, region_rows):
+        """由各表行数据构建内存表，行的列顺序与 load 中的查询一致"""
+        category_ids, *category_names = zip(*category_rows) if category_rows else ((), (), ())
+        self._category_index = _build_index(category_ids)
+        self._category_names = tuple(list(names) for names in category_names)
+
+        group_ids, group_category_ids, *group_names = zip(*group_rows) if group_rows else ((), (), (), ())
+        self._group_index = _build_index(group_ids)
+        self._group_category = _index_column(group_category_ids, self._category_index)
+        self._group_names = tuple(list(names) for names in group_names)
+        self._group_id_by_name = _name_index(*self._group_names, group_ids)
+
+        meta_ids, *meta_names = zip(*meta_rows) if meta_rows else ((), (), ())
+        self._meta_index = _build_index(meta_ids)
+        self._meta_names = tuple(list(names) for names in meta_names)
+        self._meta_id_by_name = _name_index(*self._meta_names, meta_ids)
+
+        market_group_ids, parent_ids, *market_group_names = zip(*market_group_rows) if market_group_rows else ((), (), (), ())
+        self._market_group_index = _build_index(market_group_ids)
+        self._market_group_parent_ids = array('q', (parent_id or 0 for parent_id in parent_ids))
+        self._market_group_names = tuple(list(names) for names in market_group_names)
+        self._market_group_id_by_name = _name_index(*self._market_group_names, market_group_ids)
+
+        type_ids, type_group_ids, type_meta_ids, type_market_group_ids, volumes, packaged_volumes, *type_names = (
+            zip(*type_rows) if type_rows else ((), (), (), (), (), (), (), ())
+        )
+        self._type_index = _build_index(type_ids)
+        self._type_group = _index_column(type_group_ids, self._group_index)
+        self._type_meta = _index_column(type_meta_ids, self._meta_index)
+        self._type_market_group = _index_column(type_market_group_ids, self._market_group_index)
+        self._type_volume = array('d', (volume or 0.0 for volume in volumes))
+        self._type_packaged_volume = array('d', (volume or 0.0 for volume in packaged_volumes))
+        self._type_names = tuple(list(names) for names in type_names)
+        self._type_id_by_name = _name_index(*self._type_names, type_ids)
+
+        region_ids, *region_names = zip(*region_rows) if region_rows else ((), (), ())
+        region_index = _build_index(region_ids)
+        self._region_names = tuple(list(names) for names in region_names)
+
+        system_ids, system_region_ids, system_name_en, system_name_zh, xs, ys, zs = (
+            zip(*system_rows) if system_rows else ((), (), (), (), (), (), ())
+        )
+        self._system_index = _build_index(system_ids)
+        self._system_ids = array('q', system_ids)
+        self._system_region = _index_column(system_region_ids, region_index)
+        self._system_region_ids = array('q', (region_id or 0 for region_id in system_region_ids))
+        self._system_xyz = array('d', (value or 0.0 for xyz in zip(xs, ys, zs) for value in xyz))
+        self._system_names = (list(system_name_en), list(system_name_zh))
+
+        self._loaded = True
+
+    # ---------- 物品 ----------
+    def get_name_by_id(self, type_id: int, zh: bool = False) -> Optional[str]:
+        index = self._type_index.get(type_id)
+        if index is None:
+            return None
+        return self._type_names[1 if zh else 0][index]
+
+    def get_id_by_name(self, name: str) -> Optional[int]:
+        return self._type_id_by_name.get(name)
+
+    def get_cn_name_by_id(self, type_id: int) -> Optional[str]:
+        return self.get_name_by_id(type_id, zh=True)
+
+    def get_id_by_cn_name(self, name: str) -> Optional[int]:
+        return self.get_id_by_name(name)
+
+    def get_invtype_packagedvolume_by_id(self, type_id: int) -> float:
+        index = self._type_index.get(type_id)
+        return self._type_packaged_volume[index] if index is not None else 0.0
+
+    def get_volume_by_type_id(self, type_id: int) -> float:
+        index = self._type_index.get(type_id)
+        return self._type_volume[index] if index is not None else 0.0
+
+    # ---------- 组 / 类别 ----------
+    def _get_type_group_index(self, type_id: int) -> int:
+        index = self._type_index.get(type_id)
+        return self._type_group[index] if index is not None else NO_INDEX
+
+    def get_groupname_by_id(self, type_id: int, zh: bool = False) -> Optional[str]:
+        group_index = self._get_type_group_index(type_id)
+        if group_index == NO_INDEX:
+            return None
+        return self._group_names[1 if zh else 0][group_index]
+
+    def get_groupid_by_groupname(self, group_name: str) -> Optional[int]:
+        return self._group_id_by_name.get(group_name)
+
+    def get_category_by_id(self, type_id: int, zh: bool = False) -> Optional[str]:
+        group_index = self._get_type_group_index(type_id)
+        if group_index == NO_INDEX:
+            return None
+        category_index = self._group_category[group_index]
+        if category_index == NO_INDEX:
+            return None
+        return self._category_names[1 if zh else 0][category_index]
+
+    # ---------- meta ----------
+    def get_metaname_by_metaid(self, meta_id: int, zh: bool = False) -> Optional[str]:
+        index = self._meta_index.get(meta_id)
+        if index is None:
+            return None
+        return self._meta_names[1 if zh else 0][index]
+
+    def get_metaname_by_typeid(self, type_id: int, zh: bool = False) -> Optional[str]:
+        index = self._type_index.get(type_id)
+        if index is None or self._type_meta[index] == NO_INDEX:
+            return None
+        return self._meta_names[1 if zh else 0][self._type_meta[index]]
+
+    def get_metadid_by_metaname(self, meta_name: str) -> Optional[int]:
+        return self._meta_id_by_name.get(meta_name)
+
+    # ---------- 市场组 ----------
+    def get_market_group_name_by_groupid(self, market_group_id: int, zh: bool = False) -> Optional[str]:
+        index = self._market_group_index.get(market_group_id)
+        if index is None:
+            return None
+        return self._market_group_names[1 if zh else 0][index]
+
+    def get_market_groupid_by_name(self, market_group_name: str) -> Optional[int]:
+        return self._market_group_id_by_name.get(market_group_name)
+
+    def get_market_group_list(self, type_id: int, zh: bool = False) -> List[str]:
+        """[根市场组, ..., 市场组, 物品名称]，与 SdeUtils.get_market_group_list 一致"""
+        index = self._type_index.get(type_id)
+        if index is None or self._type_market_group[index] == NO_INDEX:
+            return []
+        lang = 1 if zh else 0
+        names = self._market_group_names[lang]
+        market_group_index = self._type_market_group[index]
+        current_group_name = names[market_group_index]
+        if not current_group_name:
+            return []
+
+        market_group_list = [self._type_names[lang][index], current_group_name]
+        parent_id = self._market_group_parent_ids[market_group_index]
+        while parent_id:
+            parent_index = self._market_group_index.get(parent_id)
+            if parent_index is None:
+                break
+            if names[parent_index]:
+                market_group_list.append(names[parent_index])
+            parent_id = self._market_group_parent_ids[parent_index]
+        market_group_list.reverse()
+        return market_group_list
+
+    # ---------- 星系 ----------
+    def get_system_info_by_id(self, system_id: int, zh: bool = False) -> Optional[dict]:
+        index = self._system_index.get(system_id)
+        if index is None or self._system_region[index] == NO_INDEX:
+            return None
+        lang = 1 if zh else 0
+        return {
+            'system_name': self._system_names[lang][index],
+            'system_id': self._system_ids[index],
+            'region_id': self._system_region_ids[index],
+            'region_name': self._region_names[lang][self._system_region[index]],
+            'x': self._system_xyz[index * 3],
+            'y': self._system_xyz[index * 3 + 1],
+            'z': self._system_xyz[index * 3 + 2],
+        }
+
+
+sde_memory = SdeMemoryTable()
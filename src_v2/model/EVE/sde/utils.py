@@ -1,8 +1,10 @@
 import asyncio
+from functools import wraps
 import networkx as nx
 from thefuzz import fuzz, process
-from typing import Optional, List
-from sqlalchemy import select
+from typing import Optional, List, Dict, Iterable, Callable, Any
+from cachetools import TTLCache
+from sqlalchemy import select, text
 from sqlalchemy.orm import selectinload
 from aiocache import cached
 from aiocache.serializers import PickleSerializer
@@ -19,6 +21,7 @@ from .sde_builder import (
     MarketGroups,
 )
 from src_v2.core.log import logger
+from .sde_memory import sde_memory
 
 # 数据库管理器单例
 _db_manager: Optional[SDEDatabaseManager] = None
@@ -46,6 +49,26 @@ _zh_market_group_name_list: Optional[List[str]] = None
 _en_category_name_list: Optional[List[str]] = None
 _zh_category_name_list: Optional[List[str]] = None
 
+# 批量查询共享缓存 {属性:语言 -> TTLCache[type_id, value]}，未找到的 type_id 缓存为 None
+_BATCH_CACHE_TTL = 3600
+_BATCH_CACHE_MAXSIZE = 100000
+_BATCH_QUERY_CHUNK_SIZE = 5000
+_batch_caches: Dict[str, TTLCache] = {}
+
+
+def _memory_first(has_cls: bool = False):
+    """SDE 内存表已加载时直接由 sde_memory 的同名方法返回，不经过数据库和 aiocache"""
+    def decorator(func):
+        memory_getter_name = func.__name__
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if await sde_memory.ensure_fresh():
+                return getattr(sde_memory, memory_getter_name)(*(args[1:] if has_cls else args), **kwargs)
+            return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
 
 async def get_db_manager() -> SDEDatabaseManager:
     """获取数据库管理器单例"""
@@ -58,6 +81,21 @@ async def get_db_manager() -> SDEDatabaseManager:
     return _db_manager
 
 
+async def get_sde_version() -> Optional[int]:
+    """当前 SDE 数据库的 buildNumber，update_sde.py 导入新 SDE 后变化；读取失败时返回 None"""
+    try:
+        async with (await get_db_manager()).get_session() as session:
+            result = await session.execute(
+                text('SELECT "buildNumber" FROM "_sde" WHERE "_key" = :key'),
+                {"key": "sde"}
+            )
+            row = result.first()
+            return row[0] if row else None
+    except Exception as e:
+        logger.warning(f"获取 SDE 版本号失败: {e}")
+        return None
+
+
 class SdeUtils:
     _market_tree = None
     item_map_dict = dict()
@@ -336,6 +374,7 @@ class SdeUtils:
             return capital_ship_list
 
     @staticmethod
+    @_memory_first()
     @cached(ttl=3600, serializer=PickleSerializer())
     async def get_groupname_by_id(invtpye_id: int, zh: bool = False) -> Optional[str]:
         """根据 typeID 获取组名称"""
@@ -355,6 +394,7 @@ class SdeUtils:
             return None
 
     @staticmethod
+    @_memory_first()
     @cached(ttl=3600, serializer=PickleSerializer())
     async def get_groupid_by_groupname(group_name: str) -> Optional[int]:
         """根据组名称获取 groupID"""
@@ -383,6 +423,7 @@ class SdeUtils:
             return None
 
     @staticmethod
+    @_memory_first()
     @cached(ttl=3600, serializer=PickleSerializer())
     async def get_invtype_packagedvolume_by_id(invtpye_id: int) -> float:
         """根据 typeID 获取 packagedVolume"""
@@ -397,6 +438,7 @@ class SdeUtils:
             return 0.0
 
     @staticmethod
+    @_memory_first()
     @cached(ttl=3600, serializer=PickleSerializer())
     async def get_metaname_by_metaid(meta_id: int, zh: bool = False) -> Optional[str]:
         """根据 metaGroupID 获取 meta 名称"""
@@ -411,6 +453,7 @@ class SdeUtils:
             return None
 
     @staticmethod
+    @_memory_first()
     @cached(ttl=3600, serializer=PickleSerializer())
     async def get_metaname_by_typeid(typeid: int, zh: bool = False) -> Optional[str]:
         """根据 typeID 获取 meta 名称"""
@@ -430,6 +473,7 @@ class SdeUtils:
             return None
 
     @staticmethod
+    @_memory_first()
     @cached(ttl=3600, serializer=PickleSerializer())
     async def get_metadid_by_metaname(meta_name: str) -> Optional[int]:
         """根据 meta 名称获取 metaGroupID"""
@@ -445,6 +489,7 @@ class SdeUtils:
             return None
 
     @staticmethod
+    @_memory_first()
     @cached(ttl=3600, serializer=PickleSerializer())
     async def get_id_by_name(name: str) -> Optional[int]:
         """根据物品名称获取 typeID"""
@@ -460,6 +505,7 @@ class SdeUtils:
             return None
 
     @staticmethod
+    @_memory_first()
     @cached(ttl=3600, serializer=PickleSerializer())
     async def get_name_by_id(type_id: int, zh: bool = False) -> Optional[str]:
         """根据 typeID 获取物品名称"""
@@ -475,12 +521,14 @@ class SdeUtils:
             return None
 
     @staticmethod
+    @_memory_first()
     @cached(ttl=3600, serializer=PickleSerializer())
     async def get_id_by_cn_name(name: str) -> Optional[int]:
         """根据中文名称获取 typeID（向后兼容方法）"""
         return await SdeUtils.get_id_by_name(name)
 
     @staticmethod
+    @_memory_first()
     @cached(ttl=3600, serializer=PickleSerializer())
     async def get_cn_name_by_id(type_id: int) -> Optional[str]:
         """根据 typeID 获取中文名称（向后兼容方法）"""
@@ -503,6 +551,7 @@ class SdeUtils:
         return cls._market_tree
 
     @staticmethod
+    @_memory_first()
     @cached(ttl=3600, serializer=PickleSerializer())
     async def get_market_group_name_by_groupid(market_group_id: int, zh: bool = False) -> Optional[str]:
         """根据 marketGroupID 获取市场组名称"""
@@ -517,6 +566,7 @@ class SdeUtils:
             return None
 
     @staticmethod
+    @_memory_first()
     @cached(ttl=3600, serializer=PickleSerializer())
     async def get_market_groupid_by_name(market_group_name: str) -> Optional[int]:
         """根据市场组名称获取 marketGroupID"""
@@ -532,6 +582,7 @@ class SdeUtils:
             return None
 
     @classmethod
+    @_memory_first(has_cls=True)
     @cached(ttl=3600, serializer=PickleSerializer())
     async def get_market_group_list(cls, type_id: int, zh: bool = False) -> List[str]:
         """根据 typeID 获取市场组列表（从根到叶子）"""
@@ -594,6 +645,7 @@ class SdeUtils:
 
 
     @staticmethod
+    @_memory_first()
     @cached(ttl=3600, serializer=PickleSerializer())
     async def get_category_by_id(type_id: int, zh: bool = False) -> Optional[str]:
         """根据 typeID 获取类别名称"""
@@ -614,6 +666,7 @@ class SdeUtils:
             return None
 
     @staticmethod
+    @_memory_first()
     @cached(ttl=3600, serializer=PickleSerializer())
     async def get_system_info_by_id(system_id: int, zh: bool = False) -> Optional[dict]:
         """根据 systemID 获取星系信息"""
@@ -653,6 +706,172 @@ class SdeUtils:
             logger.warning(f"获取 system_id={system_id} 的星系信息时出错: {e}")
             return None
 
+    @staticmethod
+    async def _batch_lookup(cache_key: str, ids: Iterable[int], build_stmt: Callable[[List[int]], Any]) -> Dict[int, Any]:
+        """批量查询的公共实现
+
+        先从共享缓存取值，未命中的 id 按 _BATCH_QUERY_CHUNK_SIZE 分片，每片一次 IN 查询；
+        build_stmt(chunk) 返回 (id, value) 两列的查询语句。
+        返回 {id: value}，覆盖所有传入的 id，不存在的为 None。
+        """
+        cache = _batch_caches.get(cache_key)
+        if cache is None:
+            cache = _batch_caches[cache_key] = TTLCache(maxsize=_BATCH_CACHE_MAXSIZE, ttl=_BATCH_CACHE_TTL)
+
+        res = {}
+        missing = []
+        for id_ in set(ids):
+            if id_ is None:
+                continue
+            if id_ in cache:
+                res[id_] = cache[id_]
+            else:
+                missing.append(id_)
+        if not missing:
+            return res
+
+        found = {}
+        try:
+            async with (await get_db_manager()).get_readonly_session() as session:
+                for i in range(0, len(missing), _BATCH_QUERY_CHUNK_SIZE):
+                    result = await session.execute(build_stmt(missing[i:i + _BATCH_QUERY_CHUNK_SIZE]))
+                    for id_, value in result:
+                        found[id_] = value
+        except Exception as e:
+            logger.warning(f"批量查询 {cache_key} 时出错: {e}")
+            res.update({id_: None for id_ in missing})
+            return res
+
+        for id_ in missing:
+            value = found.get(id_)
+            cache[id_] = value
+            res[id_] = value
+        return res
+
+    @staticmethod
+    async def get_names_by_ids(type_ids: Iterable[int], zh: bool = False) -> Dict[int, Optional[str]]:
+        """批量获取物品名称 {type_id: name}"""
+        if await sde_memory.ensure_fresh():
+            return {type_id: sde_memory.get_name_by_id(type_id, zh) for type_id in set(type_ids) if type_id is not None}
+        name_field = InvTypes.typeName_zh if zh else InvTypes.typeName_en
+        return await SdeUtils._batch_lookup(
+            f"type_name:{zh}", type_ids,
+            lambda chunk: select(InvTypes.typeID, name_field).where(InvTypes.typeID.in_(chunk))
+        )
+
+    @staticmethod
+    async def get_groupnames_by_ids(type_ids: Iterable[int], zh: bool = False) -> Dict[int, Optional[str]]:
+        """批量获取物品组名称 {type_id: group_name}"""
+        if await sde_memory.ensure_fresh():
+            return {type_id: sde_memory.get_groupname_by_id(type_id, zh) for type_id in set(type_ids) if type_id is not None}
+        group_name_field = InvGroups.groupName_zh if zh else InvGroups.groupName_en
+        return await SdeUtils._batch_lookup(
+            f"group_name:{zh}", type_ids,
+            lambda chunk: (
+                select(InvTypes.typeID, group_name_field)
+                .select_from(InvTypes)
+                .join(InvGroups, InvTypes.groupID == InvGroups.groupID)
+                .where(InvTypes.typeID.in_(chunk))
+            )
+        )
+
+    @staticmethod
+    async def get_categories_by_ids(type_ids: Iterable[int], zh: bool = False) -> Dict[int, Optional[str]]:
+        """批量获取物品类别名称 {type_id: category}"""
+        if await sde_memory.ensure_fresh():
+            return {type_id: sde_memory.get_category_by_id(type_id, zh) for type_id in set(type_ids) if type_id is not None}
+        category_name_field = InvCategories.categoryName_zh if zh else InvCategories.categoryName_en
+        return await SdeUtils._batch_lookup(
+            f"category_name:{zh}", type_ids,
+            lambda chunk: (
+                select(InvTypes.typeID, category_name_field)
+                .select_from(InvTypes)
+                .join(InvGroups, InvTypes.groupID == InvGroups.groupID)
+                .join(InvCategories, InvGroups.categoryID == InvCategories.categoryID)
+                .where(InvTypes.typeID.in_(chunk))
+            )
+        )
+
+    @staticmethod
+    async def get_metanames_by_typeids(type_ids: Iterable[int], zh: bool = False) -> Dict[int, Optional[str]]:
+        """批量获取物品 meta 名称 {type_id: meta}"""
+        if await sde_memory.ensure_fresh():
+            return {type_id: sde_memory.get_metaname_by_typeid(type_id, zh) for type_id in set(type_ids) if type_id is not None}
+        name_field = MetaGroups.nameID_zh if zh else MetaGroups.nameID_en
+        return await SdeUtils._batch_lookup(
+            f"meta_name:{zh}", type_ids,
+            lambda chunk: (
+                select(InvTypes.typeID, name_field)
+                .select_from(InvTypes)
+                .join(MetaGroups, InvTypes.metaGroupID == MetaGroups.metaGroupID)
+                .where(InvTypes.typeID.in_(chunk))
+            )
+        )
+
+    @staticmethod
+    async def get_volumes_by_ids(type_ids: Iterable[int]) -> Dict[int, float]:
+        """批量获取物品体积 {type_id: volume}，不存在的为 0.0"""
+        if await sde_memory.ensure_fresh():
+            return {type_id: sde_memory.get_volume_by_type_id(type_id) for type_id in set(type_ids) if type_id is not None}
+        volumes = await SdeUtils._batch_lookup(
+            "type_volume", type_ids,
+            lambda chunk: select(InvTypes.typeID, InvTypes.volume).where(InvTypes.typeID.in_(chunk))
+        )
+        return {type_id: volume if volume is not None else 0.0 for type_id, volume in volumes.items()}
+
+    @classmethod
+    async def get_market_group_lists_by_ids(cls, type_ids: Iterable[int], zh: bool = False) -> Dict[int, List[str]]:
+        """批量获取市场组列表 {type_id: [根市场组, ..., 市场组, 物品名称]}，与 get_market_group_list 一致"""
+        if await sde_memory.ensure_fresh():
+            return {type_id: sde_memory.get_market_group_list(type_id, zh) for type_id in set(type_ids) if type_id is not None}
+        type_ids = set(type_ids)
+        type_name_field = InvTypes.typeName_zh if zh else InvTypes.typeName_en
+        type_names = await cls._batch_lookup(
+            f"type_name:{zh}", type_ids,
+            lambda chunk: select(InvTypes.typeID, type_name_field).where(InvTypes.typeID.in_(chunk))
+        )
+        type_market_groups = await cls._batch_lookup(
+            "type_market_group", type_ids,
+            lambda chunk: select(InvTypes.typeID, InvTypes.marketGroupID).where(InvTypes.typeID.in_(chunk))
+        )
+        market_group_ids = set()
+        market_tree = await cls.get_market_group_tree()
+        for market_group_id in type_market_groups.values():
+            if market_group_id is None or market_group_id in market_group_ids:
+                continue
+            market_group_ids.add(market_group_id)
+            if market_group_id in market_tree:
+                market_group_ids.update(nx.ancestors(market_tree, market_group_id))
+        market_group_name_field = MarketGroups.nameID_zh if zh else MarketGroups.nameID_en
+        market_group_names = await cls._batch_lookup(
+            f"market_group_name:{zh}", market_group_ids,
+            lambda chunk: (
+                select(MarketGroups.marketGroupID, market_group_name_field)
+                .where(MarketGroups.marketGroupID.in_(chunk))
+            )
+        )
+
+        res = {}
+        for type_id in type_ids:
+            if type_id is None:
+                continue
+            market_group_id = type_market_groups.get(type_id)
+            current_group_name = market_group_names.get(market_group_id) if market_group_id is not None else None
+            if not current_group_name:
+                res[type_id] = []
+                continue
+            market_group_list = [type_names.get(type_id), current_group_name]
+            parent_nodes = list(market_tree.predecessors(market_group_id)) if market_group_id in market_tree else []
+            while parent_nodes:
+                parent_node = parent_nodes[0]
+                parent_name = market_group_names.get(parent_node)
+                if parent_name:
+                    market_group_list.append(parent_name)
+                parent_nodes = list(market_tree.predecessors(parent_node))
+            market_group_list.reverse()
+            res[type_id] = market_group_list
+        return res
+
     @staticmethod
     def maybe_chinese(strs):
         en_count = 0
@@ -834,6 +1053,7 @@ class SdeUtils:
             return [row[0] for row in result]
 
     @staticmethod
+    @_memory_first()
     @cached(ttl=3600, serializer=PickleSerializer())
     async def get_volume_by_type_id(type_id: int) -> float:
         """根据 typeID 获取体积"""
@@ -0,0 +1,44 @@
+"""
+EsiReqManager 调度测试用例
+测试接口令牌桶在 limit < 1 时仍能派发请求
+"""
+import asyncio
+
+import pytest
+
+from src_v2.model.EVE.eveesi.esi_req_manager import EsiReqManager, EsiRequest
+
+
+def make_request(limit, result="ok"):
+    async def func():
+        return result
+    return EsiRequest(func, (), {}, asyncio.get_running_loop().create_future(),
+                      required_tokens=60, limit=limit, func_name="corporations_corporation_blueprints")
+
+
+@pytest.mark.asyncio
+async def test_endpoint_limit_below_one_dispatches():
+    manager = EsiReqManager()
+    manager.token_pool = manager.max_token_pool
+
+    first = make_request(2 / 3)
+    await manager.add_request(first)
+    assert manager._dispatch_ready() is None
+    assert await asyncio.wait_for(first.future, timeout=1) == "ok"
+
+    # 令牌已用完，下一次需等待 1 / limit 秒
+    second = make_request(2 / 3)
+    await manager.add_request(second)
+    wait = manager._dispatch_ready()
+    assert wait == pytest.approx(1.5, abs=0.05)
+    assert not second.future.done()
+
+
+def test_endpoint_allowance_capped_at_one_for_slow_endpoints():
+    manager = EsiReqManager()
+    req = EsiRequest(None, (), {}, None, limit=2 / 3, func_name="slow")
+    assert manager._endpoint_wait(req, 0.0) == 0.0
+    manager.endpoint_allowance["slow"][0] -= 1
+    # 长时间空闲后最多攒一个令牌
+    assert manager._endpoint_wait(req, 100.0) == 0.0
+    assert manager.endpoint_allowance["slow"][0] == 1.0
@@ -0,0 +1,94 @@
+"""
+LogisticsPlanner 测试用例
+使用构造的建筑供需数据测试本地抵扣、就近匹配与线路合并
+"""
+import pytest
+
+from src_v2.model.EVE.industry.industry_utils.logistics_planner import LIGHT_YEAR, LogisticsPlanner
+
+TRITANIUM = 34
+PYERITE = 35
+
+
+def make_structure(structure_id, system_id, key, materials):
+    return {
+        "structure_id": structure_id,
+        "structure_name": f"建筑{structure_id}",
+        "system_id": system_id,
+        "system_name": f"星系{system_id}",
+        key: dict(materials),
+    }
+
+
+@pytest.fixture
+def planner():
+    # 星系 1 在原点，星系 2 距离 1 光年，星系 3 距离 5 光年
+    return LogisticsPlanner({
+        1: (0, 0, 0),
+        2: (LIGHT_YEAR, 0, 0),
+        3: (5 * LIGHT_YEAR, 0, 0),
+    })
+
+
+class TestLogisticsPlanner:
+    """LogisticsPlanner 测试类"""
+
+    def test_distance_matrix(self, planner):
+        assert planner.distance(1, 2) == pytest.approx(1)
+        assert planner.distance(3, 1) == pytest.approx(5)
+        assert planner.distance(1, 404) == float("inf")
+        assert planner.coordinate(2) == pytest.approx([1, 0, 0])
+        assert planner.coordinate(404) == [0, 0, 0]
+
+    def test_consume_local_stock(self, planner):
+        need_dict = {100: make_structure(100, 1, "material_need", {TRITANIUM: 10, PYERITE: 5})}
+        provide_dict = {100: make_structure(100, 1, "material_provide", {TRITANIUM: 4, PYERITE: 8})}
+
+        planner.consume_local_stock(need_dict, provide_dict)
+
+        assert need_dict[100]["material_need"] == {TRITANIUM: 6, PYERITE: 0}
+        assert provide_dict[100]["material_provide"] == {TRITANIUM: 0, PYERITE: 3}
+
+    def test_match_nearest_provider_first(self, planner):
+        need_dict = {100: make_structure(100, 1, "material_need", {TRITANIUM: 10})}
+        provide_dict = {
+            300: make_structure(300, 3, "material_provide", {TRITANIUM: 100}),
+            200: make_structure(200, 2, "material_provide", {TRITANIUM: 6}),
+        }
+
+        matches = planner.match(need_dict, provide_dict)
+
+        assert matches == {(100, 200, TRITANIUM): 6, (100, 300, TRITANIUM): 4}
+        assert need_dict[100]["material_need"][TRITANIUM] == 0
+        assert provide_dict[200]["material_provide"][TRITANIUM] == 0
+        assert provide_dict[300]["material_provide"][TRITANIUM] == 96
+
+    def test_match_skips_self_and_keeps_unmet_need(self, planner):
+        need_dict = {100: make_structure(100, 1, "material_need", {TRITANIUM: 10, PYERITE: 3})}
+        provide_dict = {
+            100: make_structure(100, 1, "material_provide", {PYERITE: 50}),
+            200: make_structure(200, 2, "material_provide", {TRITANIUM: 4}),
+        }
+
+        matches = planner.match(need_dict, provide_dict)
+
+        assert matches == {(100, 200, TRITANIUM): 4}
+        assert need_dict[100]["material_need"] == {TRITANIUM: 6, PYERITE: 3}
+
+    def test_build_output_consolidates_routes(self, planner):
+        need_dict = {100: make_structure(100, 1, "material_need", {TRITANIUM: 10, PYERITE: 5})}
+        provide_dict = {200: make_structure(200, 2, "material_provide", {TRITANIUM: 10, PYERITE: 5})}
+        matches = planner.match(need_dict, provide_dict)
+
+        logistic_data, routes = planner.build_output(
+            matches, need_dict, provide_dict,
+            type_names={TRITANIUM: "三钛合金", PYERITE: "类晶体胶矿"},
+            type_volumes={TRITANIUM: 0.01, PYERITE: 0.01},
+        )
+
+        assert len(logistic_data) == 2
+        assert {item["provide_quantity"] for item in logistic_data} == {10, 5}
+        assert logistic_data[0]["provide_system_distance"] == pytest.approx(1)
+        assert len(routes) == 1
+        assert routes[0]["total_volume"] == pytest.approx(0.15)
+        assert {item["type_name"] for item in routes[0]["items"]} == {"三钛合金", "类晶体胶矿"}
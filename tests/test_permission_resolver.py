@@ -0,0 +1,138 @@
+"""
+权限解析测试用例
+测试 write→read 展开、角色闭包、VIP 到期判断与角色删除后的缓存失效
+"""
+import time
+from types import SimpleNamespace
+
+import pytest
+from quart import Quart, g
+
+from src_v2.backend.api.permission_required import permission_required, role_required
+from src_v2.core.permission import permission_resolver as permission_resolver_module
+from src_v2.core.permission.permission_resolver import (
+    ResolvedPermissions,
+    expand_permissions,
+    permission_resolver,
+    role_closure,
+)
+
+
+def test_expand_permissions_adds_read_for_write():
+    permissions = expand_permissions(["admin:write", "market:read", "industry:write"])
+    assert permissions == {"admin:write", "admin:read", "market:read", "industry:write", "industry:read"}
+
+
+def test_role_closure_includes_all_descendants_and_handles_cycles():
+    children = {
+        "admin": ["user"],
+        "user": ["guest"],
+        "guest": ["user"],  # 循环引用
+    }
+    assert role_closure(["admin"], children) == {"admin", "user", "guest"}
+    assert role_closure(["guest"], children) == {"guest", "user"}
+    assert role_closure([], children) == set()
+
+
+def test_vip_level_counts_only_before_end_date():
+    active = ResolvedPermissions(set(), {"user"}, "vip_omega", time.time() + 3600)
+    expired = ResolvedPermissions(set(), {"user"}, "vip_omega", time.time() - 1)
+    assert active.has_roles(["user", "vip_omega"])
+    assert not expired.has_roles(["vip_omega"])
+    assert expired.has_roles(["user"])
+
+
+def test_round_trip_through_dict():
+    resolved = ResolvedPermissions({"admin:read"}, {"admin", "user"}, None, None)
+    restored = ResolvedPermissions.from_dict(resolved.to_dict())
+    assert restored.has_permissions(["admin:read"])
+    assert not restored.has_permissions(["admin:write"])
+    assert restored.all_roles == {"admin", "user"}
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def mget(self, *keys):
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+
+
+class FakeRows:
+    """模拟 DBUtils 返回的异步迭代器"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __aiter__(self):
+        async def iterate():
+            for row in self.rows:
+                yield row
+        return iterate()
+
+
+@pytest.fixture
+def fake_permission_db(monkeypatch):
+    """用内存中的角色表替换数据库与 Redis，返回 {user_name: [role_name, ...]}"""
+    user_roles = {"alice": ["admin"]}
+    role_permissions = {"admin": ["admin:write"]}
+
+    async def select_user_roles_by_user_name(user_name):
+        return FakeRows([SimpleNamespace(role_name=role) for role in user_roles.get(user_name, [])])
+
+    async def select_role_permissions_by_role_name(role_name):
+        return FakeRows([SimpleNamespace(permission_name=perm) for perm in role_permissions.get(role_name, [])])
+
+    async def select_empty(*args, **kwargs):
+        return FakeRows([])
+
+    async def select_vip_state_by_user_name(user_name):
+        return None
+
+    monkeypatch.setattr(permission_resolver_module, "rdm", SimpleNamespace(r=FakeRedis()))
+    monkeypatch.setattr(permission_resolver_module, "UserRolesDBUtils",
+                        SimpleNamespace(select_user_roles_by_user_name=select_user_roles_by_user_name))
+    monkeypatch.setattr(permission_resolver_module, "RolePermissionsDBUtils",
+                        SimpleNamespace(select_role_permissions_by_role_name=select_role_permissions_by_role_name))
+    monkeypatch.setattr(permission_resolver_module, "UserPermissionsDBUtils",
+                        SimpleNamespace(select_user_permissions_by_user_name=select_empty))
+    monkeypatch.setattr(permission_resolver_module, "RoleHierarchyDBUtils", SimpleNamespace(select_all=select_empty))
+    monkeypatch.setattr(permission_resolver_module, "VipStateDBUtils",
+                        SimpleNamespace(select_vip_state_by_user_name=select_vip_state_by_user_name))
+    return user_roles
+
+
+@pytest.mark.asyncio
+async def test_user_loses_access_after_roles_deleted(fake_permission_db):
+    app = Quart(__name__)
+
+    @app.before_request
+    async def set_user():
+        g.current_user = {"user_id": "alice"}
+
+    @app.route("/perm")
+    @permission_required(["admin:read"])
+    async def perm_view():
+        return "ok"
+
+    @app.route("/role")
+    @role_required(["admin"])
+    async def role_view():
+        return "ok"
+
+    client = app.test_client()
+    assert (await client.get("/perm")).status_code == 200
+    assert (await client.get("/role")).status_code == 200
+
+    # 删除用户角色（如 UserManager.delete_user）后使该用户的解析结果失效
+    fake_permission_db["alice"] = []
+    await permission_resolver.invalidate_user("alice")
+
+    assert (await client.get("/perm")).status_code == 403
+    assert (await client.get("/role")).status_code == 403